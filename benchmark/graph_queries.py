@@ -0,0 +1,111 @@
+"""
+    Count the SQL statements and time needed to load the lineage graph as it
+    grows, from ColumnLineage entities and their relationships and with
+    query_graph. The catalog is a temporary SQLite database with a chain of
+    tables, where a job copies all the columns of one table to the next one.
+
+        python -m benchmark.graph_queries
+"""
+import datetime
+import tempfile
+import time
+
+from dbcat import SqliteCatalog
+from dbcat.catalog.models import Base, JobExecutionStatus
+from sqlalchemy import event
+
+from data_lineage.server import Kedro, query_graph
+
+NUM_COLUMNS = 10
+
+
+def build_catalog(path: str, num_tables: int) -> SqliteCatalog:
+    catalog = SqliteCatalog(path=path)
+    Base.metadata.create_all(catalog.engine)
+
+    with catalog.managed_session:
+        source = catalog.add_source(name="benchmark", source_type="sqlite")
+        schema = catalog.add_schema("default", source)
+        previous = None
+        for table_index in range(num_tables):
+            table = catalog.add_table("table_{}".format(table_index), schema)
+            columns = [
+                catalog.add_column("column_{}".format(i), "int", i, table)
+                for i in range(NUM_COLUMNS)
+            ]
+            if previous is not None:
+                job = catalog.add_job(
+                    "LOAD table_{}".format(table_index), source, {}
+                )
+                job_execution = catalog.add_job_execution(
+                    job,
+                    datetime.datetime.now(),
+                    datetime.datetime.now(),
+                    JobExecutionStatus.SUCCESS,
+                )
+                for source_column, target_column in zip(previous, columns):
+                    catalog.add_column_lineage(
+                        source_column, target_column, job_execution.id, {}
+                    )
+            previous = columns
+
+    return catalog
+
+
+def orm_graph(catalog: SqliteCatalog):
+    with catalog.managed_session:
+        for edge in catalog.get_column_lineages():
+            Kedro._column_info(edge.source.id, {edge.source.id: edge.source.fqdn})
+            Kedro._column_info(edge.target.id, {edge.target.id: edge.target.fqdn})
+            Kedro._job_info(edge.job_execution.job.id, edge.job_execution.job.name)
+
+
+def joined_graph(catalog: SqliteCatalog):
+    with catalog.managed_session as session:
+        edge_rows, columns = query_graph(session, Kedro._edges_query(session, None))
+        for row in edge_rows:
+            Kedro._column_info(row.source_id, columns)
+            Kedro._column_info(row.target_id, columns)
+            Kedro._job_info(row.job_id, row.job_name)
+
+
+def count_queries(catalog: SqliteCatalog, load_graph):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(catalog.engine, "before_cursor_execute", before_cursor_execute)
+    started = time.perf_counter()
+    load_graph(catalog)
+    elapsed = time.perf_counter() - started
+    event.remove(catalog.engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements), elapsed
+
+
+def main(sizes=(10, 100, 1000)):
+    print(
+        "{:>8} {:>12} {:>12} {:>12} {:>12}".format(
+            "edges", "orm sql", "orm s", "joined sql", "joined s"
+        )
+    )
+    for num_tables in sizes:
+        with tempfile.NamedTemporaryFile(suffix=".db") as file:
+            catalog = build_catalog(file.name, num_tables)
+            orm_queries, orm_elapsed = count_queries(catalog, orm_graph)
+            joined_queries, joined_elapsed = count_queries(catalog, joined_graph)
+            catalog.close()
+
+        print(
+            "{:>8} {:>12} {:>12.3f} {:>12} {:>12.3f}".format(
+                (num_tables - 1) * NUM_COLUMNS,
+                orm_queries,
+                orm_elapsed,
+                joined_queries,
+                joined_elapsed,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+    Compare the ways to answer "what is downstream of a column" as the lineage
+    graph grows:
+
+    * full graph: build the JSON of the complete graph, load it in a
+      LineageGraph and traverse it
+    * index: load the LineageIndex from scratch and traverse it
+    * cte: run the recursive query of traverse_cte
+
+    The catalog is the temporary SQLite database of benchmark.graph_queries.
+    The traversal starts at the first column of the first table and stops
+    after DEPTH jobs. The number of jobs that were reached is compared, since
+    LineageGraph connects all the columns read and written by a job.
+
+        python -m benchmark.lineage_traversal
+"""
+import json
+import tempfile
+import time
+
+from benchmark.graph_queries import NUM_COLUMNS, build_catalog
+from data_lineage.graph import LineageGraph
+from data_lineage.server import Kedro, traverse_cte
+from data_lineage.traversal import LineageIndex, is_job
+
+DEPTH = 5
+START = "column:1"
+
+
+def num_jobs(depths) -> int:
+    return len([node_id for node_id in depths.keys() if is_job(node_id)])
+
+
+def full_graph(catalog) -> int:
+    kedro = Kedro.__new__(Kedro)
+    kedro._catalog = catalog
+    data = json.loads(
+        "".join(
+            kedro._graph_chunks(lambda session: Kedro._edges_query(session, None), None)
+        )
+    )
+    graph = LineageGraph(nodes=data["nodes"], edges=data["edges"])
+    return len(graph.downstream(START, DEPTH, level="job"))
+
+
+def index(catalog) -> int:
+    lineage_index = LineageIndex()
+    with catalog.managed_session as session:
+        lineage_index.refresh(session)
+    return num_jobs(lineage_index.traverse("downstream", [START], DEPTH))
+
+
+def cte(catalog) -> int:
+    with catalog.managed_session as session:
+        return num_jobs(traverse_cte(session, "downstream", [START], DEPTH))
+
+
+def timed(catalog, traversal):
+    started = time.perf_counter()
+    reached = traversal(catalog)
+    return reached, time.perf_counter() - started
+
+
+def main(sizes=(10, 100, 1000)):
+    print(
+        "{:>8} {:>14} {:>14} {:>14}".format("edges", "full graph s", "index s", "cte s")
+    )
+    for num_tables in sizes:
+        with tempfile.NamedTemporaryFile(suffix=".db") as file:
+            catalog = build_catalog(file.name, num_tables)
+            results = [timed(catalog, t) for t in (full_graph, index, cte)]
+            catalog.close()
+
+        reached = {result[0] for result in results}
+        assert len(reached) == 1, "Traversals disagree: {}".format(results)
+        print(
+            "{:>8} {:>14.4f} {:>14.4f} {:>14.4f}".format(
+                (num_tables - 1) * NUM_COLUMNS, *[result[1] for result in results]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+    Compare the time and memory needed to build and read the column objects
+    of the Python SDK with the dict based model that they replaced. The
+    payloads are the JSON API objects returned by GET /api/v1/catalog/columns.
+
+        python -m benchmark.sdk_models
+"""
+import gc
+import logging
+import time
+import tracemalloc
+
+from data_lineage import Column
+
+
+class DictModel:
+    """BaseModel before it was moved to __slots__"""
+
+    def __init__(self, session, attributes, obj_id, relationships):
+        self._session = session
+        self._attributes = attributes
+        self._obj_id = obj_id
+        self._relationships = relationships
+
+    def __getattr__(self, item):
+        logging.debug("Attributes: {}".format(self._attributes))
+        if item == "id":
+            return self._obj_id
+        elif self._attributes and item in self._attributes.keys():
+            return self._attributes[item]
+        elif self._relationships and item in self._relationships.keys():
+            return self._relationships[item]
+        raise AttributeError
+
+
+def payloads(num_columns: int):
+    return [
+        {
+            "id": str(index),
+            "type": "columns",
+            "attributes": {
+                "name": "column_{}".format(index),
+                "data_type": "int",
+                "sort_order": index % 10,
+                "pii_type": None,
+                "fqdn": ["source", "schema", "table_{}".format(index // 10)],
+            },
+        }
+        for index in range(num_columns)
+    ]
+
+
+def build(clazz, items):
+    return [
+        clazz(
+            session=None,
+            attributes=item["attributes"],
+            obj_id=item["id"],
+            relationships=None,
+        )
+        for item in items
+    ]
+
+
+def read(objects) -> int:
+    total = 0
+    for obj in objects:
+        total += obj.sort_order + len(obj.name) + len(obj.data_type)
+    return total
+
+
+def measure(clazz, num_columns: int):
+    # The payloads are parsed JSON that is dropped after the objects are
+    # built. Memory is what is still allocated after that, which includes the
+    # parts of the payloads that the objects keep.
+    gc.collect()
+    tracemalloc.start()
+    items = payloads(num_columns)
+    started = time.perf_counter()
+    objects = build(clazz, items)
+    built = time.perf_counter()
+    del items
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started_read = time.perf_counter()
+    read(objects)
+    return built - started, time.perf_counter() - started_read, memory
+
+
+def main(sizes=(10000, 100000, 1000000)):
+    print(
+        "{:>8} {:>8} {:>12} {:>12} {:>12}".format(
+            "columns", "model", "build s", "read s", "memory MB"
+        )
+    )
+    for num_columns in sizes:
+        for clazz in (DictModel, Column):
+            build_time, read_time, memory = measure(clazz, num_columns)
+            print(
+                "{:>8} {:>8} {:>12.4f} {:>12.4f} {:>12.1f}".format(
+                    num_columns, clazz.__name__, build_time, read_time, memory / 2 ** 20
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+    Compare visit_dml_query with the previous approach of trying all three DML
+    visitors in sequence, over the queries in test/queries.json and a few
+    SELECT INTO and CTAS queries which needed more than one traversal.
+
+        python -m benchmark.visit_dml_query
+"""
+import json
+import timeit
+
+from dbcat.catalog import CatSource
+
+from data_lineage.cache import parse_cache
+from data_lineage.parser import parse, visit_dml_query
+from data_lineage.parser.dml_visitor import (
+    CTASVisitor,
+    SelectIntoVisitor,
+    SelectSourceVisitor,
+)
+from data_lineage.parser.visitor import RedshiftExprVisitor
+
+EXTRA_QUERIES = [
+    "SELECT * INTO page_lookup FROM page_lookup_redirect",
+    "SELECT page_id, page_title, page_latest INTO page_copy FROM page",
+    "CREATE TABLE page_copy AS SELECT page_id, page_title, page_latest FROM page",
+    "CREATE TEMP TABLE temp_table_x(page_title) AS SELECT redirect_title "
+    "FROM page_lookup_nonredirect WHERE redirect_title IS NOT NULL",
+]
+
+
+def sequential_visit(parsed):
+    for clazz in [SelectSourceVisitor, SelectIntoVisitor, CTASVisitor]:
+        visitor = clazz(parsed.name, RedshiftExprVisitor)
+        visitor(parsed.node)
+        if len(visitor.select_tables) > 0 and visitor.insert_table is not None:
+            return visitor
+
+
+def single_pass_visit(parsed, source):
+    parse_cache.clear()
+    return visit_dml_query(parsed, source)
+
+
+def main(number: int = 200):
+    with open("test/queries.json", "r") as file:
+        queries = json.load(file)
+
+    parsed_queries = [parse(query["query"], query["name"]) for query in queries]
+    parsed_queries += [parse(query) for query in EXTRA_QUERIES]
+    for parsed in parsed_queries:
+        # Build the parse tree outside of the timed section
+        assert parsed.node is not None
+
+    source = CatSource(name="benchmark", source_type="redshift")
+
+    sequential = timeit.timeit(
+        lambda: [sequential_visit(parsed) for parsed in parsed_queries], number=number
+    )
+    single_pass = timeit.timeit(
+        lambda: [single_pass_visit(parsed, source) for parsed in parsed_queries],
+        number=number,
+    )
+
+    print("queries: {}, iterations: {}".format(len(parsed_queries), number))
+    print("sequential visitors: {:.3f}s".format(sequential))
+    print("single pass visitor: {:.3f}s".format(single_pass))
+    print("speedup: {:.2f}x".format(sequential / single_pass))
+
+
+if __name__ == "__main__":
+    main()
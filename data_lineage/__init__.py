@@ -4,13 +4,31 @@ __version__ = "0.9.0"
 import datetime
 import json
 import logging
-from typing import Any, Dict, Generator, List, Optional, Type, TypeVar
+import math
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    FrozenSet,
+    Generator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 import requests
 from dbcat.catalog.models import JobExecutionStatus
 from furl import furl
 from requests import HTTPError
 
+from data_lineage.cache import TTLCache
+from data_lineage.compact_graph import CompactLineageGraph
 from data_lineage.graph import LineageGraph
 
 
@@ -49,90 +67,297 @@ class MultipleResultsFound(Exception):
 class Graph:
     def __init__(self, url: str):
         self._base_url = furl(url) / "api/main"
+        self._lineage_url = furl(url) / "api/v1/lineage"
+        self._reaches_url = furl(url) / "api/v1/reaches"
         self._session = requests.Session()
 
-    def get(self, job_ids: set = None) -> Dict[str, List[Dict[str, str]]]:
+    def get(
+        self, job_ids: set = None, granularity: str = "column"
+    ) -> Dict[str, List[Dict[str, str]]]:
+        params: Dict[str, Any] = {"granularity": granularity}
         if job_ids is not None:
-            response = self._session.get(
-                self._base_url, params={"job_ids": list(job_ids)}
-            )
-        else:
-            response = self._session.get(self._base_url)
+            params["job_ids"] = list(job_ids)
+        response = self._session.get(self._base_url, params=params)
         return response.json()
 
+    def get_delta(
+        self, since: int, granularity: str = "column", job_ids: set = None
+    ) -> Dict[str, Any]:
+        """
+            Nodes and edges of the job executions that changed after a cursor, and
+            the new cursor. The cursor is the last change in the lineage change
+            log, which is in commit order, so edges are never missed. Edges of
+            job executions that changed again are returned again.
+        :param since: Cursor of the graph or of the last delta
+        :param job_ids: Only the edges of the latest executions of these jobs,
+            as in get()
+        """
+        params: Dict[str, Any] = {"since": since, "granularity": granularity}
+        if job_ids is not None:
+            params["job_ids"] = list(job_ids)
+        response = self._session.get(furl(self._base_url) / "delta", params=params)
+        response.raise_for_status()
+        return response.json()
 
-def load_graph(graphSDK: Graph, job_ids: set = None) -> LineageGraph:
-    data = graphSDK.get(job_ids)
-    return LineageGraph(nodes=data["nodes"], edges=data["edges"])
+    def upstream(
+        self, node: str, depth: int = None, level: str = "column", mode: str = "index"
+    ) -> List[Dict[str, Any]]:
+        """
+            Find the columns, tables or jobs that feed a node
+        :param node: Column, table or task. For e.g. column:1 or table:1
+        :param depth: Maximum number of jobs to traverse. None for no limit.
+        :param level: column, table or job
+        :param mode: index to traverse the lineage index in the server or cte to
+            run a recursive query in the catalog database
+        :return: List of nodes with their depth
+        """
+        return self._traverse("upstream", node, depth, level, mode)
+
+    def downstream(
+        self, node: str, depth: int = None, level: str = "column", mode: str = "index"
+    ) -> List[Dict[str, Any]]:
+        """
+            Find the columns, tables or jobs that are fed by a node
+        :param node: Column, table or task. For e.g. column:1 or table:1
+        :param depth: Maximum number of jobs to traverse. None for no limit.
+        :param level: column, table or job
+        :param mode: index to traverse the lineage index in the server or cte to
+            run a recursive query in the catalog database
+        :return: List of nodes with their depth
+        """
+        return self._traverse("downstream", node, depth, level, mode)
+
+    def _traverse(
+        self, direction: str, node: str, depth: Optional[int], level: str, mode: str
+    ) -> List[Dict[str, Any]]:
+        params: Dict[str, Any] = {"node": node, "level": level, "mode": mode}
+        if depth is not None:
+            params["depth"] = depth
+        response = self._session.get(self._lineage_url / direction, params=params)
+        response.raise_for_status()
+        payload = response.json()
+        if payload.get("truncated"):
+            logging.warning(
+                "Lineage of {} was truncated at the maximum depth".format(node)
+            )
+        return payload["nodes"]
+
+    def reaches(self, source: str, target: str) -> bool:
+        """
+            Check if lineage flows from a column or table to another
+        :param source: Column or table. For e.g. column:1 or table:1
+        :param target: Column or table. For e.g. column:1 or table:1
+        """
+        response = self._session.get(
+            self._reaches_url, params={"source": source, "target": target}
+        )
+        response.raise_for_status()
+        return response.json()["reaches"]
+
+    def reaches_many(self, pairs: List[Tuple[str, str]]) -> List[bool]:
+        """
+            Check a list of source and target pairs in one request
+        :param pairs: List of source and target. For e.g. ("column:1", "table:2")
+        """
+        response = self._session.post(
+            self._reaches_url,
+            json={
+                "pairs": [
+                    {"source": source, "target": target} for source, target in pairs
+                ]
+            },
+        )
+        response.raise_for_status()
+        return response.json()["reaches"]
+
+
+def load_graph(
+    graphSDK: Graph,
+    job_ids: set = None,
+    compact: bool = False,
+    granularity: str = "column",
+) -> Union[LineageGraph, CompactLineageGraph]:
+    """
+        Load the lineage graph of a set of jobs or the complete graph
+    :param compact: Load the graph in a CompactLineageGraph. Requires the compact
+        extra, i.e. data-lineage[compact].
+    :param granularity: column or table. The table graph is read from the table
+        lineage rollup.
+    """
+    data = graphSDK.get(job_ids, granularity)
+    clazz = CompactLineageGraph if compact else LineageGraph
+    return clazz(nodes=data["nodes"], edges=data["edges"], cursor=data.get("cursor"))
+
+
+def update_graph(
+    graphSDK: Graph,
+    graph: Union[LineageGraph, CompactLineageGraph],
+    granularity: str = "column",
+    job_ids: set = None,
+) -> Union[LineageGraph, CompactLineageGraph]:
+    """
+        Add the edges that were added since a graph was loaded or updated
+    :param job_ids: Job ids that the graph was loaded with
+    """
+    graph.apply_delta(graphSDK.get_delta(graph.cursor or 0, granularity, job_ids))
+    return graph
 
 
 class BaseModel:
+    """
+        Object returned by the catalog API. The attributes in _fields are
+        stored in slots and read directly. Other attributes and relationships
+        are looked up by __getattr__.
+    """
+
+    __slots__ = ("id", "_session", "_extra", "_relationships")
+    _fields: FrozenSet[str] = frozenset()
+
     def __init__(self, session, attributes, obj_id, relationships):
         self._session = session
-        self._attributes = attributes
-        self._obj_id = obj_id
         self._relationships = relationships
+        self._extra: Optional[Dict[str, Any]] = None
+        self.id = obj_id
+        if attributes:
+            for key, value in attributes.items():
+                if key in self._fields:
+                    setattr(self, key, value)
+                else:
+                    if self._extra is None:
+                        self._extra = {}
+                    self._extra[key] = value
 
     def __getattr__(self, item):
-        logging.debug("Attributes: {}".format(self._attributes))
-        if item == "id":
-            return self._obj_id
-        elif self._attributes and item in self._attributes.keys():
-            return self._attributes[item]
-        elif self._relationships and item in self._relationships.keys():
-            return self._relationships[item]
-        raise AttributeError
+        # Only called for attributes that are not set. Private attributes are
+        # not looked up, as they are not set yet while an object is unpickled.
+        if not item.startswith("_"):
+            if self._extra is not None and item in self._extra:
+                return self._extra[item]
+            if self._relationships and item in self._relationships:
+                return self._relationships[item]
+        raise AttributeError(item)
 
 
 class Source(BaseModel):
-    def __init__(self, session, attributes, obj_id, relationships):
-        super().__init__(session, attributes, obj_id, relationships)
+    __slots__ = (
+        "name",
+        "fqdn",
+        "source_type",
+        "dialect",
+        "uri",
+        "port",
+        "username",
+        "password",
+        "database",
+        "instance",
+        "cluster",
+        "project_id",
+        "project_credentials",
+        "page_size",
+        "filter_key",
+        "included_tables_regex",
+        "key_path",
+        "account",
+        "role",
+        "warehouse",
+    )
+    _fields = frozenset(__slots__)
+
+    name: str
+    fqdn: str
+    source_type: str
 
 
 class Schema(BaseModel):
-    def __init__(self, session, attributes, obj_id, relationships):
-        super().__init__(session, attributes, obj_id, relationships)
+    __slots__ = ("name", "fqdn", "source_id")
+    _fields = frozenset(__slots__)
+
+    name: str
+    fqdn: List[str]
+    source_id: int
 
 
 class Table(BaseModel):
-    def __init__(self, session, attributes, obj_id, relationships):
-        super().__init__(session, attributes, obj_id, relationships)
+    __slots__ = ("name", "fqdn", "schema_id")
+    _fields = frozenset(__slots__)
+
+    name: str
+    fqdn: List[str]
+    schema_id: int
 
 
 class Column(BaseModel):
-    def __init__(self, session, attributes, obj_id, relationships):
-        super().__init__(session, attributes, obj_id, relationships)
+    __slots__ = ("name", "fqdn", "data_type", "sort_order", "pii_type", "table_id")
+    _fields = frozenset(__slots__)
+
+    name: str
+    fqdn: List[str]
+    data_type: str
+    sort_order: int
+    table_id: int
 
 
 class Job(BaseModel):
-    def __init__(self, session, attributes, obj_id, relationships):
-        super().__init__(session, attributes, obj_id, relationships)
+    __slots__ = ("name", "context", "source_id")
+    _fields = frozenset(__slots__)
+
+    name: str
+    context: Dict[str, Any]
+    source_id: int
 
 
 class JobExecution(BaseModel):
-    def __init__(self, session, attributes, obj_id, relationships):
-        super().__init__(session, attributes, obj_id, relationships)
+    __slots__ = ("job_id", "started_at", "ended_at", "status")
+    _fields = frozenset(__slots__)
+
+    job_id: int
+    started_at: str
+    ended_at: str
+    status: str
 
 
 class ColumnLineage(BaseModel):
-    def __init__(self, session, attributes, obj_id, relationships):
-        super().__init__(session, attributes, obj_id, relationships)
+    __slots__ = ("context", "source_id", "target_id", "job_execution_id")
+    _fields = frozenset(__slots__)
+
+    context: Dict[str, Any]
+    source_id: int
+    target_id: int
+    job_execution_id: int
 
 
 class DefaultSchema(BaseModel):
-    def __init__(self, session, attributes, obj_id, relationships):
-        super().__init__(session, attributes, obj_id, relationships)
+    __slots__ = ("source_id", "schema_id")
+    _fields = frozenset(__slots__)
+
+    source_id: int
+    schema_id: int
 
 
 ModelType = TypeVar("ModelType", bound=BaseModel)
 
 
-class Catalog:
-    def __init__(self, url: str):
+def _next_page_url(page: Dict[str, Any]) -> Optional[str]:
+    return page["links"]["next"]
+
+
+class BaseCatalog:
+    """
+        URLs, parameters and payloads of the catalog API, and the objects
+        built from its responses. Shared by Catalog and AsyncCatalog, which
+        send the requests.
+    """
+
+    error_codes: Dict[int, Type[Exception]] = {
+        441: TableNotFound,
+        442: ColumnNotFound,
+        444: SchemaNotFound,
+    }
+
+    def __init__(self, url: str, page_size: int = None):
         self._base_url = furl(url) / "api/v1/catalog"
-        self._session = requests.Session()
-        self._session.headers.update({"Accept": "application/vnd.api+json"})
-        self._session.headers.update({"Content-Type": "application/vnd.api+json"})
+        self._resolve_url = furl(url) / "api/v1/resolve"
+        self._page_size = page_size
 
     def _build_url(self, *urls) -> str:
         built_url = self._base_url
@@ -153,7 +378,7 @@ class Catalog:
             if value["data"]:
                 resolved[key] = self._obj_factory(
                     value["data"],
-                    Catalog.str_to_type[value["data"]["type"]],
+                    BaseCatalog.str_to_type[value["data"]["type"]],
                     resolve_relationships=False,
                 )
 
@@ -176,20 +401,253 @@ class Catalog:
             relationships=resolved,
         )
 
-    def _iterate(self, payload: Dict[str, Any], clazz: Type[BaseModel]):
-        res: Optional[Dict[str, Any]] = payload
-        while res is not None:
-            for item in res["data"]:
-                yield self._obj_factory(payload=item, clazz=clazz)
-
-            if res["links"]["next"] is not None:
-                response = self._session.get(res["links"]["next"])
-                res = response.json()
+    def _page_objects(
+        self, page: Dict[str, Any], clazz: Type[ModelType]
+    ) -> List[ModelType]:
+        return [self._obj_factory(payload=item, clazz=clazz) for item in page["data"]]
+
+    def _list_params(self) -> Dict[str, Any]:
+        params: Dict[str, Any] = {}
+        if self._page_size is not None:
+            params["page[size]"] = self._page_size
+        return params
+
+    @staticmethod
+    def _filter_params(filters) -> Dict[str, str]:
+        return {"filter[objects]": json.dumps(filters)}
+
+    @staticmethod
+    def _source_filters(name: str) -> List[Dict[str, Any]]:
+        return [dict(name="name", op="eq", val="{}".format(name))]
+
+    @staticmethod
+    def _schema_filters(source_name: str, schema_name: str) -> List[Dict[str, Any]]:
+        name_filter = dict(name="name", op="eq", val=schema_name)
+        source_filter = dict(
+            name="source", op="has", val=dict(name="name", op="eq", val=source_name)
+        )
+        return [{"and": [name_filter, source_filter]}]
+
+    @staticmethod
+    def _one(json_response: Dict[str, Any]) -> Dict[str, Any]:
+        logging.debug(json_response)
+        num_results = json_response["meta"]["total"]
+        if num_results == 0:
+            raise NoResultFound
+        elif num_results > 1:
+            raise MultipleResultsFound
+
+        return json_response["data"][0]
+
+    @staticmethod
+    def _post_payload(data: Dict[str, Any], type: str) -> str:
+        return json.dumps({"data": {"type": type, "attributes": data}}, default=str)
+
+    @staticmethod
+    def _patch_payload(obj_id: int, data: Dict[str, Any], type: str) -> str:
+        return json.dumps(
+            {"data": {"type": type, "attributes": data, "id": obj_id}}, default=str
+        )
+
+    @staticmethod
+    def _column_params(
+        source_name: str, schema_name: str, table_name: str, column_name: str
+    ) -> Dict[str, str]:
+        return {
+            "source": source_name,
+            "schema": schema_name,
+            "table": table_name,
+            "column": column_name,
+        }
+
+    @staticmethod
+    def _raise_resolve_error(response):
+        """
+            Raise the exception of the status code of a resolve response
+        """
+        if response.status_code in BaseCatalog.error_codes:
+            raise BaseCatalog.error_codes[response.status_code](
+                response.json()["message"]
+            )
+
+    def _resolve_results(
+        self, payload: Dict[str, Any]
+    ) -> List[Union[Table, Column, Exception]]:
+        results: List[Union[Table, Column, Exception]] = []
+        for result in payload["data"]:
+            if "error" in result:
+                error = result["error"]
+                results.append(BaseCatalog.error_codes[error["code"]](error["message"]))
             else:
-                res = None
+                clazz = Column if result["data"]["type"] == "columns" else Table
+                results.append(self._obj_factory(result["data"], clazz))
+        return results
+
+
+class Catalog(BaseCatalog):
+    def __init__(
+        self,
+        url: str,
+        cache_ttl: float = None,
+        cache_size: int = 1024,
+        page_size: int = None,
+        prefetch: int = 0,
+    ):
+        """
+            Client of the catalog API
+        :param url: URL of the data lineage server
+        :param cache_ttl: Cache sources, schemata, tables and columns for
+            cache_ttl seconds. None to disable the cache.
+        :param cache_size: Maximum number of cache entries. Every object is
+            cached by id and by fully qualified name.
+        :param page_size: Number of objects in a page of a list. None for the
+            default of the server.
+        :param prefetch: Number of pages of a list that are fetched in the
+            background while a page is consumed. 0 to fetch a page when the
+            previous page has been consumed.
+        """
+        super().__init__(url, page_size)
+        self._session = requests.Session()
+        self._session.headers.update({"Accept": "application/vnd.api+json"})
+        self._session.headers.update({"Content-Type": "application/vnd.api+json"})
+        # Sessions of the threads that prefetch pages
+        self._local = threading.local()
+        self._prefetch = prefetch
+        self._cache: Optional[TTLCache] = None
+        if cache_ttl is not None:
+            self._cache = TTLCache(max_size=cache_size, ttl=cache_ttl)
+
+    @staticmethod
+    def _fqdn(fqdn: Union[str, List[str]]) -> Tuple[str, ...]:
+        return (fqdn,) if isinstance(fqdn, str) else tuple(fqdn)
+
+    def _cache_keys(self, path: str, obj: BaseModel) -> List[Tuple[str, Any]]:
+        keys: List[Tuple[str, Any]] = [(path, str(obj.id))]
+        if getattr(obj, "fqdn", None) is not None:
+            keys.append((path, Catalog._fqdn(obj.fqdn)))
+        return keys
+
+    def _cache_get(self, path: str, key: Any) -> Optional[Any]:
+        if self._cache is None:
+            return None
+        return self._cache.get((path, key))
+
+    def _cache_put(self, path: str, obj: ModelType) -> ModelType:
+        if self._cache is not None:
+            for key in self._cache_keys(path, obj):
+                self._cache.put(key, obj)
+        return obj
+
+    def _cache_invalidate(self, path: str, obj: BaseModel):
+        if self._cache is not None:
+            for key in self._cache_keys(path, obj):
+                self._cache.delete(key)
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self._cache.stats() if self._cache is not None else None
+
+    def _iterate(self, payload: Dict[str, Any], clazz: Type[BaseModel]):
+        if self._prefetch < 1 or _next_page_url(payload) is None:
+            pages = self._next_pages(payload)
+        elif payload.get("meta", {}).get("total") is not None:
+            pages = self._numbered_pages(payload)
+        else:
+            pages = self._prefetched_next_pages(payload)
+
+        for page in pages:
+            yield from self._page_objects(page, clazz)
+
+    def _get_page(self, url: str, session: requests.Session = None) -> Dict[str, Any]:
+        response = (session or self._session).get(url)
+        response.raise_for_status()
+        return response.json()
+
+    def _thread_session(self) -> requests.Session:
+        """
+            Session of the current prefetch thread. A requests.Session is not
+            thread safe, so the threads do not share the session of the client.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self._session.headers)
+            self._local.session = session
+        return session
+
+    def _prefetch_page(self, url: str) -> Dict[str, Any]:
+        return self._get_page(url, self._thread_session())
+
+    def _next_pages(self, payload: Dict[str, Any]):
+        page = payload
+        while True:
+            yield page
+            next_url = _next_page_url(page)
+            if next_url is None:
+                return
+            page = self._get_page(next_url)
+
+    def _prefetched_next_pages(self, payload: Dict[str, Any]):
+        """
+            Follow the next links and fetch the next page while the current
+            page is consumed
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            page = payload
+            while _next_page_url(page) is not None:
+                future = executor.submit(self._prefetch_page, _next_page_url(page))
+                yield page
+                page = future.result()
+            yield page
+
+    def _numbered_pages(self, payload: Dict[str, Any]):
+        """
+            Compute the number of pages from meta.total and fetch up to prefetch
+            pages in parallel by page number. Pages are returned in order.
+        """
+        page_size = len(payload["data"])
+        num_pages = math.ceil(payload["meta"]["total"] / page_size)
+        next_url = furl(_next_page_url(payload))
+        logging.debug("Fetch {} pages of {}".format(num_pages, page_size))
+
+        def page_url(number: int) -> str:
+            url = furl(next_url)
+            url.args["page[number]"] = number
+            return url.url
+
+        executor = ThreadPoolExecutor(max_workers=self._prefetch)
+        futures: Deque[Future] = deque()
+        try:
+            for number in range(2, min(num_pages, self._prefetch + 1) + 1):
+                futures.append(executor.submit(self._prefetch_page, page_url(number)))
+            next_number = len(futures) + 2
+
+            yield payload
+            while futures:
+                page = futures.popleft().result()
+                if next_number <= num_pages:
+                    futures.append(
+                        executor.submit(self._prefetch_page, page_url(next_number))
+                    )
+                    next_number += 1
+                yield page
+        finally:
+            # Pages that are not fetched yet are cancelled when the caller
+            # stops early. Wait for the requests in flight, so that none is
+            # left running after the generator is closed.
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _list_params(self) -> Dict[str, Any]:
+        params = super()._list_params()
+        if self._prefetch > 0:
+            # Pages that are fetched by number need a stable order
+            params["sort"] = "id"
+        return params
 
     def _index(self, path: str, clazz: Type[BaseModel]):
-        response = self._session.get(self._build_url(path))
+        response = self._session.get(self._build_url(path), params=self._list_params())
+        response.raise_for_status()
         logging.debug(response.json())
         return self._iterate(response.json(), clazz)
 
@@ -208,34 +666,22 @@ class Catalog:
             json_response["data"], clazz, resolve_relationships=resolve_relationships
         )
 
-    @staticmethod
-    def _one(response):
-        json_response = response.json()
-        logging.debug(json_response)
-        num_results = json_response["meta"]["total"]
-        if num_results == 0:
-            raise NoResultFound
-        elif num_results > 1:
-            raise MultipleResultsFound
-
-        return json_response["data"][0]
-
     def _search_one(self, path: str, filters):
-        params = {"filter[objects]": json.dumps(filters)}
-        response = self._session.get(self._build_url(path), params=params)
+        response = self._session.get(
+            self._build_url(path), params=self._filter_params(filters)
+        )
         response.raise_for_status()
-        return Catalog._one(response)
+        return self._one(response.json())
 
     def _search(self, path: str, search_string: str, clazz: Type[BaseModel]):
         filters = [dict(name="name", op="like", val="%{}%".format(search_string))]
-        params = {"filter[objects]": json.dumps(filters)}
+        params = {**self._filter_params(filters), **self._list_params()}
         response = self._session.get(self._build_url(path), params=params)
         return self._iterate(response.json(), clazz)
 
     def _post(self, path: str, data: Dict[str, Any], type: str) -> Dict[Any, Any]:
-        payload = {"data": {"type": type, "attributes": data}}
         response = self._session.post(
-            url=self._build_url(path), data=json.dumps(payload, default=str)
+            url=self._build_url(path), data=self._post_payload(data, type)
         )
         response.raise_for_status()
         logging.debug(response.text)
@@ -243,10 +689,9 @@ class Catalog:
         return json_response["data"]
 
     def _patch(self, path: str, obj_id: int, data: Dict[str, Any], type: str):
-        payload = {"data": {"type": type, "attributes": data, "id": obj_id}}
         response = self._session.patch(
             url=self._build_url(path, str(obj_id)),
-            data=json.dumps(payload, default=str),
+            data=self._patch_payload(obj_id, data, type),
         )
         response.raise_for_status()
         return
@@ -273,16 +718,28 @@ class Catalog:
         return self._index("column_lineages", ColumnLineage)
 
     def get_source_by_id(self, obj_id) -> Source:
-        return self._get("sources", obj_id, Source)
+        cached = self._cache_get("sources", str(obj_id))
+        if cached is not None:
+            return cached
+        return self._cache_put("sources", self._get("sources", obj_id, Source))
 
     def get_schema_by_id(self, obj_id) -> Schema:
-        return self._get("schemata", obj_id, Schema)
+        cached = self._cache_get("schemata", str(obj_id))
+        if cached is not None:
+            return cached
+        return self._cache_put("schemata", self._get("schemata", obj_id, Schema))
 
     def get_table_by_id(self, obj_id) -> Table:
-        return self._get("tables", obj_id, Table)
+        cached = self._cache_get("tables", str(obj_id))
+        if cached is not None:
+            return cached
+        return self._cache_put("tables", self._get("tables", obj_id, Table))
 
     def get_column_by_id(self, obj_id) -> Column:
-        return self._get("columns", obj_id, Column)
+        cached = self._cache_get("columns", str(obj_id))
+        if cached is not None:
+            return cached
+        return self._cache_put("columns", self._get("columns", obj_id, Column))
 
     def get_job_by_id(self, obj_id) -> Job:
         return self._get("jobs", obj_id, Job)
@@ -306,81 +763,98 @@ class Catalog:
         ]
 
     def get_source(self, name) -> Source:
-        filters = [dict(name="name", op="eq", val="{}".format(name))]
+        cached = self._cache_get("sources", (name,))
+        if cached is not None:
+            return cached
+
         try:
-            payload = self._search_one("sources", filters)
+            payload = self._search_one("sources", self._source_filters(name))
         except NoResultFound:
             raise SourceNotFound("Source not found: source_name={}".format(name))
 
-        return self._obj_factory(payload, Source)
+        return self._cache_put("sources", self._obj_factory(payload, Source))
 
     def get_schema(self, source_name: str, schema_name: str) -> Schema:
-        name_filter = dict(name="name", op="eq", val=schema_name)
-        source_filter = dict(
-            name="source", op="has", val=dict(name="name", op="eq", val=source_name)
-        )
-        filters = {"and": [name_filter, source_filter]}
+        cached = self._cache_get("schemata", (source_name, schema_name))
+        if cached is not None:
+            return cached
+
+        filters = self._schema_filters(source_name, schema_name)
         logging.debug(filters)
         try:
-            payload = self._search_one("schemata", [filters])
+            payload = self._search_one("schemata", filters)
         except NoResultFound:
             raise SchemaNotFound(
                 "Schema not found, (source_name={}, schema_name={})".format(
                     source_name, schema_name
                 )
             )
-        return self._obj_factory(payload, Schema)
+        return self._cache_put("schemata", self._obj_factory(payload, Schema))
+
+    def _resolve(self, params: Dict[str, str], clazz: Type[ModelType]) -> ModelType:
+        response = self._session.get(self._resolve_url, params=params)
+        logging.debug(response.text)
+        self._raise_resolve_error(response)
+        response.raise_for_status()
+        return self._obj_factory(response.json()["data"], clazz)
 
     def get_table(self, source_name: str, schema_name: str, table_name: str) -> Table:
-        schema = self.get_schema(source_name, schema_name)
+        cached = self._cache_get("tables", (source_name, schema_name, table_name))
+        if cached is not None:
+            return cached
 
-        name_filter = dict(name="name", op="eq", val=table_name)
-        schema_id_filter = dict(name="schema_id", op="eq", val=str(schema.id))
-        filters = {"and": [name_filter, schema_id_filter]}
-        logging.debug(filters)
-        try:
-            payload = self._search_one("tables", [filters])
-        except NoResultFound:
-            raise TableNotFound(
-                "Table not found, (source_name={}, schema_name={}, table_name={})".format(
-                    source_name, schema_name, table_name
-                )
-            )
-        return self._obj_factory(payload, Table)
+        params = {"source": source_name, "schema": schema_name, "table": table_name}
+        return self._cache_put("tables", self._resolve(params, Table))
 
     def get_columns_for_table(self, table: Table):
         return self._index("tables/{}/columns".format(table.id), Column)
 
     def get_column(self, source_name, schema_name, table_name, column_name) -> Column:
-        table = self.get_table(source_name, schema_name, table_name)
-        name_filter = dict(name="name", op="eq", val=column_name)
-        table_filter = dict(name="table_id", op="eq", val=str(table.id))
-        filters = {"and": [name_filter, table_filter]}
-        logging.debug(filters)
-        try:
-            payload = self._search_one("columns", [filters])
-        except NoResultFound:
-            raise ColumnNotFound(
-                "Column not found, (source_name={}, schema_name={}, table_name={}, column_name={})".format(
-                    source_name, schema_name, table_name, column_name
-                )
-            )
-        return self._obj_factory(payload, Column)
+        cached = self._cache_get(
+            "columns", (source_name, schema_name, table_name, column_name)
+        )
+        if cached is not None:
+            return cached
+
+        params = self._column_params(source_name, schema_name, table_name, column_name)
+        return self._cache_put("columns", self._resolve(params, Column))
+
+    def resolve(self, names: List[List[str]]) -> List[Union[Table, Column, Exception]]:
+        """
+            Get tables and columns by their fully qualified names in one request
+        :param names: List of [source, schema, table] for tables and
+            [source, schema, table, column] for columns
+        :return: a table, column or the exception raised for every name, in the
+            same order as names
+        """
+        response = self._session.post(
+            furl(self._resolve_url) / "batch", json={"names": names}
+        )
+        logging.debug(response.text)
+        response.raise_for_status()
+
+        results = self._resolve_results(response.json())
+        for result in results:
+            if isinstance(result, Column):
+                self._cache_put("columns", result)
+            elif isinstance(result, Table):
+                self._cache_put("tables", result)
+        return results
 
     def add_source(self, name: str, source_type: str, **kwargs) -> Source:
         data = {"name": name, "source_type": source_type, **kwargs}
         payload = self._post(path="sources", data=data, type="sources")
-        return self._obj_factory(payload, Source)
+        return self._cache_put("sources", self._obj_factory(payload, Source))
 
     def add_schema(self, name: str, source: Source) -> Schema:
         data = {"name": name, "source_id": source.id}
         payload = self._post(path="schemata", data=data, type="schemata")
-        return self._obj_factory(payload, Schema)
+        return self._cache_put("schemata", self._obj_factory(payload, Schema))
 
     def add_table(self, name: str, schema: Schema) -> Table:
         data = {"name": name, "schema_id": schema.id}
         payload = self._post(path="tables", data=data, type="tables")
-        return self._obj_factory(payload, Table)
+        return self._cache_put("tables", self._obj_factory(payload, Table))
 
     def add_column(
         self, name: str, data_type: str, sort_order: int, table: Table
@@ -392,7 +866,7 @@ class Catalog:
             "sort_order": sort_order,
         }
         payload = self._post(path="columns", data=data, type="columns")
-        return self._obj_factory(payload, Column)
+        return self._cache_put("columns", self._obj_factory(payload, Column))
 
     def add_job(self, name: str, context: Dict[Any, Any]) -> Job:
         data = {"name": name, "context": context}
@@ -432,6 +906,7 @@ class Catalog:
         return self._obj_factory(payload, ColumnLineage)
 
     def update_source(self, source: Source, schema: Schema) -> DefaultSchema:
+        self._cache_invalidate("sources", source)
         try:
             current_obj = self._get(
                 path="default_schema",
@@ -465,6 +940,13 @@ class Catalog:
 
 
 class Analyze:
+    error_codes: Dict[int, Type[Exception]] = {
+        441: TableNotFound,
+        442: ColumnNotFound,
+        422: ParseError,
+        443: SemanticError,
+    }
+
     def __init__(self, url: str):
         self._base_url = furl(url) / "api/v1/analyze"
         self._session = requests.Session()
@@ -486,18 +968,52 @@ class Analyze:
         }
 
         response = self._session.post(self._base_url, json=payload,)
-        if response.status_code == 441:
-            raise TableNotFound(response.json()["message"])
-        elif response.status_code == 442:
-            raise ColumnNotFound(response.json()["message"])
-        elif response.status_code == 422:
-            raise ParseError(response.json()["message"])
-        elif response.status_code == 443:
-            raise SemanticError(response.json()["message"])
+        if response.status_code in Analyze.error_codes:
+            raise Analyze.error_codes[response.status_code](response.json()["message"])
 
         logging.debug(response.text)
         response.raise_for_status()
-        payload = response.json()["data"]
+        return self._job_execution(response.json()["data"])
+
+    def analyze_many(
+        self, queries: List[Dict[str, Any]], source: Source, batch_size: int = 1000,
+    ) -> List[Union[JobExecution, Exception]]:
+        """
+            Analyze a list of queries in batches. Every query is a dict with the
+            same keys as the arguments of analyze(), i.e. query, name, start_time
+            and end_time.
+        :return: a job execution or the exception raised for every query, in the
+            same order as queries.
+        """
+        results: List[Union[JobExecution, Exception]] = []
+        for start in range(0, len(queries), batch_size):
+            payload = {
+                "source_id": source.id,
+                "queries": [
+                    {
+                        "query": query["query"],
+                        "name": query.get("name"),
+                        "start_time": query["start_time"].isoformat(),
+                        "end_time": query["end_time"].isoformat(),
+                    }
+                    for query in queries[start : start + batch_size]
+                ],
+            }
+            response = self._session.post(furl(self._base_url) / "batch", json=payload)
+            logging.debug(response.text)
+            response.raise_for_status()
+
+            for result in response.json()["data"]:
+                if "error" in result:
+                    error = result["error"]
+                    clazz = Analyze.error_codes.get(error["code"], SemanticError)
+                    results.append(clazz(error["message"]))
+                else:
+                    results.append(self._job_execution(result["data"]))
+
+        return results
+
+    def _job_execution(self, payload: Dict[str, Any]) -> JobExecution:
         return JobExecution(
             session=self._session,
             attributes=payload.get("attributes"),
@@ -520,28 +1036,126 @@ class Parse:
         return response.json()
 
 
-class Scan:
+class BaseScan:
+    """
+        URLs and parameters of the scan API. Shared by Scan and AsyncScan.
+    """
+
     def __init__(self, url: str):
         self._base_url = furl(url) / "api/v1/scan"
+
+    def _job_url(self, job_id: str, *paths: str) -> furl:
+        url = furl(self._base_url) / job_id
+        for path in paths:
+            url = url / path
+        return url
+
+    @staticmethod
+    def _start_payload(
+        source: Source, batch_size: Optional[int], incremental: bool
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"id": source.id, "incremental": incremental}
+        if batch_size is not None:
+            payload["batch_size"] = batch_size
+        return payload
+
+    @staticmethod
+    def _list_params(
+        source: Optional[Source],
+        status: Optional[str],
+        since: Optional[datetime.datetime],
+        until: Optional[datetime.datetime],
+        page_size: Optional[int],
+    ) -> Dict[str, Any]:
+        params: Dict[str, Any] = {}
+        if source is not None:
+            params["source_id"] = source.id
+        if status is not None:
+            params["status"] = status
+        if since is not None:
+            params["since"] = since.isoformat()
+        if until is not None:
+            params["until"] = until.isoformat()
+        if page_size is not None:
+            params["page[size]"] = page_size
+        return params
+
+
+class Scan(BaseScan):
+    def __init__(self, url: str):
+        super().__init__(url)
         self._session = requests.Session()
 
-    def start(self, source: Source) -> Dict[str, str]:
-        payload = {"id": source.id}
-        response = self._session.post(url=self._base_url, json=payload)
+    def start(
+        self, source: Source, batch_size: int = None, incremental: bool = False
+    ) -> Dict[str, str]:
+        """
+            Start a scan of a source
+        :param batch_size: Number of tables of a schema that are added to the
+            catalog by a job. None for the default of the server.
+        :param incremental: Only write the tables whose columns changed since
+            the last scan
+        """
+        response = self._session.post(
+            url=self._base_url,
+            json=self._start_payload(source, batch_size, incremental),
+        )
         response.raise_for_status()
         return response.json()
 
-    def list(self) -> List[Dict[str, str]]:
-        response = self._session.post(url=self._base_url)
+    def list(
+        self,
+        source: Source = None,
+        status: str = None,
+        since: datetime.datetime = None,
+        until: datetime.datetime = None,
+        page_size: int = None,
+    ) -> Generator[Dict[str, Any], None, None]:
+        """
+            Scans queued in a time window, newest first. The pages of the list
+            are fetched as it is iterated.
+        :param source: Only the scans of a source
+        :param status: Only the scans whose job has this status, e.g. failed
+        :param since: Only the scans queued at or after this time. Times
+            without a timezone are in UTC.
+        :param until: Only the scans queued at or before this time
+        :param page_size: Number of scans in a page. None for the default of
+            the server.
+        """
+        response = self._session.get(
+            url=self._base_url,
+            params=self._list_params(source, status, since, until, page_size),
+        )
+        response.raise_for_status()
+        page = response.json()
+        while True:
+            yield from page["data"]
+            next_url = _next_page_url(page)
+            if next_url is None:
+                return
+            response = self._session.get(url=next_url)
+            response.raise_for_status()
+            page = response.json()
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        """
+            Status of a scan. progress has the number of schemas done out of
+            schemas_total, tables scanned, tables_per_second and rows_written,
+            and updated_at, the time the last batch of tables was added.
+        """
+        response = self._session.get(url=self._job_url(job_id))
         response.raise_for_status()
         return response.json()
 
-    def get(self, job_id: str) -> Dict[str, str]:
-        response = self._session.get(url=furl(self._base_url) / job_id)
+    def cancel(self, job_id: str) -> Dict[str, str]:
+        response = self._session.put(url=self._job_url(job_id))
         response.raise_for_status()
         return response.json()
 
-    def cancel(self, job_id: str) -> Dict[str, str]:
-        response = self._session.put(url=furl(self._base_url) / job_id)
+    def resume(self, job_id: str) -> Dict[str, Any]:
+        """
+            Queue the batches of a scan that failed or were cancelled
+        """
+        response = self._session.post(url=self._job_url(job_id, "resume"))
         response.raise_for_status()
         return response.json()
@@ -1,13 +1,15 @@
 import logging
+import os
 
 import click
 from redis import Redis
 
 from data_lineage import __version__
+from data_lineage.ingest import ingest_file
 from data_lineage.server import create_server
 
 
-@click.command()
+@click.group(invoke_without_command=True)
 @click.version_option(__version__)
 @click.option(
     "-l", "--log-level", envvar="LOG_LEVEL", help="Logging Level", default="INFO"
@@ -47,7 +49,9 @@ from data_lineage.server import create_server
     help="Run server in development mode",
     default=True,
 )
+@click.pass_context
 def main(
+    ctx,
     log_level,
     catalog_user,
     catalog_password,
@@ -66,6 +70,13 @@ def main(
         "port": catalog_port,
         "database": catalog_db,
     }
+    if ctx.invoked_subcommand is not None:
+        ctx.obj = {
+            "catalog": catalog,
+            "redis": {"host": redis_host, "port": redis_port},
+        }
+        return
+
     connection = Redis(redis_host, redis_port)
     app, catalog = create_server(
         catalog, connection=connection, is_production=is_production
@@ -76,5 +87,39 @@ def main(
         app.run(debug=True)
 
 
+@main.command()
+@click.option(
+    "--source", "source_name", help="Name of the source of the queries", required=True
+)
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(["jsonl", "csv"]),
+    help="Format of the query log. Inferred from the file extension by default",
+)
+@click.option(
+    "--workers",
+    help="Number of parse worker processes",
+    type=int,
+    default=os.cpu_count() or 1,
+)
+@click.option(
+    "--batch-size", help="Number of queries per catalog write", type=int, default=500
+)
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.pass_obj
+def ingest(options, source_name, file_format, workers, batch_size, path):
+    """Analyze all queries in a JSONL or CSV query log."""
+    ingest_file(
+        catalog_options=options["catalog"],
+        source_name=source_name,
+        path=path,
+        file_format=file_format,
+        workers=workers,
+        batch_size=batch_size,
+        redis_options=options["redis"],
+    )
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,582 @@
+"""
+    asyncio clients of the catalog, analyze, parse and scan APIs. The clients
+    have the same methods as the blocking clients in data_lineage but every
+    method is a coroutine. All the requests of a client share a pool of
+    connections and at most max_concurrency requests are in flight at a time,
+    so that many coroutines can be gathered without overloading the server:
+
+        async with AsyncAnalyze(url) as analyze:
+            results = await asyncio.gather(
+                *[analyze.analyze(**query, source=source) for query in queries],
+                return_exceptions=True,
+            )
+
+    Requires httpx.
+"""
+import asyncio
+import datetime
+import logging
+from typing import Any, AsyncGenerator, Dict, List, Optional, Type, Union
+
+from dbcat.catalog.models import JobExecutionStatus
+from furl import furl
+
+from data_lineage import (
+    Analyze,
+    BaseCatalog,
+    BaseScan,
+    Column,
+    ColumnLineage,
+    DefaultSchema,
+    Job,
+    JobExecution,
+    ModelType,
+    NoResultFound,
+    Schema,
+    SchemaNotFound,
+    SemanticError,
+    Source,
+    SourceNotFound,
+    Table,
+    _next_page_url,
+)
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class AsyncClient:
+    """
+        Base class of the asyncio clients.
+    :param url: URL of the data lineage server
+    :param max_concurrency: Maximum number of requests in flight. It is also
+        the size of the connection pool.
+    :param max_retries: Number of times a request is retried. Requests that
+        may have reached the server are only retried if they are idempotent.
+    :param backoff: Seconds to wait before the first retry. The wait is
+        doubled after every retry.
+    """
+
+    # Retried for every method. The server did not process the request.
+    RETRY_ERRORS = ("ConnectError", "ConnectTimeout", "PoolTimeout")
+    RETRY_STATUS = (503,)
+    # Retried only for idempotent methods
+    IDEMPOTENT_METHODS = ("GET", "PUT", "PATCH", "DELETE")
+    IDEMPOTENT_RETRY_STATUS = (502, 503, 504)
+
+    def __init__(
+        self,
+        url: str,
+        max_concurrency: int = 10,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 30.0,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        if httpx is None:
+            raise ImportError("httpx is required for the asyncio clients")
+
+        self._url = url
+        self._max_concurrency = max_concurrency
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session = httpx.AsyncClient(
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._session.aclose()
+
+    def _retryable(self, method: str, attempt: int, error=None, response=None):
+        if attempt >= self._max_retries:
+            return False
+        idempotent = method in AsyncClient.IDEMPOTENT_METHODS
+        if error is not None:
+            return idempotent or type(error).__name__ in AsyncClient.RETRY_ERRORS
+        return response.status_code in AsyncClient.RETRY_STATUS or (
+            idempotent and response.status_code in AsyncClient.IDEMPOTENT_RETRY_STATUS
+        )
+
+    async def _request(self, method: str, url, **kwargs) -> "httpx.Response":
+        # The semaphore is created in the event loop that sends the requests
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                try:
+                    response = await self._session.request(method, str(url), **kwargs)
+                except httpx.TransportError as error:
+                    if not self._retryable(method, attempt, error=error):
+                        raise
+                    logging.debug("Retry {} {}: {}".format(method, url, error))
+                else:
+                    if not self._retryable(method, attempt, response=response):
+                        return response
+                    logging.debug(
+                        "Retry {} {}: {}".format(method, url, response.status_code)
+                    )
+
+            await asyncio.sleep(self._backoff * 2 ** attempt)
+            attempt += 1
+
+
+class AsyncCatalog(AsyncClient, BaseCatalog):
+    """
+        asyncio client of the catalog API
+    :param page_size: Number of objects in a page of a list. None for the
+        default of the server.
+    """
+
+    def __init__(self, url: str, page_size: int = None, **kwargs):
+        headers = {
+            "Accept": "application/vnd.api+json",
+            "Content-Type": "application/vnd.api+json",
+        }
+        AsyncClient.__init__(self, url, headers=headers, **kwargs)
+        BaseCatalog.__init__(self, url, page_size)
+
+    async def _get_page(self, url: str) -> Dict[str, Any]:
+        response = await self._request("GET", url)
+        response.raise_for_status()
+        return response.json()
+
+    async def _iterate(
+        self, page: Dict[str, Any], clazz: Type[ModelType]
+    ) -> AsyncGenerator[ModelType, None]:
+        while True:
+            for obj in self._page_objects(page, clazz):
+                yield obj
+            next_url = _next_page_url(page)
+            if next_url is None:
+                return
+            page = await self._get_page(next_url)
+
+    async def _index(self, path: str, clazz: Type[ModelType]):
+        response = await self._request(
+            "GET", self._build_url(path), params=self._list_params()
+        )
+        response.raise_for_status()
+        async for obj in self._iterate(response.json(), clazz):
+            yield obj
+
+    async def _get(
+        self,
+        path: str,
+        obj_id: int,
+        clazz: Type[ModelType],
+        resolve_relationships=False,
+    ) -> ModelType:
+        response = await self._request("GET", self._build_url(path, str(obj_id)))
+        logging.debug(response.text)
+        response.raise_for_status()
+        return self._obj_factory(
+            response.json()["data"], clazz, resolve_relationships=resolve_relationships
+        )
+
+    async def _search_one(self, path: str, filters):
+        response = await self._request(
+            "GET", self._build_url(path), params=self._filter_params(filters)
+        )
+        response.raise_for_status()
+        return self._one(response.json())
+
+    async def _post(self, path: str, data: Dict[str, Any], type: str) -> Dict[Any, Any]:
+        response = await self._request(
+            "POST", self._build_url(path), content=self._post_payload(data, type)
+        )
+        logging.debug(response.text)
+        response.raise_for_status()
+        return response.json()["data"]
+
+    async def _patch(self, path: str, obj_id: int, data: Dict[str, Any], type: str):
+        response = await self._request(
+            "PATCH",
+            self._build_url(path, str(obj_id)),
+            content=self._patch_payload(obj_id, data, type),
+        )
+        response.raise_for_status()
+
+    def get_sources(self) -> AsyncGenerator[Source, None]:
+        return self._index("sources", Source)
+
+    def get_schemata(self) -> AsyncGenerator[Schema, None]:
+        return self._index("schemata", Schema)
+
+    def get_tables(self) -> AsyncGenerator[Table, None]:
+        return self._index("tables", Table)
+
+    def get_columns(self) -> AsyncGenerator[Column, None]:
+        return self._index("columns", Column)
+
+    def get_jobs(self) -> AsyncGenerator[Job, None]:
+        return self._index("jobs", Job)
+
+    def get_job_executions(self) -> AsyncGenerator[JobExecution, None]:
+        return self._index("job_executions", JobExecution)
+
+    def get_column_lineages(self) -> AsyncGenerator[ColumnLineage, None]:
+        return self._index("column_lineages", ColumnLineage)
+
+    def get_columns_for_table(self, table: Table) -> AsyncGenerator[Column, None]:
+        return self._index("tables/{}/columns".format(table.id), Column)
+
+    async def get_source_by_id(self, obj_id) -> Source:
+        return await self._get("sources", obj_id, Source)
+
+    async def get_schema_by_id(self, obj_id) -> Schema:
+        return await self._get("schemata", obj_id, Schema)
+
+    async def get_table_by_id(self, obj_id) -> Table:
+        return await self._get("tables", obj_id, Table)
+
+    async def get_column_by_id(self, obj_id) -> Column:
+        return await self._get("columns", obj_id, Column)
+
+    async def get_job_by_id(self, obj_id) -> Job:
+        return await self._get("jobs", obj_id, Job)
+
+    async def get_job_execution_by_id(self, obj_id) -> JobExecution:
+        return await self._get("job_executions", obj_id, JobExecution)
+
+    async def get_column_lineage(self, job_ids: List[int]) -> List[ColumnLineage]:
+        response = await self._request(
+            "GET", self._build_url("column_lineage"), params={"job_ids": job_ids}
+        )
+        response.raise_for_status()
+        return [
+            ColumnLineage(
+                session=self._session,
+                attributes=item["attributes"],
+                obj_id=item["id"],
+                relationships=item["relationships"],
+            )
+            for item in response.json()["data"]
+        ]
+
+    async def get_source(self, name) -> Source:
+        try:
+            payload = await self._search_one("sources", self._source_filters(name))
+        except NoResultFound:
+            raise SourceNotFound("Source not found: source_name={}".format(name))
+
+        return self._obj_factory(payload, Source)
+
+    async def get_schema(self, source_name: str, schema_name: str) -> Schema:
+        filters = self._schema_filters(source_name, schema_name)
+        try:
+            payload = await self._search_one("schemata", filters)
+        except NoResultFound:
+            raise SchemaNotFound(
+                "Schema not found, (source_name={}, schema_name={})".format(
+                    source_name, schema_name
+                )
+            )
+        return self._obj_factory(payload, Schema)
+
+    async def _resolve(
+        self, params: Dict[str, str], clazz: Type[ModelType]
+    ) -> ModelType:
+        response = await self._request("GET", self._resolve_url, params=params)
+        logging.debug(response.text)
+        self._raise_resolve_error(response)
+        response.raise_for_status()
+        return self._obj_factory(response.json()["data"], clazz)
+
+    async def get_table(
+        self, source_name: str, schema_name: str, table_name: str
+    ) -> Table:
+        params = {"source": source_name, "schema": schema_name, "table": table_name}
+        return await self._resolve(params, Table)
+
+    async def get_column(
+        self, source_name, schema_name, table_name, column_name
+    ) -> Column:
+        params = self._column_params(source_name, schema_name, table_name, column_name)
+        return await self._resolve(params, Column)
+
+    async def resolve(
+        self, names: List[List[str]]
+    ) -> List[Union[Table, Column, Exception]]:
+        """
+            Get tables and columns by their fully qualified names in one request
+        :return: a table, column or the exception raised for every name, in the
+            same order as names
+        """
+        response = await self._request(
+            "POST", furl(self._resolve_url) / "batch", json={"names": names}
+        )
+        logging.debug(response.text)
+        response.raise_for_status()
+        return self._resolve_results(response.json())
+
+    async def add_source(self, name: str, source_type: str, **kwargs) -> Source:
+        data = {"name": name, "source_type": source_type, **kwargs}
+        payload = await self._post(path="sources", data=data, type="sources")
+        return self._obj_factory(payload, Source)
+
+    async def add_schema(self, name: str, source: Source) -> Schema:
+        data = {"name": name, "source_id": source.id}
+        payload = await self._post(path="schemata", data=data, type="schemata")
+        return self._obj_factory(payload, Schema)
+
+    async def add_table(self, name: str, schema: Schema) -> Table:
+        data = {"name": name, "schema_id": schema.id}
+        payload = await self._post(path="tables", data=data, type="tables")
+        return self._obj_factory(payload, Table)
+
+    async def add_column(
+        self, name: str, data_type: str, sort_order: int, table: Table
+    ) -> Column:
+        data = {
+            "name": name,
+            "table_id": table.id,
+            "data_type": data_type,
+            "sort_order": sort_order,
+        }
+        payload = await self._post(path="columns", data=data, type="columns")
+        return self._obj_factory(payload, Column)
+
+    async def add_job(self, name: str, context: Dict[Any, Any]) -> Job:
+        data = {"name": name, "context": context}
+        payload = await self._post(path="jobs", data=data, type="jobs")
+        return self._obj_factory(payload, Job)
+
+    async def add_job_execution(
+        self,
+        job: Job,
+        started_at: datetime.datetime,
+        ended_at: datetime.datetime,
+        status: JobExecutionStatus,
+    ) -> JobExecution:
+        data = {
+            "job_id": job.id,
+            "started_at": started_at,
+            "ended_at": ended_at,
+            "status": status.name,
+        }
+        payload = await self._post(
+            path="job_executions", data=data, type="job_executions"
+        )
+        return self._obj_factory(payload, JobExecution)
+
+    async def add_column_lineage(
+        self,
+        source: Column,
+        target: Column,
+        job_execution_id: int,
+        context: Dict[Any, Any],
+    ) -> ColumnLineage:
+        data = {
+            "source_id": source.id,
+            "target_id": target.id,
+            "job_execution_id": job_execution_id,
+            "context": context,
+        }
+        payload = await self._post(
+            path="column_lineage", data=data, type="column_lineage"
+        )
+        return self._obj_factory(payload, ColumnLineage)
+
+    async def update_source(self, source: Source, schema: Schema) -> DefaultSchema:
+        try:
+            current_obj = await self._get(
+                path="default_schema",
+                obj_id=source.id,
+                clazz=DefaultSchema,
+                resolve_relationships=True,
+            )
+            if current_obj.schema.id == schema.id:
+                return current_obj
+        except httpx.HTTPStatusError as error:
+            if error.response.status_code != 404:
+                raise
+            data = {"source_id": source.id, "schema_id": schema.id}
+            payload = await self._post(
+                path="default_schema", data=data, type="default_schema"
+            )
+            return self._obj_factory(payload, DefaultSchema, resolve_relationships=True)
+
+        # Patch
+        data = {"schema_id": schema.id}
+        await self._patch(
+            path="default_schema", data=data, type="default_schema", obj_id=source.id
+        )
+        return await self._get(
+            path="default_schema",
+            obj_id=source.id,
+            clazz=DefaultSchema,
+            resolve_relationships=True,
+        )
+
+
+class AsyncAnalyze(AsyncClient):
+    def __init__(self, url: str, **kwargs):
+        super().__init__(url, **kwargs)
+        self._base_url = furl(url) / "api/v1/analyze"
+
+    async def analyze(
+        self,
+        query: str,
+        source: Source,
+        start_time: datetime.datetime,
+        end_time: datetime.datetime,
+        name: str = None,
+    ) -> JobExecution:
+        payload = {
+            "query": query,
+            "name": name,
+            "source_id": source.id,
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+        }
+
+        response = await self._request("POST", self._base_url, json=payload)
+        if response.status_code in Analyze.error_codes:
+            raise Analyze.error_codes[response.status_code](response.json()["message"])
+
+        logging.debug(response.text)
+        response.raise_for_status()
+        return self._job_execution(response.json()["data"])
+
+    async def analyze_many(
+        self, queries: List[Dict[str, Any]], source: Source, batch_size: int = 1000,
+    ) -> List[Union[JobExecution, Exception]]:
+        """
+            Analyze a list of queries in batches. The batches are sent
+            concurrently.
+        :return: a job execution or the exception raised for every query, in the
+            same order as queries.
+        """
+        batches = await asyncio.gather(
+            *[
+                self._analyze_batch(queries[start : start + batch_size], source)
+                for start in range(0, len(queries), batch_size)
+            ]
+        )
+        return [result for batch in batches for result in batch]
+
+    async def _analyze_batch(
+        self, queries: List[Dict[str, Any]], source: Source
+    ) -> List[Union[JobExecution, Exception]]:
+        payload = {
+            "source_id": source.id,
+            "queries": [
+                {
+                    "query": query["query"],
+                    "name": query.get("name"),
+                    "start_time": query["start_time"].isoformat(),
+                    "end_time": query["end_time"].isoformat(),
+                }
+                for query in queries
+            ],
+        }
+        response = await self._request(
+            "POST", furl(self._base_url) / "batch", json=payload
+        )
+        logging.debug(response.text)
+        response.raise_for_status()
+
+        results: List[Union[JobExecution, Exception]] = []
+        for result in response.json()["data"]:
+            if "error" in result:
+                error = result["error"]
+                clazz = Analyze.error_codes.get(error["code"], SemanticError)
+                results.append(clazz(error["message"]))
+            else:
+                results.append(self._job_execution(result["data"]))
+        return results
+
+    def _job_execution(self, payload: Dict[str, Any]) -> JobExecution:
+        return JobExecution(
+            session=self._session,
+            attributes=payload.get("attributes"),
+            obj_id=payload.get("id"),
+            relationships=None,
+        )
+
+
+class AsyncParse(AsyncClient):
+    def __init__(self, url: str, **kwargs):
+        super().__init__(url, **kwargs)
+        self._base_url = furl(url) / "api/v1/parse"
+
+    async def parse(self, query: str, source: Source):
+        response = await self._request(
+            "POST", self._base_url, json={"query": query, "source_id": source.id}
+        )
+        logging.debug(response.text)
+        response.raise_for_status()
+        return response.json()
+
+
+class AsyncScan(AsyncClient, BaseScan):
+    def __init__(self, url: str, **kwargs):
+        AsyncClient.__init__(self, url, **kwargs)
+        BaseScan.__init__(self, url)
+
+    async def start(
+        self, source: Source, batch_size: int = None, incremental: bool = False
+    ) -> Dict[str, str]:
+        response = await self._request(
+            "POST",
+            self._base_url,
+            json=self._start_payload(source, batch_size, incremental),
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def list(
+        self,
+        source: Source = None,
+        status: str = None,
+        since: datetime.datetime = None,
+        until: datetime.datetime = None,
+        page_size: int = None,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        response = await self._request(
+            "GET",
+            self._base_url,
+            params=self._list_params(source, status, since, until, page_size),
+        )
+        response.raise_for_status()
+        page = response.json()
+        while True:
+            for item in page["data"]:
+                yield item
+            next_url = _next_page_url(page)
+            if next_url is None:
+                return
+            response = await self._request("GET", next_url)
+            response.raise_for_status()
+            page = response.json()
+
+    async def get(self, job_id: str) -> Dict[str, Any]:
+        response = await self._request("GET", self._job_url(job_id))
+        response.raise_for_status()
+        return response.json()
+
+    async def cancel(self, job_id: str) -> Dict[str, str]:
+        response = await self._request("PUT", self._job_url(job_id))
+        response.raise_for_status()
+        return response.json()
+
+    async def resume(self, job_id: str) -> Dict[str, Any]:
+        response = await self._request("POST", self._job_url(job_id, "resume"))
+        response.raise_for_status()
+        return response.json()
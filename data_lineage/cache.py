@@ -0,0 +1,226 @@
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from dbcat.catalog import CatColumn, CatSource, CatTable
+from dbcat.catalog.models import CatSchema
+
+SchemaKey = Tuple[str, Optional[str], str]
+SchemaEntry = Tuple[CatTable, List[CatColumn]]
+
+
+class LRUCache:
+    """
+        Thread-safe, size-bounded cache that evicts the least recently used
+        entry and counts hits, misses and evictions.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self._max_size = max_size
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "eviction_policy": "lru",
+                "max_size": self._max_size,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hit_rate,
+            }
+
+
+class TTLCache(LRUCache):
+    """
+        LRUCache whose entries expire ttl seconds after they were put. Expired
+        entries are counted as misses.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        super(TTLCache, self).__init__(max_size)
+        self._ttl = ttl
+        self.expirations = 0
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, entry):
+        super(TTLCache, self).put(key, (time.monotonic() + self._ttl, entry))
+        return entry
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super(TTLCache, self).stats()
+        stats["ttl"] = self._ttl
+        stats["expirations"] = self.expirations
+        return stats
+
+
+class SchemaCache(LRUCache):
+    """
+        Process-wide LRU cache of (source, schema, table) to a table and its
+        columns. Entries are detached copies of catalog objects so that they
+        can be shared across sessions and threads.
+
+        Sources are invalidated locally with invalidate(). Other processes are
+        notified with publish(), which bumps a generation counter in Redis that
+        is compared by sync(). notify() does both, on the connection that the
+        cache of a process was attached to.
+    """
+
+    REDIS_KEY = "data_lineage:schema_cache"
+    ALL_SOURCES = "*"
+
+    def __init__(self, max_size: int = 1024):
+        super(SchemaCache, self).__init__(max_size)
+        self._generations: Dict[str, int] = {}
+        self._connection = None
+
+    def attach(self, connection):
+        self._connection = connection
+
+    def get(self, key: SchemaKey) -> Optional[SchemaEntry]:
+        return super(SchemaCache, self).get(key)
+
+    def put(self, key: SchemaKey, table: CatTable, columns: List[CatColumn]):
+        return super(SchemaCache, self).put(key, SchemaCache._copy(table, columns))
+
+    def invalidate(self, source_name: str = None):
+        with self._lock:
+            self._invalidate(source_name)
+
+    def _invalidate(self, source_name: Optional[str]):
+        if source_name is None or source_name == SchemaCache.ALL_SOURCES:
+            logging.debug("Invalidate schema cache")
+            self._entries.clear()
+        else:
+            logging.debug("Invalidate schema cache for {}".format(source_name))
+            for key in [key for key in self._entries.keys() if key[0] == source_name]:
+                del self._entries[key]
+
+    def notify(self, source_name: str = None):
+        """
+            Invalidate a source in this process and in the other processes, if
+            the cache is attached to a connection
+        """
+        self.invalidate(source_name)
+        if self._connection is not None:
+            SchemaCache.publish(self._connection, source_name)
+
+    @staticmethod
+    def publish(connection, source_name: str = None):
+        connection.hincrby(
+            SchemaCache.REDIS_KEY, source_name or SchemaCache.ALL_SOURCES, 1
+        )
+
+    def sync(self, connection):
+        generations = {
+            key.decode(): int(value)
+            for key, value in connection.hgetall(SchemaCache.REDIS_KEY).items()
+        }
+        with self._lock:
+            for source_name, generation in generations.items():
+                if self._generations.get(source_name) != generation:
+                    self._invalidate(source_name)
+            self._generations = generations
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super(SchemaCache, self).stats()
+        with self._lock:
+            num_columns = 0
+            approx_bytes = sys.getsizeof(self._entries)
+            for table, columns in self._entries.values():
+                num_columns += len(columns)
+                approx_bytes += sys.getsizeof(table.__dict__)
+                approx_bytes += sum(sys.getsizeof(c.__dict__) for c in columns)
+
+        stats["columns"] = num_columns
+        stats["approx_bytes"] = approx_bytes
+        return stats
+
+    @staticmethod
+    def _copy(table: CatTable, columns: List[CatColumn]) -> SchemaEntry:
+        source = CatSource(
+            name=table.schema.source.name, source_type=table.schema.source.source_type
+        )
+        source.id = table.schema.source.id
+        schema = CatSchema(
+            id=table.schema.id, name=table.schema.name, source_id=source.id
+        )
+        schema.source = source
+        table_copy = CatTable(id=table.id, name=table.name, schema_id=schema.id)
+        table_copy.schema = schema
+
+        column_copies = []
+        for column in columns:
+            column_copy = CatColumn(
+                id=column.id,
+                name=column.name,
+                data_type=column.data_type,
+                sort_order=column.sort_order,
+                table_id=table_copy.id,
+            )
+            column_copy.table = table_copy
+            column_copies.append(column_copy)
+
+        return table_copy, column_copies
+
+
+schema_cache = SchemaCache()
+parse_cache = LRUCache(max_size=4096)
@@ -0,0 +1,96 @@
+import logging
+from typing import Iterable
+
+from dbcat.catalog import Catalog
+from dbcat.catalog.models import Base, JobExecution
+from sqlalchemy import Column, ForeignKey, Integer, func, select
+from sqlalchemy.orm import relationship
+
+# Key of the transaction level advisory lock that orders the change log
+CHANGE_LOCK_KEY = 727165
+
+
+class LineageChange(Base):
+    """
+        Append only log of the job executions whose column lineage was written.
+        Ids are allocated while a transaction level advisory lock is held, and
+        the lock is held until the transaction commits. So the ids are in
+        commit order, and a reader that sees a change also sees every change
+        with a lower id. The id of the last change is the cursor of the lineage
+        graph deltas and indexes.
+    """
+
+    __tablename__ = "lineage_changes"
+
+    id = Column(Integer, primary_key=True)
+    job_execution_id = Column(
+        Integer,
+        ForeignKey("job_executions.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    job_execution = relationship("JobExecution", foreign_keys=job_execution_id)
+
+    def __repr__(self):
+        return "<Change: {}, Job Execution: {}>".format(self.id, self.job_execution_id)
+
+
+def init_lineage_changes(catalog: Catalog):
+    """
+        Create the lineage_changes table if it does not exist and log all the
+        job executions that are already in the catalog.
+    """
+    with catalog.engine.connect() as connection:
+        if catalog.engine.dialect.has_table(connection, LineageChange.__tablename__):
+            return
+
+    logging.info("Create lineage change log")
+    LineageChange.__table__.create(catalog.engine, checkfirst=True)
+    with catalog.managed_session as session:
+        session.execute(
+            LineageChange.__table__.insert().from_select(
+                ["job_execution_id"],
+                select([JobExecution.__table__.c.id]).order_by(
+                    JobExecution.__table__.c.id
+                ),
+            )
+        )
+        session.commit()
+
+
+def commit_lineage_changes(session, job_execution_ids: Iterable[int]):
+    """
+        Log the job executions whose column lineage was written in a session
+        and commit it. The advisory lock is taken just before the commit, so
+        writers are serialized only while they commit.
+    :param session: Session of the catalog
+    :param job_execution_ids: Ids of the job executions
+    """
+    values = [
+        {"job_execution_id": job_execution_id}
+        for job_execution_id in sorted(set(job_execution_ids))
+    ]
+    if len(values) > 0:
+        session.execute(select([func.pg_advisory_xact_lock(CHANGE_LOCK_KEY)]))
+        session.execute(LineageChange.__table__.insert().values(values))
+        logging.debug("Logged changes of {} job executions".format(len(values)))
+    session.commit()
+
+
+def last_change(session) -> int:
+    """
+        Id of the last change in the log, or 0 if it is empty
+    """
+    return session.query(func.coalesce(func.max(LineageChange.id), 0)).scalar()
+
+
+def changed_job_executions(session, after: int, until: int):
+    """
+        Query of the ids of the job executions with changes in (after, until]
+    """
+    return (
+        session.query(LineageChange.job_execution_id)
+        .filter(LineageChange.id > after)
+        .filter(LineageChange.id <= until)
+    )
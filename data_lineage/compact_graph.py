@@ -0,0 +1,240 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+import networkx as nx
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+class CompactLineageGraph:
+    """
+        Memory efficient alternative to LineageGraph for large graphs. Node ids
+        of the form kind:id, e.g. column:1, are stored as integer keys and
+        interned to indices in the order they are added. Keys, names and types
+        of the nodes are stored in columnar arrays, and the names in one
+        buffer of UTF-8 bytes. Edges are kept sorted by source and target, so
+        that the adjacency of the graph is in CSR arrays: the successors of
+        node i are indices[indptr[i]:indptr[i + 1]].
+
+        Requires numpy. Install data-lineage[compact].
+    """
+
+    NODE_KINDS = ("column", "table", "task")
+    NODE_TYPES = ("data", "task")
+
+    def __init__(
+        self,
+        nodes: List[Dict[str, str]],
+        edges: List[Dict[str, str]],
+        name: str = "Lineage",
+        cursor: Optional[int] = None,
+    ):
+        if np is None:
+            raise ImportError(
+                "numpy is required for CompactLineageGraph. "
+                "Install data-lineage[compact]"
+            )
+
+        self.name = name
+        self.cursor = cursor
+        # Key of the node at every index, and the keys in sorted order with
+        # their indices to look nodes up
+        self._keys = np.empty(0, dtype=np.int64)
+        self._sorted_keys = np.empty(0, dtype=np.int64)
+        self._sorted_indices = np.empty(0, dtype=np.int64)
+        self._types = np.empty(0, dtype=np.uint8)
+        # Offset and length of the name of every node in the buffer. The length
+        # is -1 for nodes that were only in edges.
+        self._name_data = bytearray()
+        self._name_offsets = np.empty(0, dtype=np.int64)
+        self._name_lengths = np.empty(0, dtype=np.int32)
+        # Sorted source index << 32 | target index of every edge
+        self._edge_keys = np.empty(0, dtype=np.int64)
+        self._indptr: Optional[np.ndarray] = None
+        self._indices: Optional[np.ndarray] = None
+        self._add(nodes, edges)
+
+    def _add(self, nodes: List[Dict[str, str]], edges: List[Dict[str, str]]):
+        if len(nodes) > 0:
+            indices = self._intern(self._node_keys(node["id"] for node in nodes))
+            self._types[indices] = [
+                self.NODE_TYPES.index(node["type"]) for node in nodes
+            ]
+            for index, node in zip(indices.tolist(), nodes):
+                if self._stored_name(index) != node["name"]:
+                    self._set_name(index, node["name"])
+
+        if len(edges) > 0:
+            # Edges can refer to nodes that were not in the list of nodes
+            sources = self._intern(self._node_keys(edge["source"] for edge in edges))
+            targets = self._intern(self._node_keys(edge["target"] for edge in edges))
+            incoming = np.unique(sources << 32 | targets)
+            positions = np.searchsorted(self._edge_keys, incoming)
+            new = ~self._contains(self._edge_keys, positions, incoming)
+            self._edge_keys = np.insert(self._edge_keys, positions[new], incoming[new])
+            self._indptr = None
+            self._indices = None
+
+        logging.debug(
+            "Graph has {} nodes and {} edges".format(self.num_nodes, self.num_edges)
+        )
+
+    def _node_keys(self, node_ids: Iterable[str]) -> "np.ndarray":
+        return np.fromiter((self._key(node_id) for node_id in node_ids), np.int64)
+
+    def _key(self, node_id: str) -> int:
+        kind, _, number = node_id.partition(":")
+        try:
+            return int(number) * len(self.NODE_KINDS) + self.NODE_KINDS.index(kind)
+        except ValueError:
+            raise ValueError("Node id {} is not of the form kind:id".format(node_id))
+
+    @staticmethod
+    def _contains(
+        sorted_keys: "np.ndarray", positions: "np.ndarray", keys: "np.ndarray"
+    ) -> "np.ndarray":
+        found = positions < len(sorted_keys)
+        found[found] = sorted_keys[positions[found]] == keys[found]
+        return found
+
+    def _lookup(self, keys: "np.ndarray") -> "np.ndarray":
+        """
+            Indices of node keys, and -1 for the keys that are not in the graph
+        """
+        positions = np.searchsorted(self._sorted_keys, keys)
+        found = self._contains(self._sorted_keys, positions, keys)
+        indices = np.full(len(keys), -1, dtype=np.int64)
+        indices[found] = self._sorted_indices[positions[found]]
+        return indices
+
+    def _intern(self, keys: "np.ndarray") -> "np.ndarray":
+        """
+            Indices of node keys. Keys that are not in the graph are added in
+            the order they first appear.
+        """
+        indices = self._lookup(keys)
+        missing = indices < 0
+        if not missing.any():
+            return indices
+
+        new_keys, first = np.unique(keys[missing], return_index=True)
+        new_keys = new_keys[np.argsort(first)]
+        new_indices = np.arange(
+            self.num_nodes, self.num_nodes + len(new_keys), dtype=np.int64
+        )
+        order = np.argsort(new_keys)
+        positions = np.searchsorted(self._sorted_keys, new_keys[order])
+        self._sorted_keys = np.insert(self._sorted_keys, positions, new_keys[order])
+        self._sorted_indices = np.insert(
+            self._sorted_indices, positions, new_indices[order]
+        )
+        self._keys = np.concatenate([self._keys, new_keys])
+        self._types = np.concatenate(
+            [self._types, np.zeros(len(new_keys), dtype=np.uint8)]
+        )
+        self._name_offsets = np.concatenate(
+            [self._name_offsets, np.zeros(len(new_keys), dtype=np.int64)]
+        )
+        self._name_lengths = np.concatenate(
+            [self._name_lengths, np.full(len(new_keys), -1, dtype=np.int32)]
+        )
+        return self._lookup(keys)
+
+    def _stored_name(self, index: int) -> Optional[str]:
+        length = self._name_lengths[index]
+        if length < 0:
+            return None
+        offset = self._name_offsets[index]
+        return self._name_data[offset : offset + length].decode("utf-8")
+
+    def _set_name(self, index: int, name: str):
+        # A renamed node leaves its old name in the buffer
+        encoded = name.encode("utf-8")
+        self._name_offsets[index] = len(self._name_data)
+        self._name_lengths[index] = len(encoded)
+        self._name_data.extend(encoded)
+
+    def _name(self, index: int) -> str:
+        name = self._stored_name(index)
+        return name if name is not None else self.node_id(index)
+
+    def _csr(self):
+        if self._indptr is None:
+            sources = self._edge_keys >> 32
+            self._indptr = np.searchsorted(
+                sources, np.arange(self.num_nodes + 1, dtype=np.int64)
+            )
+            self._indices = self._edge_keys & 0xFFFFFFFF
+        return self._indptr, self._indices
+
+    def apply_delta(self, delta: Dict[str, Any]):
+        """
+            Add the nodes and edges returned by the delta endpoint and move the
+            cursor to the cursor of the delta. Nodes and edges that are
+            already in the graph are ignored.
+        """
+        self._add(delta["nodes"], delta["edges"])
+        if delta.get("cursor") is not None:
+            self.cursor = delta["cursor"]
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self._keys)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self._edge_keys)
+
+    @property
+    def indptr(self) -> "np.ndarray":
+        return self._csr()[0]
+
+    @property
+    def indices(self) -> "np.ndarray":
+        return self._csr()[1]
+
+    def index(self, node_id: str) -> int:
+        index = int(self._lookup(self._node_keys([node_id]))[0])
+        if index < 0:
+            raise KeyError(node_id)
+        return index
+
+    def node_id(self, index: int) -> str:
+        number, kind = divmod(int(self._keys[index]), len(self.NODE_KINDS))
+        return "{}:{}".format(self.NODE_KINDS[kind], number)
+
+    def node(self, node_id: str) -> Dict[str, str]:
+        index = self.index(node_id)
+        return {
+            "name": self._name(index),
+            "type": self.NODE_TYPES[self._types[index]],
+        }
+
+    def successors(self, node_id: str) -> List[str]:
+        indptr, indices = self._csr()
+        index = self.index(node_id)
+        return [
+            self.node_id(i) for i in indices[indptr[index] : indptr[index + 1]].tolist()
+        ]
+
+    def to_networkx(self) -> nx.DiGraph:
+        graph = nx.DiGraph()
+        node_ids = [self.node_id(index) for index in range(self.num_nodes)]
+        for index, node_id in enumerate(node_ids):
+            graph.add_node(
+                node_id,
+                name=self._name(index),
+                type=self.NODE_TYPES[self._types[index]],
+            )
+        graph.add_edges_from(
+            (node_ids[edge_key >> 32], node_ids[edge_key & 0xFFFFFFFF])
+            for edge_key in self._edge_keys.tolist()
+        )
+        return graph
+
+    @property
+    def graph(self) -> nx.DiGraph:
+        return self.to_networkx()
@@ -1,8 +1,10 @@
 import logging
-from typing import Dict, List
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import networkx as nx
 
+from data_lineage.traversal import is_job, traverse
+
 
 class LineageGraph:
     def __init__(
@@ -10,9 +12,14 @@ class LineageGraph:
         nodes: List[Dict[str, str]],
         edges: List[Dict[str, str]],
         name: str = "Lineage",
+        cursor: Optional[int] = None,
     ):
         self.name = name
+        self.cursor = cursor
         self._graph = nx.DiGraph()
+        self._add(nodes, edges)
+
+    def _add(self, nodes: List[Dict[str, str]], edges: List[Dict[str, str]]):
         for node in nodes:
             node_id = node["id"]
             node_attributes = {"name": node["name"], "type": node["type"]}
@@ -23,6 +30,77 @@ class LineageGraph:
             logging.debug("Edge: <{}>, <{}>".format(edge["source"], edge["target"]))
             self._graph.add_edge(edge["source"], edge["target"])
 
+    def apply_delta(self, delta: Dict[str, Any]):
+        """
+            Add the nodes and edges returned by the delta endpoint and move the
+            cursor to the cursor of the delta. Nodes and edges that are
+            already in the graph are ignored.
+        """
+        self._add(delta["nodes"], delta["edges"])
+        if delta.get("cursor") is not None:
+            self.cursor = delta["cursor"]
+
+    def upstream(
+        self, node_id: str, depth: int = None, level: str = "column"
+    ) -> Dict[str, int]:
+        """
+            Find the nodes that feed a column or task. A job connects all the
+            columns it reads to all the columns it writes in this graph.
+        :param node_id: Id of the column or task. For e.g. column:1
+        :param depth: Maximum number of jobs to traverse. None for no limit.
+        :param level: column, table or job
+        :return: Map of node id, or table name for the table level, to depth
+        """
+        return self._aggregate(
+            traverse(self._neighbours(self._graph.pred), [node_id], depth), level
+        )
+
+    def downstream(
+        self, node_id: str, depth: int = None, level: str = "column"
+    ) -> Dict[str, int]:
+        """
+            Find the nodes that are fed by a column or task. A job connects all
+            the columns it reads to all the columns it writes in this graph.
+        :param node_id: Id of the column or task. For e.g. column:1
+        :param depth: Maximum number of jobs to traverse. None for no limit.
+        :param level: column, table or job
+        :return: Map of node id, or table name for the table level, to depth
+        """
+        return self._aggregate(
+            traverse(self._neighbours(self._graph.succ), [node_id], depth), level
+        )
+
+    @staticmethod
+    def _neighbours(adjacency) -> Callable[[str], Iterator[Tuple[str, str]]]:
+        def neighbours(node_id: str) -> Iterator[Tuple[str, str]]:
+            if is_job(node_id):
+                for column_id in adjacency[node_id]:
+                    yield column_id, node_id
+            else:
+                for job_id in adjacency[node_id]:
+                    for column_id in adjacency[job_id]:
+                        yield column_id, job_id
+
+        return neighbours
+
+    def _aggregate(self, depths: Dict[str, int], level: str) -> Dict[str, int]:
+        if level == "job":
+            return {
+                node_id: depth for node_id, depth in depths.items() if is_job(node_id)
+            }
+
+        columns = {
+            node_id: depth for node_id, depth in depths.items() if not is_job(node_id)
+        }
+        if level == "column":
+            return columns
+
+        tables: Dict[str, int] = {}
+        for node_id, depth in columns.items():
+            table_name = self._graph.nodes[node_id]["name"].rsplit(".", 1)[0]
+            tables[table_name] = min(depth, tables.get(table_name, depth))
+        return tables
+
     @property
     def graph(self):
         return self._graph
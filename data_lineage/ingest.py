@@ -0,0 +1,176 @@
+import csv
+import datetime
+import json
+import logging
+import time
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+from typing import Any, Dict, Generator, Iterable, List, Optional, Tuple
+
+from dbcat import PGCatalog
+from pglast.parser import ParseError
+from redis import Redis
+
+from data_lineage import ColumnNotFound, SemanticError, TableNotFound
+from data_lineage.cache import schema_cache
+from data_lineage.changelog import commit_lineage_changes
+from data_lineage.parser import analyze_dml_query, extract_lineage, parse
+
+_catalog: Optional[PGCatalog] = None
+_source_name: Optional[str] = None
+_connection: Optional[Redis] = None
+
+
+def read_queries(
+    path: str, file_format: str = None
+) -> Generator[Dict[str, Any], None, None]:
+    """
+        Stream query records from a JSONL or CSV file. Every record has a query
+        and optionally a name, start_time and end_time in ISO format.
+    """
+    if file_format is None:
+        file_format = "csv" if path.lower().endswith(".csv") else "jsonl"
+
+    with open(path, "r", newline="") as file:
+        if file_format == "csv":
+            for row in csv.DictReader(file):
+                yield row
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def batches(
+    records: Iterable[Dict[str, Any]], batch_size: int
+) -> Generator[List[Dict[str, Any]], None, None]:
+    iterator = iter(records)
+    batch = list(islice(iterator, batch_size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, batch_size))
+
+
+def _init_worker(
+    catalog_options: Dict[str, Any],
+    source_name: str,
+    redis_options: Optional[Dict[str, Any]],
+):
+    global _catalog, _source_name, _connection
+    _catalog = PGCatalog(
+        **catalog_options,
+        connect_args={"application_name": "data-lineage:ingest"},
+        pool_size=1,
+        max_overflow=1,
+        pool_pre_ping=True
+    )
+    _source_name = source_name
+    # Tables created by queries in this worker are published to the other
+    # processes, and the tables changed by them are synced before every batch
+    if redis_options is not None:
+        _connection = Redis(**redis_options)
+        schema_cache.attach(_connection)
+
+
+def _timestamp(value: Optional[str]) -> datetime.datetime:
+    if value:
+        return datetime.datetime.fromisoformat(value)
+    return datetime.datetime.now()
+
+
+def _ingest_batch(records: List[Dict[str, Any]]) -> Tuple[int, int]:
+    assert _catalog is not None
+    analyzed = 0
+    failed = 0
+    job_execution_ids: List[int] = []
+    if _connection is not None:
+        schema_cache.sync(_connection)
+    with _catalog.managed_session as session:
+        source = _catalog.get_source(_source_name)
+        for record in records:
+            # A savepoint per record, so that a record that fails after it
+            # wrote to the session does not roll back the rest of the batch
+            try:
+                with session.begin_nested():
+                    parsed = parse(record["query"], record.get("name") or None)
+                    visitor = analyze_dml_query(_catalog, parsed, source)
+                    job_execution = extract_lineage(
+                        catalog=_catalog,
+                        visited_query=visitor,
+                        source=source,
+                        parsed=parsed,
+                        start_time=_timestamp(record.get("start_time")),
+                        end_time=_timestamp(record.get("end_time")),
+                        commit=False,
+                    )
+                job_execution_ids.append(job_execution.id)
+                analyzed += 1
+            except (ParseError, TableNotFound, ColumnNotFound, SemanticError) as error:
+                logging.debug("Skipped {}: {}".format(record.get("name"), error))
+                failed += 1
+            except Exception as error:
+                logging.warning("Failed {}: {}".format(record.get("name"), error))
+                failed += 1
+        commit_lineage_changes(session, job_execution_ids)
+
+    return analyzed, failed
+
+
+def ingest_file(
+    catalog_options: Dict[str, Any],
+    source_name: str,
+    path: str,
+    file_format: str = None,
+    workers: int = 4,
+    batch_size: int = 500,
+    report_interval: float = 10.0,
+    redis_options: Dict[str, Any] = None,
+) -> Tuple[int, int]:
+    """
+        Analyze all queries in a query log file. Batches of queries are parsed,
+        bound and written by a pool of worker processes, each with its own
+        catalog connection. At most two batches per worker are read ahead so
+        that memory stays bounded for large files.
+    :param redis_options: Arguments of the Redis connection that the schema
+        caches of the server and the workers are synced with. None to not sync.
+    :return: number of analyzed and failed queries
+    """
+    analyzed = 0
+    failed = 0
+    started = time.monotonic()
+    last_report = started
+
+    with Pool(
+        processes=workers,
+        initializer=_init_worker,
+        initargs=(catalog_options, source_name, redis_options),
+    ) as pool:
+        pending: deque = deque()
+        records = read_queries(path, file_format)
+        for batch in batches(records, batch_size):
+            pending.append(pool.apply_async(_ingest_batch, (batch,)))
+            while len(pending) >= workers * 2 or (pending and pending[0].ready()):
+                batch_analyzed, batch_failed = pending.popleft().get()
+                analyzed += batch_analyzed
+                failed += batch_failed
+
+            if time.monotonic() - last_report > report_interval:
+                last_report = time.monotonic()
+                _report(analyzed, failed, last_report - started)
+
+        while pending:
+            batch_analyzed, batch_failed = pending.popleft().get()
+            analyzed += batch_analyzed
+            failed += batch_failed
+
+    _report(analyzed, failed, time.monotonic() - started)
+    return analyzed, failed
+
+
+def _report(analyzed: int, failed: int, elapsed: float):
+    logging.info(
+        "Analyzed {} queries, failed {} queries, {:.1f} queries/sec".format(
+            analyzed, failed, (analyzed + failed) / elapsed if elapsed > 0 else 0.0
+        )
+    )
@@ -1,12 +1,23 @@
+import hashlib
 import logging
-from typing import List
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
 
 from dbcat.catalog import Catalog
-from dbcat.catalog.models import CatSource, JobExecution, JobExecutionStatus
+from dbcat.catalog.models import (
+    CatSource,
+    ColumnLineage,
+    Job,
+    JobExecution,
+    JobExecutionStatus,
+)
 from pglast import Node, parse_sql
-from pglast.parser import ParseError
+from pglast.ast import CreateTableAsStmt, InsertStmt, SelectStmt
+from pglast.parser import ParseError, fingerprint
+from sqlalchemy.dialects.postgresql import insert
 
 from data_lineage import SemanticError
+from data_lineage.cache import parse_cache
+from data_lineage.changelog import commit_lineage_changes
 from data_lineage.parser.binder import SelectBinder
 from data_lineage.parser.dml_visitor import (
     CTASVisitor,
@@ -15,13 +26,17 @@ from data_lineage.parser.dml_visitor import (
     SelectSourceVisitor,
 )
 from data_lineage.parser.visitor import ExprVisitor, RedshiftExprVisitor
+from data_lineage.rollup import update_table_lineage
 
 
 class Parsed:
-    def __init__(self, name: str, query: str, node: Node):
+    def __init__(
+        self, name: str, query: str, node: Node = None, fingerprint: str = None
+    ):
         self._name = name
         self._node = node
         self._query = query
+        self._fingerprint = fingerprint
 
     @property
     def name(self):
@@ -29,19 +44,34 @@ class Parsed:
 
     @property
     def node(self):
+        if self._node is None:
+            self._node = parse_sql(self._query)
         return self._node
 
     @property
     def query(self):
         return self._query
 
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = fingerprint(self._query)
+        return self._fingerprint
+
+    @property
+    def normalized_query(self):
+        return " ".join(self._query.split())
+
 
 def parse_queries(queries: List[str]) -> List[Parsed]:
     parsed: List[Parsed] = []
 
     for query in queries:
         try:
-            parsed.append(parse(query))
+            parsed_query = parse(query)
+            # Build the parse tree to validate the query
+            parsed_query.node
+            parsed.append(parsed_query)
         except ParseError as e:
             logging.warning("Syntax error while parsing {}.\n{}".format(query, e))
 
@@ -79,19 +109,42 @@ def visit_dml_query(parsed: Parsed, source: CatSource,) -> DmlVisitor:
     if source.source_type == "redshift":
         expr_visitor_clazz = RedshiftExprVisitor
 
-    select_source_visitor: DmlVisitor = SelectSourceVisitor(
-        parsed.name, expr_visitor_clazz
-    )
-    select_into_visitor: DmlVisitor = SelectIntoVisitor(parsed.name, expr_visitor_clazz)
-    ctas_visitor: DmlVisitor = CTASVisitor(parsed.name, expr_visitor_clazz)
-
-    for v in [select_source_visitor, select_into_visitor, ctas_visitor]:
-        v(parsed.node)
-        if len(v.select_tables) > 0 and v.insert_table is not None:
-            return v
+    # pglast fingerprints ignore aliases and select list names which change
+    # the lineage of a query. So the cache is keyed on the normalized text.
+    key = (parsed.normalized_query, expr_visitor_clazz)
+    cached: Optional[DmlVisitor] = parse_cache.get(key)
+    if cached is not None:
+        logging.debug("Parse cache hit rate: {:.2f}".format(parse_cache.hit_rate))
+        return cached.copy(parsed.name)
+
+    visitor_clazz = _dml_visitor_clazz(parsed)
+    if visitor_clazz is None:
+        raise SemanticError("Query is not a DML Query")
+
+    visitor: DmlVisitor = visitor_clazz(parsed.name, expr_visitor_clazz)
+    visitor(parsed.node)
+    if len(visitor.select_tables) > 0 and visitor.insert_table is not None:
+        parse_cache.put(key, visitor.copy(parsed.name))
+        return visitor
     raise SemanticError("Query is not a DML Query")
 
 
+def _dml_visitor_clazz(parsed: Parsed) -> Optional[Type[DmlVisitor]]:
+    """
+        Choose the visitor from the type of the top level statement so that the
+        parse tree is traversed only once.
+    """
+    for raw_stmt in parsed.node:
+        stmt = raw_stmt.stmt
+        if isinstance(stmt, InsertStmt):
+            return SelectSourceVisitor
+        elif isinstance(stmt, SelectStmt) and stmt.intoClause is not None:
+            return SelectIntoVisitor
+        elif isinstance(stmt, CreateTableAsStmt):
+            return CTASVisitor
+    return None
+
+
 def extract_lineage(
     catalog: Catalog,
     visited_query: DmlVisitor,
@@ -99,29 +152,90 @@ def extract_lineage(
     parsed: Parsed,
     start_time,
     end_time,
+    commit: bool = True,
 ) -> JobExecution:
-    job = catalog.add_job(
-        name=parsed.name, source=source, context={"query": parsed.query}
-    )
-    job_execution = catalog.add_job_execution(
-        job=job,
-        started_at=start_time,
-        ended_at=end_time,
-        status=JobExecutionStatus.SUCCESS,
-    )
-    for source, target in zip(
-        visited_query.source_columns, visited_query.target_columns
-    ):
-        for column in source.columns:
-            edge = catalog.add_column_lineage(column, target, job_execution.id, {})
-            logging.debug("Added {}".format(edge))
+    """
+        Store the job, job execution and all column lineage edges of a bound query.
+        Edges are written with one multi-row insert and rolled up to table edges.
+        If commit is False, the rows are only flushed and the caller is
+        responsible for committing the session with commit_lineage_changes().
+    """
+    with catalog.managed_session as session:
+        job = _get_or_add_job(session, parsed, source)
+        job_execution = JobExecution(
+            job_id=job.id,
+            started_at=start_time,
+            ended_at=end_time,
+            status=JobExecutionStatus.SUCCESS,
+        )
+        session.add(job_execution)
+        session.flush()
+
+        edges: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        table_edges: Set[Tuple[int, int]] = set()
+        for source_context, target in zip(
+            visited_query.source_columns, visited_query.target_columns
+        ):
+            for column in source_context.columns:
+                edges[(column.id, target.id)] = {
+                    "source_id": column.id,
+                    "target_id": target.id,
+                    "job_execution_id": job_execution.id,
+                    "context": {},
+                }
+                table_edges.add((column.table_id, target.table_id))
+
+        if len(edges) > 0:
+            session.execute(
+                insert(ColumnLineage.__table__)
+                .values(list(edges.values()))
+                .on_conflict_do_nothing()
+            )
+            update_table_lineage(session, table_edges, job.id, job_execution.id)
+        logging.debug("Added {} edges for {}".format(len(edges), job_execution.job_id))
+
+        if commit:
+            commit_lineage_changes(session, [job_execution.id])
 
     return job_execution
 
 
+def _get_or_add_job(session, parsed: Parsed, source: CatSource) -> Job:
+    """
+        Get the job of a query or add it. Workers that analyze the same query
+        at the same time add the same job, so the insert does nothing if the
+        job was added by another session. It waits for that session to commit
+        and the job is queried again.
+    """
+    query = (
+        session.query(Job)
+        .filter(Job.name == parsed.name)
+        .filter(Job.source_id == source.id)
+    )
+    job = query.one_or_none()
+    if job is None:
+        session.execute(
+            insert(Job.__table__)
+            .values(
+                name=parsed.name, source_id=source.id, context={"query": parsed.query}
+            )
+            .on_conflict_do_nothing()
+        )
+        job = query.one_or_none()
+        if job is None:
+            raise SemanticError("Job {} belongs to another source".format(parsed.name))
+    return job
+
+
 def parse(sql: str, name: str = None) -> Parsed:
+    """
+        Wrap a query for analysis. The parse tree is built lazily, so queries
+        found in the parse cache are never parsed. A syntax error is raised as
+        a ParseError when the query is visited. A query without a name is named
+        by the SHA-1 digest of its text, so that it maps to the same job in
+        every process.
+    """
     if name is None:
-        name = str(hash(sql))
-    node = parse_sql(sql)
+        name = hashlib.sha1(sql.encode("utf-8")).hexdigest()
 
-    return Parsed(name, sql, node)
+    return Parsed(name, sql)
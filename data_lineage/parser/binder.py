@@ -2,13 +2,14 @@ import json
 import logging
 from abc import ABC, abstractmethod
 from json import JSONEncoder
-from typing import List, Mapping, Set, Type
+from typing import Dict, List, Mapping, Optional, Set, Tuple, Type
 
 from dbcat.catalog import Catalog, CatColumn, CatSource, CatTable
 from pglast import Node
 from pglast.ast import RangeSubselect, RangeVar
 
 from data_lineage import ColumnNotFound, SemanticError, TableNotFound
+from data_lineage.cache import SchemaCache, schema_cache
 from data_lineage.parser.visitor import (
     ColumnRefVisitor,
     ExprVisitor,
@@ -17,6 +18,82 @@ from data_lineage.parser.visitor import (
 )
 
 
+class ResolutionCache:
+    """
+        Cache of catalog lookups for the duration of one bind. Every table is
+        loaded with all its columns once and later column lookups are answered
+        from an index on the lower case column name. Tables that are not in
+        the process-wide schema cache are added to it.
+    """
+
+    def __init__(self, catalog: Catalog, shared: SchemaCache = schema_cache):
+        self._catalog = catalog
+        self._shared = shared
+        self._tables: Dict[Tuple[Optional[str], ...], CatTable] = {}
+        self._columns: Dict[int, Dict[str, CatColumn]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def catalog(self) -> Catalog:
+        return self._catalog
+
+    def search_table(
+        self,
+        table_like: str,
+        schema_like: Optional[str] = None,
+        source_like: Optional[str] = None,
+    ) -> CatTable:
+        key = (source_like, schema_like, table_like)
+        if key in self._tables:
+            self.hits += 1
+            return self._tables[key]
+
+        self.misses += 1
+        entry = None
+        if source_like is not None:
+            entry = self._shared.get((source_like, schema_like, table_like))
+        if entry is None:
+            table = self._catalog.search_table(
+                table_like=table_like, schema_like=schema_like, source_like=source_like
+            )
+            columns = self._catalog.get_columns_for_table(table)
+            if source_like is not None:
+                entry = self._shared.put(
+                    (source_like, schema_like, table_like), table, columns
+                )
+            else:
+                entry = (table, columns)
+
+        table, columns = entry
+        self._tables[key] = table
+        self._columns[table.id] = {column.name.lower(): column for column in columns}
+        return table
+
+    def get_columns_for_table(
+        self, table: CatTable, column_names: List[str] = None
+    ) -> List[CatColumn]:
+        if table.id in self._columns:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._columns[table.id] = {
+                column.name.lower(): column
+                for column in self._catalog.get_columns_for_table(table)
+            }
+
+        columns = self._columns[table.id]
+        if column_names is None:
+            return list(columns.values())
+
+        names = {name.lower() for name in column_names}
+        found = [columns[name] for name in names if name in columns]
+        return sorted(found, key=lambda column: column.sort_order)
+
+    def __str__(self):
+        return "ResolutionCache(hits={}, misses={})".format(self.hits, self.misses)
+
+
 class ColumnContext:
     def __init__(self, alias: str, columns: Set[CatColumn]):
         self._alias = alias.lower()
@@ -32,7 +109,7 @@ class ColumnContext:
 
 
 class AliasContext:
-    def __init__(self, catalog: Catalog, alias: str, tables: Set[CatTable]):
+    def __init__(self, catalog: ResolutionCache, alias: str, tables: Set[CatTable]):
         self._catalog = catalog
         self._alias = alias.lower()
         self._tables = tables
@@ -59,7 +136,7 @@ class AliasContext:
 class WithContext(AliasContext):
     def __init__(
         self,
-        catalog: Catalog,
+        catalog: ResolutionCache,
         alias: str,
         tables: Set[CatTable],
         columns: List[ColumnContext],
@@ -138,8 +215,10 @@ class Binder(ABC):
         alias_generator,
         expr_visitor_clazz: Type[ExprVisitor],
         alias_map: Mapping[str, AliasContext] = None,
+        cache: ResolutionCache = None,
     ):
         self._catalog = catalog
+        self._cache = cache or ResolutionCache(catalog)
         self._source = source
         self._tables: Set[CatTable] = set()
         self._columns: List[ColumnContext] = []
@@ -152,6 +231,7 @@ class Binder(ABC):
 
         self._tables = set(bound_tables)
         self._columns = self._bind_columns()
+        logging.debug("Catalog lookups: {}".format(self._cache))
 
     def _bind_tables(self):
         bound_tables = []
@@ -169,7 +249,7 @@ class Binder(ABC):
                     logging.debug("Added tables for alias {}".format(visitor.name))
                 else:
                     try:
-                        candidate_table = self._catalog.search_table(
+                        candidate_table = self._cache.search_table(
                             source_like=self._source.name, **visitor.search_string
                         )
                     except RuntimeError as err:
@@ -182,7 +262,7 @@ class Binder(ABC):
                     logging.debug("Bound source table: {}".format(candidate_table))
 
                     self._alias_map[visitor.alias] = AliasContext(
-                        catalog=self._catalog,
+                        catalog=self._cache,
                         alias=visitor.alias,
                         tables={candidate_table},
                     )
@@ -197,10 +277,11 @@ class Binder(ABC):
                     visitor.columns,
                     self._alias_generator,
                     self._expr_visitor_clazz,
+                    cache=self._cache,
                 )
                 binder.bind()
                 self._alias_map[visitor.alias] = WithContext(
-                    catalog=self._catalog,
+                    catalog=self._cache,
                     alias=visitor.alias,
                     tables=binder.tables,
                     columns=binder.columns,
@@ -310,9 +391,10 @@ class SelectBinder(Binder):
         alias_generator,
         expr_visitor_clazz: Type[ExprVisitor],
         alias_map: Mapping[str, AliasContext] = None,
+        cache: ResolutionCache = None,
     ):
         super(SelectBinder, self).__init__(
-            catalog, source, alias_generator, expr_visitor_clazz, alias_map
+            catalog, source, alias_generator, expr_visitor_clazz, alias_map, cache
         )
         self._table_nodes: List[Node] = tables
         self._column_nodes: List[ExprVisitor] = columns
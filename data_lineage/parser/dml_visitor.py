@@ -8,9 +8,11 @@ from pglast.ast import IntoClause
 from pglast.visitors import Ancestor, Continue, Skip, Visitor
 
 from data_lineage import ColumnNotFound, SemanticError, TableNotFound
+from data_lineage.cache import schema_cache
 from data_lineage.parser.binder import (
     CatTableEncoder,
     ColumnContext,
+    ResolutionCache,
     SelectBinder,
     WithContext,
 )
@@ -36,6 +38,7 @@ class DmlVisitor(Visitor):
         self._with_aliases: Dict[str, Dict[str, Any]] = {}
         self._alias_map: Dict[str, WithContext] = {}
         self._column_alias_generator = ("_U{}".format(i) for i in range(0, 1000))
+        self._cache: Optional[ResolutionCache] = None
         self.expr_visitor_clazz = expr_visitor_clazz
 
     @property
@@ -70,6 +73,19 @@ class DmlVisitor(Visitor):
     def select_columns(self) -> List[ExprVisitor]:
         return self._select_columns
 
+    def copy(self, name: str) -> "DmlVisitor":
+        """
+            Create a visitor of the same class that shares the visited nodes but
+            none of the state set by bind().
+        """
+        visitor = self.__class__(name, self.expr_visitor_clazz)
+        visitor._insert_table = self._insert_table
+        visitor._insert_columns = list(self._insert_columns)
+        visitor._select_tables = self._select_tables
+        visitor._select_columns = self._select_columns
+        visitor._with_aliases = self._with_aliases
+        return visitor
+
     def visit_RangeVar(self, ancestors, node):
         self._insert_table = node
         return Skip
@@ -102,6 +118,7 @@ class DmlVisitor(Visitor):
         return Skip
 
     def bind(self, catalog: Catalog, source: CatSource):
+        self._cache = ResolutionCache(catalog)
         self._bind_target(catalog, source)
 
         self._bind_with(catalog, source)
@@ -113,6 +130,7 @@ class DmlVisitor(Visitor):
             self._column_alias_generator,
             self.expr_visitor_clazz,
             self._alias_map,
+            self._cache,
         )
         binder.bind()
 
@@ -147,7 +165,7 @@ class DmlVisitor(Visitor):
         target_table_visitor(self._insert_table)
         logging.debug("Searching for: {}".format(target_table_visitor.search_string))
         try:
-            self._target_table = catalog.search_table(
+            self._target_table = self._resolution_cache(catalog).search_table(
                 source_like=source.name, **target_table_visitor.search_string
             )
         except RuntimeError as error:
@@ -159,10 +177,12 @@ class DmlVisitor(Visitor):
             )
         logging.debug("Bound target table: {}".format(self._target_table))
         if len(self._insert_columns) == 0:
-            self._target_columns = catalog.get_columns_for_table(self._target_table)
+            self._target_columns = self._resolution_cache(
+                catalog
+            ).get_columns_for_table(self._target_table)
             logging.debug("Bound all columns in {}".format(self._target_table))
         else:
-            bound_cols = catalog.get_columns_for_table(
+            bound_cols = self._resolution_cache(catalog).get_columns_for_table(
                 self._target_table, column_names=self._insert_columns
             )
             # Handle error case
@@ -196,15 +216,21 @@ class DmlVisitor(Visitor):
                     self._with_aliases[key]["columns"],
                     self._column_alias_generator,
                     self.expr_visitor_clazz,
+                    cache=self._resolution_cache(catalog),
                 )
                 binder.bind()
                 self._alias_map[key] = WithContext(
-                    catalog=catalog,
+                    catalog=self._resolution_cache(catalog),
                     alias=key,
                     tables=binder.tables,
                     columns=binder.columns,
                 )
 
+    def _resolution_cache(self, catalog: Catalog) -> ResolutionCache:
+        if self._cache is None or self._cache.catalog is not catalog:
+            self._cache = ResolutionCache(catalog)
+        return self._cache
+
     def resolve(
         self,
     ) -> Tuple[
@@ -310,3 +336,4 @@ class CTASVisitor(SelectSourceVisitor):
                     table=self._target_table,
                 )
             )
+        schema_cache.notify(source.name)
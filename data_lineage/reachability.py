@@ -0,0 +1,281 @@
+import logging
+import threading
+from collections import OrderedDict, defaultdict, deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from data_lineage.traversal import LineageIndex, new_edges
+
+# Largest weakly connected component whose closure is computed. Reachability
+# in larger components is answered with a breadth first search.
+MAX_CLOSURE_COLUMNS = 20000
+# Bits of all the closures that are kept. The closures of the least recently
+# used components are dropped first.
+MAX_CLOSURE_BITS = 1 << 30
+
+
+class Closure:
+    """
+        Transitive closure of a weakly connected component. The strongly
+        connected components are condensed, so every SCC has one bitmap of
+        the columns it reaches, with a bit per column of the component.
+    """
+
+    def __init__(self, columns: List[int], successors: Dict[int, Set[int]]):
+        self.bits = {column_id: bit for bit, column_id in enumerate(columns)}
+        self.scc: Dict[int, int] = {}
+        self.reached: List[int] = []
+        self.sizes: List[int] = []
+        # SCCs are found in reverse topological order, so the SCCs that an
+        # SCC reaches have their bitmaps when it is found
+        for members in self._sccs(columns, successors):
+            number = len(self.reached)
+            for column_id in members:
+                self.scc[column_id] = number
+            mask = 0
+            cyclic = len(members) > 1
+            for column_id in members:
+                for successor in successors.get(column_id, ()):
+                    other = self.scc[successor]
+                    if other == number:
+                        cyclic = True
+                    else:
+                        mask |= self.reached[other] | 1 << self.bits[successor]
+            if cyclic:
+                for column_id in members:
+                    mask |= 1 << self.bits[column_id]
+            self.reached.append(mask)
+            self.sizes.append(len(members))
+
+    @staticmethod
+    def _sccs(
+        columns: List[int], successors: Dict[int, Set[int]]
+    ) -> Iterator[List[int]]:
+        """
+            Tarjan's algorithm without recursion
+        """
+        index: Dict[int, int] = {}
+        low: Dict[int, int] = {}
+        stack: List[int] = []
+        on_stack: Set[int] = set()
+        for root in columns:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(successors.get(root, ())))]
+            while work:
+                column_id, children = work[-1]
+                child = next(children, None)
+                if child is not None:
+                    if child not in index:
+                        index[child] = low[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(successors.get(child, ()))))
+                    elif child in on_stack:
+                        low[column_id] = min(low[column_id], index[child])
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[column_id])
+                if low[column_id] == index[column_id]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        members.append(member)
+                        if member == column_id:
+                            break
+                    yield members
+
+    @property
+    def num_bits(self) -> int:
+        return len(self.reached) * len(self.bits)
+
+    def closure_edges(self) -> int:
+        return sum(
+            bin(mask).count("1") * size for mask, size in zip(self.reached, self.sizes)
+        )
+
+    def reaches(self, sources: Iterable[int], targets: Iterable[int]) -> bool:
+        target_mask = 0
+        for column_id in targets:
+            target_mask |= 1 << self.bits[column_id]
+        return any(
+            self.reached[self.scc[column_id]] & target_mask for column_id in sources
+        )
+
+
+class ReachabilityIndex:
+    """
+        Reachability between columns of the column lineage graph. Columns are
+        grouped in weakly connected components with a union-find, so columns
+        in different components are rejected without a search. The closure of
+        a component is computed when it is first queried, and dropped when an
+        edge is added to the component.
+
+        Closures are kept for components of up to MAX_CLOSURE_COLUMNS columns,
+        within MAX_CLOSURE_BITS in total. Other queries run a breadth first
+        search in the component. The index shares the invalidation of
+        LineageIndex.
+    """
+
+    def __init__(
+        self,
+        max_closure_columns: int = MAX_CLOSURE_COLUMNS,
+        max_closure_bits: int = MAX_CLOSURE_BITS,
+    ):
+        self.cursor = 0
+        self.max_closure_columns = max_closure_columns
+        self.max_closure_bits = max_closure_bits
+        self.searches = 0
+        self._successors: Dict[int, Set[int]] = defaultdict(set)
+        self._parent: Dict[int, int] = {}
+        self._members: Dict[int, List[int]] = {}
+        self._closures: "OrderedDict[int, Closure]" = OrderedDict()
+        self._closure_bits = 0
+        self._generation: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            logging.debug("Invalidate reachability index")
+            self.cursor = 0
+            self._successors = defaultdict(set)
+            self._parent = {}
+            self._members = {}
+            self._closures = OrderedDict()
+            self._closure_bits = 0
+
+    def sync(self, connection):
+        value = connection.get(LineageIndex.REDIS_KEY)
+        generation = int(value) if value is not None else 0
+        if self._generation is not None and self._generation != generation:
+            self.invalidate()
+        self._generation = generation
+
+    def refresh(self, session):
+        with self._lock:
+            rows, self.cursor = new_edges(session, self.cursor)
+            for source_id, target_id, _ in rows:
+                self._add_edge(source_id, target_id)
+
+    def _find(self, column_id: int) -> int:
+        if column_id not in self._parent:
+            self._parent[column_id] = column_id
+            self._members[column_id] = [column_id]
+            return column_id
+
+        root = column_id
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[column_id] != root:
+            self._parent[column_id], column_id = root, self._parent[column_id]
+        return root
+
+    def _drop_closure(self, root: int):
+        closure = self._closures.pop(root, None)
+        if closure is not None:
+            self._closure_bits -= closure.num_bits
+
+    def _add_edge(self, source_id: int, target_id: int):
+        if target_id in self._successors.get(source_id, ()):
+            return
+        self._successors[source_id].add(target_id)
+
+        source_root = self._find(source_id)
+        target_root = self._find(target_id)
+        self._drop_closure(source_root)
+        self._drop_closure(target_root)
+        if source_root != target_root:
+            if len(self._members[source_root]) < len(self._members[target_root]):
+                source_root, target_root = target_root, source_root
+            self._parent[target_root] = source_root
+            self._members[source_root].extend(self._members.pop(target_root))
+
+    def _closure(self, root: int) -> Optional[Closure]:
+        closure = self._closures.get(root)
+        if closure is not None:
+            self._closures.move_to_end(root)
+            return closure
+
+        members = self._members[root]
+        if len(members) > self.max_closure_columns:
+            return None
+        closure = Closure(members, self._successors)
+        if closure.num_bits > self.max_closure_bits:
+            return None
+
+        while self._closure_bits + closure.num_bits > self.max_closure_bits:
+            _, evicted = self._closures.popitem(last=False)
+            self._closure_bits -= evicted.num_bits
+        self._closures[root] = closure
+        self._closure_bits += closure.num_bits
+        logging.debug(
+            "Computed closure of {} columns in {} SCCs".format(
+                len(members), len(closure.reached)
+            )
+        )
+        return closure
+
+    def _search(self, sources: Set[int], targets: Set[int]) -> bool:
+        self.searches += 1
+        seen = set(sources)
+        queue = deque(sources)
+        while queue:
+            for successor in self._successors.get(queue.popleft(), ()):
+                if successor in targets:
+                    return True
+                if successor not in seen:
+                    seen.add(successor)
+                    queue.append(successor)
+        return False
+
+    def reaches(self, sources: Iterable[int], targets: Iterable[int]) -> bool:
+        """
+            Check if lineage flows from any of the source columns to any of the
+            target columns
+        :param sources: Ids of the source columns
+        :param targets: Ids of the target columns
+        """
+        with self._lock:
+            components: Dict[int, Set[int]] = defaultdict(set)
+            for column_id in targets:
+                if column_id in self._parent:
+                    components[self._find(column_id)].add(column_id)
+
+            starts: Dict[int, Set[int]] = defaultdict(set)
+            for column_id in sources:
+                if column_id in self._parent:
+                    root = self._find(column_id)
+                    if root in components:
+                        starts[root].add(column_id)
+
+            for root, component_sources in starts.items():
+                closure = self._closure(root)
+                if closure is not None:
+                    if closure.reaches(component_sources, components[root]):
+                        return True
+                elif self._search(component_sources, components[root]):
+                    return True
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "columns": len(self._parent),
+                "components": len(self._members),
+                "cursor": self.cursor,
+                "closures": len(self._closures),
+                "closure_bits": self._closure_bits,
+                "closure_edges": sum(
+                    closure.closure_edges() for closure in self._closures.values()
+                ),
+                "searches": self.searches,
+            }
+
+
+reachability_index = ReachabilityIndex()
@@ -0,0 +1,195 @@
+import logging
+from typing import Iterable, Optional, Set, Tuple
+
+from dbcat.catalog import Catalog
+from dbcat.catalog.models import Base, CatColumn, ColumnLineage, JobExecution
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Integer,
+    UniqueConstraint,
+    func,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import relationship
+
+
+class TableLineage(Base):
+    """
+        Table level rollup of ColumnLineage. There is one row for every source
+        table, target table and job with the last job execution that wrote a
+        column edge between the tables.
+    """
+
+    __tablename__ = "table_lineage"
+
+    id = Column(Integer, primary_key=True)
+    source_id = Column(Integer, ForeignKey("tables.id"), nullable=False)
+    target_id = Column(Integer, ForeignKey("tables.id"), nullable=False)
+    job_id = Column(Integer, ForeignKey("jobs.id"), nullable=False)
+    last_job_execution_id = Column(
+        Integer, ForeignKey("job_executions.id"), nullable=False
+    )
+
+    source = relationship("CatTable", foreign_keys=source_id)
+    target = relationship("CatTable", foreign_keys=target_id)
+    job = relationship("Job", foreign_keys=job_id)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "source_id", "target_id", "job_id", name="unique_table_lineage"
+        ),
+    )
+
+    def __repr__(self):
+        return "<Source: {}, Target: {}, Job: {}>".format(
+            self.source_id, self.target_id, self.job_id
+        )
+
+
+def init_table_lineage(catalog: Catalog):
+    """
+        Create the table_lineage table if it does not exist and fill it from
+        the column lineage that is already in the catalog.
+    """
+    with catalog.engine.connect() as connection:
+        if catalog.engine.dialect.has_table(connection, TableLineage.__tablename__):
+            return
+
+    logging.info("Create table lineage rollup")
+    TableLineage.__table__.create(catalog.engine, checkfirst=True)
+    with catalog.managed_session as session:
+        rebuild_table_lineage(session)
+        session.commit()
+
+
+def update_table_lineage(
+    session, edges: Iterable[Tuple[int, int]], job_id: int, job_execution_id: int
+):
+    """
+        Add the table edges of a job execution to the rollup
+    :param session: Session of the catalog
+    :param edges: Source and target table ids
+    :param job_id: Id of the job
+    :param job_execution_id: Id of the job execution that wrote the edges
+    """
+    values = [
+        {
+            "source_id": source_id,
+            "target_id": target_id,
+            "job_id": job_id,
+            "last_job_execution_id": job_execution_id,
+        }
+        for source_id, target_id in set(edges)
+    ]
+    if len(values) == 0:
+        return
+
+    statement = insert(TableLineage.__table__).values(values)
+    session.execute(
+        statement.on_conflict_do_update(
+            constraint="unique_table_lineage",
+            set_={
+                "last_job_execution_id": func.greatest(
+                    TableLineage.__table__.c.last_job_execution_id,
+                    statement.excluded.last_job_execution_id,
+                )
+            },
+        )
+    )
+    logging.debug("Rolled up {} table edges for {}".format(len(values), job_id))
+
+
+def _rollup_query(pairs: Optional[Set[Tuple[int, int]]] = None):
+    """
+        Aggregate of the column lineage by source table, target table and job
+    :param pairs: Only the source and target table ids of these pairs. None for
+        all the lineage.
+    """
+    source = CatColumn.__table__.alias("source")
+    target = CatColumn.__table__.alias("target")
+    lineage = ColumnLineage.__table__
+    executions = JobExecution.__table__
+
+    query = select(
+        [
+            source.c.table_id,
+            target.c.table_id,
+            executions.c.job_id,
+            func.max(executions.c.id),
+        ]
+    ).select_from(
+        lineage.join(source, lineage.c.source_id == source.c.id)
+        .join(target, lineage.c.target_id == target.c.id)
+        .join(executions, lineage.c.job_execution_id == executions.c.id)
+    )
+    if pairs is not None:
+        query = query.where(tuple_(source.c.table_id, target.c.table_id).in_(pairs))
+    return query.group_by(source.c.table_id, target.c.table_id, executions.c.job_id)
+
+
+def rebuild_table_lineage(session):
+    """
+        Replace the rollup with an aggregate of all the column lineage
+    """
+    session.query(TableLineage).delete()
+    session.execute(
+        TableLineage.__table__.insert().from_select(
+            ["source_id", "target_id", "job_id", "last_job_execution_id"],
+            _rollup_query(),
+        )
+    )
+
+
+def table_pairs(session, column_lineage_ids: Iterable[int]) -> Set[Tuple[int, int]]:
+    """
+        Source and target table ids of column lineage edges
+    """
+    source = CatColumn.__table__.alias("source")
+    target = CatColumn.__table__.alias("target")
+    lineage = ColumnLineage.__table__
+    return {
+        (source_table_id, target_table_id)
+        for source_table_id, target_table_id in session.execute(
+            select([source.c.table_id, target.c.table_id])
+            .select_from(
+                lineage.join(source, lineage.c.source_id == source.c.id).join(
+                    target, lineage.c.target_id == target.c.id
+                )
+            )
+            .where(lineage.c.id.in_(list(column_lineage_ids)))
+        )
+    }
+
+
+def refresh_table_lineage(session, pairs: Set[Tuple[int, int]]):
+    """
+        Recompute the rollup of some source and target tables after their
+        column lineage was updated or deleted
+    :param pairs: Source and target table ids
+    """
+    if len(pairs) == 0:
+        return
+
+    session.query(TableLineage).filter(
+        tuple_(TableLineage.source_id, TableLineage.target_id).in_(pairs)
+    ).delete(synchronize_session=False)
+    statement = insert(TableLineage.__table__).from_select(
+        ["source_id", "target_id", "job_id", "last_job_execution_id"],
+        _rollup_query(pairs),
+    )
+    # Edges of the pairs can be rolled up by a concurrent analyze
+    session.execute(
+        statement.on_conflict_do_update(
+            constraint="unique_table_lineage",
+            set_={
+                "last_job_execution_id": func.greatest(
+                    TableLineage.__table__.c.last_job_execution_id,
+                    statement.excluded.last_job_execution_id,
+                )
+            },
+        )
+    )
+    logging.debug("Refreshed the rollup of {} table pairs".format(len(pairs)))
@@ -1,6 +1,7 @@
 import datetime
+import json
 import logging
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, Generator, List, Optional, Set, Tuple, Union
 
 import flask_restless
 import gunicorn.app.base
@@ -16,21 +17,57 @@ from dbcat.catalog.models import (
     JobExecution,
     JobExecutionStatus,
 )
-from flask import Flask
-from flask_restful import Api, Resource, reqparse
+from flask import Flask, Response, g, request, stream_with_context
+from flask_restful import Api, Resource, inputs, reqparse
+from furl import furl
 from pglast.parser import ParseError
 from rq import Queue
 from rq import job as RqJob
-from werkzeug.exceptions import NotFound, UnprocessableEntity
+from sqlalchemy import func, literal, or_, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Query
+from werkzeug.exceptions import BadRequest, HTTPException, NotFound, UnprocessableEntity
 
 from data_lineage import ColumnNotFound, SemanticError, TableNotFound
+from data_lineage.cache import parse_cache, schema_cache
+from data_lineage.changelog import (
+    changed_job_executions,
+    commit_lineage_changes,
+    init_lineage_changes,
+    last_change,
+)
 from data_lineage.parser import (
     analyze_dml_query,
     extract_lineage,
     parse,
     parse_dml_query,
 )
-from data_lineage.worker import scan
+from data_lineage.reachability import reachability_index
+from data_lineage.rollup import (
+    TableLineage,
+    init_table_lineage,
+    refresh_table_lineage,
+    table_pairs,
+    update_table_lineage,
+)
+from data_lineage.traversal import (
+    DIRECTIONS,
+    LEVELS,
+    LineageIndex,
+    is_job,
+    lineage_index,
+)
+from data_lineage.worker import (
+    DEFAULT_BATCH_SIZE,
+    SCAN_TIMEOUT,
+    CatalogPool,
+    ScanIndex,
+    ScanProgress,
+    cancel_scan,
+    resume_scan,
+    scan,
+    scan_status,
+)
 
 
 class TableNotFoundHTTP(NotFound):
@@ -55,6 +92,103 @@ class SemanticErrorHTTP(UnprocessableEntity):
     code = 443
 
 
+class SchemaNotFoundHTTP(NotFound):
+    """Schema not found in catalog"""
+
+    code = 444
+
+
+def query_graph(
+    session, edges: Query
+) -> Tuple[List[Any], Dict[int, Tuple[str, str, str, str]]]:
+    """
+        Load a lineage graph in two queries, irrespective of the number of edges.
+        The first query returns the edges with their job. The second returns the
+        fully qualified names of all the columns in the edges.
+    :param session: Session of the catalog
+    :param edges: Query of the column lineage edges in the graph
+    :return: edge rows and a map of column id to fqdn
+    """
+    edge_rows = (
+        edges.join(JobExecution, ColumnLineage.job_execution_id == JobExecution.id)
+        .join(Job, JobExecution.job_id == Job.id)
+        .with_entities(
+            ColumnLineage.id,
+            ColumnLineage.source_id,
+            ColumnLineage.target_id,
+            Job.id.label("job_id"),
+            Job.name.label("job_name"),
+        )
+        .all()
+    )
+
+    column_ids = (
+        edges.order_by(None)
+        .with_entities(ColumnLineage.source_id)
+        .union(edges.order_by(None).with_entities(ColumnLineage.target_id))
+    )
+    column_rows = (
+        columns_query(session).filter(CatColumn.id.in_(column_ids.subquery())).all()
+    )
+
+    return edge_rows, {row.id: row[2:] for row in column_rows}
+
+
+def query_table_graph(
+    session, edges: Query
+) -> Tuple[List[Any], Dict[int, Tuple[str, str, str]]]:
+    """
+        Load a table level lineage graph from the rollup in two queries. The
+        rows have the same fields as the rows of query_graph.
+    :param session: Session of the catalog
+    :param edges: Query of the table lineage edges in the graph
+    :return: edge rows and a map of table id to fqdn
+    """
+    edge_rows = (
+        edges.join(Job, TableLineage.job_id == Job.id)
+        .with_entities(
+            TableLineage.id,
+            TableLineage.source_id,
+            TableLineage.target_id,
+            Job.id.label("job_id"),
+            Job.name.label("job_name"),
+        )
+        .all()
+    )
+
+    table_ids = (
+        edges.order_by(None)
+        .with_entities(TableLineage.source_id)
+        .union(edges.order_by(None).with_entities(TableLineage.target_id))
+    )
+    table_rows = (
+        session.query(CatTable.id, CatSource.name, CatSchema.name, CatTable.name)
+        .join(CatSchema, CatTable.schema_id == CatSchema.id)
+        .join(CatSource, CatSchema.source_id == CatSource.id)
+        .filter(CatTable.id.in_(table_ids.subquery()))
+        .all()
+    )
+
+    return edge_rows, {row[0]: row[1:] for row in table_rows}
+
+
+def columns_query(session) -> Query:
+    """
+        Query of the column id, table id and the parts of the fully qualified
+        name of columns
+    """
+    return (
+        session.query(CatColumn.id, CatColumn.table_id)
+        .add_columns(CatSource.name, CatSchema.name, CatTable.name, CatColumn.name)
+        .join(CatTable, CatColumn.table_id == CatTable.id)
+        .join(CatSchema, CatTable.schema_id == CatSchema.id)
+        .join(CatSource, CatSchema.source_id == CatSource.id)
+    )
+
+
+GRANULARITIES = ("column", "table")
+
+
 class Kedro(Resource):
     def __init__(self, catalog: Catalog):
         self._catalog = catalog
@@ -62,44 +196,564 @@ class Kedro(Resource):
         self._parser.add_argument(
             "job_ids", action="append", help="List of job ids for a sub graph"
         )
+        self._parser.add_argument(
+            "granularity",
+            choices=GRANULARITIES,
+            default="column",
+            help="Graph of column lineage or of the table lineage rollup",
+        )
 
     def get(self):
-        nodes = []
-        edges = []
+        args = self._parser.parse_args()
+        if args["granularity"] == "table":
+            return self._stream_graph(
+                lambda session, cursor: self._table_edges_query(
+                    session, args["job_ids"]
+                ),
+                granularity="table",
+            )
+        return self._stream_graph(
+            lambda session, cursor: self._edges_query(session, args["job_ids"])
+        )
 
+    @staticmethod
+    def _edges_query(session, job_ids: Optional[List[int]]) -> Query:
+        query = session.query(ColumnLineage)
+        if job_ids is not None and len(job_ids) > 0:
+            query = query.filter(
+                ColumnLineage.job_execution_id.in_(
+                    Catalog._get_latest_job_executions(session, job_ids).subquery()
+                )
+            )
+        return query.order_by(ColumnLineage.id)
+
+    @staticmethod
+    def _table_edges_query(session, job_ids: Optional[List[int]]) -> Query:
+        query = session.query(TableLineage)
+        if job_ids is not None and len(job_ids) > 0:
+            query = query.filter(TableLineage.job_id.in_(job_ids))
+        return query.order_by(TableLineage.id)
+
+    def _stream_graph(
+        self,
+        query_edges: Callable[[Any, int], Query],
+        granularity: str = "column",
+    ) -> Response:
+        return Response(
+            stream_with_context(self._graph_chunks(query_edges, granularity)),
+            mimetype="application/json",
+        )
+
+    def _graph_chunks(
+        self,
+        query_edges: Callable[[Any, int], Query],
+        granularity: str = "column",
+    ) -> Generator[str, None, None]:
+        """
+            Write the graph as JSON in a single pass over the lineage edges. Every
+            node is written once, when it is first seen. Unique edges are kept in
+            insertion order and written after all the nodes. The cursor is the
+            last change in the lineage change log. It is read before the edges,
+            so that the edges have at least the changes up to the cursor.
+        """
+        seen: Set[str] = set()
+        edges: Dict[Tuple[str, str], None] = {}
+        separator = ""
+
+        with self._catalog.managed_session as session:
+            cursor = last_change(session)
+            edges_query = query_edges(session, cursor)
+            if granularity == "table":
+                edge_rows, names = query_table_graph(session, edges_query)
+                data_info = self._table_info
+            else:
+                edge_rows, names = query_graph(session, edges_query)
+                data_info = self._column_info
+
+        yield '{"nodes": ['
+        for row in edge_rows:
+            source_id = "{}:{}".format(granularity, row.source_id)
+            target_id = "{}:{}".format(granularity, row.target_id)
+            task_id = "task:{}".format(row.job_id)
+
+            for node_id, build_info in (
+                (source_id, lambda: data_info(row.source_id, names)),
+                (target_id, lambda: data_info(row.target_id, names)),
+                (task_id, lambda: self._job_info(row.job_id, row.job_name)),
+            ):
+                if node_id not in seen:
+                    seen.add(node_id)
+                    yield separator + json.dumps(build_info())
+                    separator = ", "
+
+            edges[(source_id, task_id)] = None
+            edges[(task_id, target_id)] = None
+
+        yield '], "edges": ['
+        separator = ""
+        for source_id, target_id in edges.keys():
+            yield separator + json.dumps({"source": source_id, "target": target_id})
+            separator = ", "
+        yield '], "cursor": {}}}'.format(json.dumps(cursor))
+
+    @staticmethod
+    def _column_info(column_id: int, columns: Dict[int, Tuple[str, ...]]):
+        return {
+            "id": "column:{}".format(column_id),
+            "name": ".".join(columns[column_id]),
+            "type": "data",
+        }
+
+    @staticmethod
+    def _table_info(table_id: int, tables: Dict[int, Tuple[str, ...]]):
+        return {
+            "id": "table:{}".format(table_id),
+            "name": ".".join(tables[table_id]),
+            "type": "data",
+        }
+
+    @staticmethod
+    def _job_info(job_id: int, name: str):
+        return {"id": "task:{}".format(job_id), "name": name, "type": "task"}
+
+
+class KedroDelta(Kedro):
+    def __init__(self, catalog: Catalog):
+        super(KedroDelta, self).__init__(catalog)
+        self._parser.add_argument(
+            "since",
+            type=int,
+            default=0,
+            help="Return the edges of the changes after this cursor",
+        )
+
+    def get(self):
         args = self._parser.parse_args()
-        with self._catalog.managed_session:
-            column_edges = self._catalog.get_column_lineages(args["job_ids"])
-            for edge in column_edges:
-                nodes.append(self._column_info(edge.source))
-                nodes.append(self._column_info(edge.target))
-                nodes.append(self._job_info(edge.job_execution.job))
-                edges.append(
-                    {
-                        "source": "column:{}".format(edge.source_id),
-                        "target": "task:{}".format(edge.job_execution.job_id),
-                    }
+        job_ids = args["job_ids"]
+
+        def changed(session, cursor: int):
+            return changed_job_executions(session, args["since"], cursor).subquery()
+
+        if args["granularity"] == "table":
+            # The rollup is per job, so the table edges of the jobs that changed
+            # are returned
+            return self._stream_graph(
+                lambda session, cursor: self._table_edges_query(
+                    session, job_ids
+                ).filter(
+                    TableLineage.job_id.in_(
+                        session.query(JobExecution.job_id)
+                        .filter(JobExecution.id.in_(changed(session, cursor)))
+                        .subquery()
+                    )
+                ),
+                granularity="table",
+            )
+        return self._stream_graph(
+            lambda session, cursor: self._edges_query(session, job_ids).filter(
+                ColumnLineage.job_execution_id.in_(changed(session, cursor))
+            )
+        )
+
+
+# Depth at which a recursive query stops. It bounds the rows of cycles in the
+# lineage as well as long chains of jobs.
+MAX_CTE_DEPTH = 100
+# Largest page that clients can request from the catalog API
+MAX_PAGE_SIZE = 1000
+
+
+def traverse_cte(
+    session, direction: str, start: List[str], max_depth: Optional[int] = None
+) -> Tuple[Dict[str, int], bool]:
+    """
+        Traverse the lineage of columns or tasks with a recursive query over
+        the column_lineage table, so that only the reachable edges are read.
+        The query is a UNION of distinct (column, job, depth) rows and stops at
+        max_depth or MAX_CTE_DEPTH, whichever is lower. A cycle adds one row
+        per depth, so the depth limit also ends cycles.
+    :param session: Session of the catalog
+    :param direction: upstream or downstream
+    :param start: Column or task ids to start from. For e.g. column:1
+    :param max_depth: Maximum number of jobs to traverse. None for no limit.
+    :return: Map of node id to depth of all the columns and tasks that were
+        reached, and True if the traversal stopped at MAX_CTE_DEPTH before
+        max_depth
+    """
+    column_ids = [int(node[len("column:") :]) for node in start if not is_job(node)]
+    job_ids = [int(node[len("task:") :]) for node in start if is_job(node)]
+    limit = MAX_CTE_DEPTH if max_depth is None else min(max_depth, MAX_CTE_DEPTH)
+    if limit < 1 or (len(column_ids) == 0 and len(job_ids) == 0):
+        return {}, False
+
+    lineage = ColumnLineage.__table__
+    executions = JobExecution.__table__
+    if direction == "downstream":
+        near, far = lineage.c.source_id, lineage.c.target_id
+    else:
+        near, far = lineage.c.target_id, lineage.c.source_id
+    edges = lineage.join(executions, lineage.c.job_execution_id == executions.c.id)
+
+    reached = (
+        select(
+            [
+                far.label("column_id"),
+                executions.c.job_id.label("job_id"),
+                literal(1).label("depth"),
+            ]
+        )
+        .select_from(edges)
+        .where(or_(near.in_(column_ids), executions.c.job_id.in_(job_ids)))
+        .cte("reached", recursive=True)
+    )
+    reached = reached.union(
+        select([far, executions.c.job_id, reached.c.depth + 1])
+        .select_from(edges.join(reached, near == reached.c.column_id))
+        .where(reached.c.depth < limit)
+    )
+
+    depths: Dict[str, int] = {}
+    pairs: Dict[Tuple[int, int], int] = {}
+    rows = session.execute(
+        select(
+            [reached.c.column_id, reached.c.job_id, func.min(reached.c.depth)]
+        ).group_by(reached.c.column_id, reached.c.job_id)
+    )
+    for column_id, job_id, depth in rows:
+        pairs[(column_id, job_id)] = depth
+        for node_id in ("column:{}".format(column_id), "task:{}".format(job_id)):
+            depths[node_id] = min(depth, depths.get(node_id, depth))
+
+    for node_id in start:
+        depths.pop(node_id, None)
+
+    truncated = False
+    if limit == MAX_CTE_DEPTH and (max_depth is None or max_depth > MAX_CTE_DEPTH):
+        # The traversal was cut short if an edge out of the deepest columns
+        # leads to a column and job that were not reached
+        frontier = [
+            column_id for (column_id, _), depth in pairs.items() if depth == limit
+        ]
+        if len(frontier) > 0:
+            beyond = session.execute(
+                select([far, executions.c.job_id])
+                .select_from(edges)
+                .where(near.in_(frontier))
+                .distinct()
+            )
+            truncated = any(
+                (column_id, job_id) not in pairs for column_id, job_id in beyond
+            )
+    return depths, truncated
+
+
+class Lineage(Resource):
+    def __init__(self, catalog: Catalog):
+        self._catalog = catalog
+        self._parser = reqparse.RequestParser()
+        self._parser.add_argument(
+            "node",
+            required=True,
+            help="Column, table or task to start from. For e.g. column:1 or table:1",
+        )
+        self._parser.add_argument(
+            "depth", type=int, help="Maximum number of jobs to traverse"
+        )
+        self._parser.add_argument(
+            "level",
+            choices=LEVELS,
+            default="column",
+            help="Aggregate the lineage by column, table or job",
+        )
+        self._parser.add_argument(
+            "mode",
+            choices=("index", "cte"),
+            default="index",
+            help="Traverse the lineage index in the server or run a recursive "
+            "query in the catalog database",
+        )
+
+    def get(self, direction: str):
+        if direction not in DIRECTIONS:
+            raise NotFound("Unknown direction: {}".format(direction))
+
+        args = self._parser.parse_args()
+        with self._catalog.managed_session as session:
+            start = self._start_nodes(session, args["node"])
+            truncated = False
+            if args["mode"] == "cte":
+                depths, truncated = traverse_cte(
+                    session, direction, start, args["depth"]
                 )
-                edges.append(
-                    {
-                        "source": "task:{}".format(edge.job_execution.job_id),
-                        "target": "column:{}".format(edge.target_id),
+            else:
+                lineage_index.refresh(session)
+                depths = lineage_index.traverse(direction, start, args["depth"])
+            nodes = self._aggregate(session, depths, args["level"])
+
+        return {"nodes": nodes, "truncated": truncated}, 200
+
+    @staticmethod
+    def _start_nodes(session, node: str) -> List[str]:
+        node_type, _, node_id = node.partition(":")
+        if not node_id.isdigit() or node_type not in ("column", "table", "task"):
+            raise BadRequest("Invalid node: {}".format(node))
+
+        if node_type != "table":
+            return [node]
+
+        column_ids = session.query(CatColumn.id).filter(
+            CatColumn.table_id == int(node_id)
+        )
+        return ["column:{}".format(column_id) for (column_id,) in column_ids]
+
+    @staticmethod
+    def _aggregate(session, depths: Dict[str, int], level: str) -> List[Dict[str, Any]]:
+        nodes = []
+        ids = {
+            int(node_id.partition(":")[2]): depth
+            for node_id, depth in depths.items()
+            if is_job(node_id) == (level == "job")
+        }
+
+        if level == "job":
+            jobs = session.query(Job.id, Job.name).filter(Job.id.in_(ids.keys()))
+            for job_id, name in jobs:
+                nodes.append(Kedro._job_info(job_id, name))
+                nodes[-1]["depth"] = ids[job_id]
+        elif len(ids) > 0:
+            tables: Dict[int, Dict[str, Any]] = {}
+            for row in columns_query(session).filter(CatColumn.id.in_(ids.keys())):
+                if level == "column":
+                    nodes.append(Kedro._column_info(row.id, {row.id: row[2:]}))
+                    nodes[-1]["depth"] = ids[row.id]
+                elif row.table_id not in tables:
+                    tables[row.table_id] = {
+                        "id": "table:{}".format(row.table_id),
+                        "name": ".".join(row[2:5]),
+                        "type": "table",
+                        "depth": ids[row.id],
                     }
+                else:
+                    table = tables[row.table_id]
+                    table["depth"] = min(table["depth"], ids[row.id])
+            nodes.extend(tables.values())
+
+        return sorted(nodes, key=lambda n: (n["depth"], n["name"]))
+
+
+FQDN_COLUMNS = (CatSource.name, CatSchema.name, CatTable.name, CatColumn.name)
+
+
+def _by_fqdn(session, names: Set[Tuple[str, ...]]) -> Dict[Tuple[str, ...], Any]:
+    length = len(next(iter(names)))
+    model = (CatSource, CatSchema, CatTable, CatColumn)[length - 1]
+    query = session.query(model, *FQDN_COLUMNS[:length]).select_from(model)
+    for parent in (CatColumn.table, CatTable.schema, CatSchema.source)[4 - length :]:
+        query = query.join(parent)
+    query = query.filter(tuple_(*FQDN_COLUMNS[:length]).in_(list(names)))
+    return {tuple(row[1:]): row[0] for row in query}
+
+
+def resolve_names(
+    session, names: List[Tuple[str, ...]]
+) -> List[Union[CatTable, CatColumn, HTTPException]]:
+    """
+        Resolve tables and columns by their fully qualified names. All the
+        columns are loaded in one query and all the tables in another. The
+        schemata are only loaded to report the names that were not found.
+    :param session: Session of the catalog
+    :param names: source, schema and table name of a table and the column name
+        as well for a column
+    :return: table, column or the not found error of every name, in the same
+        order as names
+    """
+    for name in names:
+        if len(name) not in (3, 4):
+            raise BadRequest("Invalid name: {}".format(list(name)))
+
+    found: Dict[Tuple[str, ...], Any] = {}
+    pending = set(names)
+    for length in (4, 3, 2):
+        level = {name[:length] for name in pending if len(name) >= length}
+        if len(level) > 0:
+            found.update(_by_fqdn(session, level))
+        pending = {name for name in pending if name[:length] not in found}
+
+    results: List[Union[CatTable, CatColumn, HTTPException]] = []
+    for name in names:
+        if name in found:
+            results.append(found[name])
+        elif name[:3] in found:
+            results.append(
+                ColumnNotFoundHTTP(
+                    description="Column not found, (source_name={}, schema_name={}, "
+                    "table_name={}, column_name={})".format(*name)
+                )
+            )
+        elif name[:2] in found:
+            results.append(
+                TableNotFoundHTTP(
+                    description="Table not found, (source_name={}, schema_name={}, "
+                    "table_name={})".format(*name[:3])
                 )
+            )
+        else:
+            results.append(
+                SchemaNotFoundHTTP(
+                    description="Schema not found, (source_name={}, "
+                    "schema_name={})".format(*name[:2])
+                )
+            )
+    return results
 
-        return {"nodes": nodes, "edges": edges}
 
-    @staticmethod
-    def _column_info(node: CatColumn):
+def fqdn_serializer(instance: Union[CatTable, CatColumn]) -> Dict[str, Any]:
+    if isinstance(instance, CatColumn):
         return {
-            "id": "column:{}".format(node.id),
-            "name": ".".join(node.fqdn),
-            "type": "data",
+            "id": instance.id,
+            "type": "columns",
+            "attributes": {
+                "name": instance.name,
+                "data_type": instance.data_type,
+                "sort_order": instance.sort_order,
+                "table_id": instance.table_id,
+                "fqdn": instance.fqdn,
+            },
         }
+    return {
+        "id": instance.id,
+        "type": "tables",
+        "attributes": {
+            "name": instance.name,
+            "schema_id": instance.schema_id,
+            "fqdn": instance.fqdn,
+        },
+    }
+
+
+class Resolve(Resource):
+    def __init__(self, catalog: Catalog):
+        self._catalog = catalog
+        self._parser = reqparse.RequestParser()
+        self._parser.add_argument("source", required=True, help="Name of the source")
+        self._parser.add_argument("schema", required=True, help="Name of the schema")
+        self._parser.add_argument("table", required=True, help="Name of the table")
+        self._parser.add_argument("column", help="Name of the column")
+
+    def get(self):
+        args = self._parser.parse_args()
+        name = (args["source"], args["schema"], args["table"])
+        if args["column"] is not None:
+            name = name + (args["column"],)
+
+        with self._catalog.managed_session as session:
+            (result,) = resolve_names(session, [name])
+            if isinstance(result, HTTPException):
+                raise result
+            return {"data": fqdn_serializer(result)}, 200
+
+
+class ResolveBatch(Resource):
+    def __init__(self, catalog: Catalog):
+        self._catalog = catalog
+        self._parser = reqparse.RequestParser()
+        self._parser.add_argument(
+            "names",
+            type=list,
+            action="append",
+            location="json",
+            required=True,
+            help="List of [source, schema, table] or [source, schema, table, column]",
+        )
+
+    def post(self):
+        args = self._parser.parse_args()
+        names = [tuple(name) for name in args["names"]]
+        logging.debug("Resolve {} names".format(len(names)))
+
+        with self._catalog.managed_session as session:
+            return (
+                {
+                    "data": [
+                        AnalyzeBatch._error(result)
+                        if isinstance(result, HTTPException)
+                        else {"data": fqdn_serializer(result)}
+                        for result in resolve_names(session, names)
+                    ]
+                },
+                200,
+            )
+
+
+class Reaches(Resource):
+    def __init__(self, catalog: Catalog):
+        self._catalog = catalog
+        self._parser = reqparse.RequestParser()
+        self._parser.add_argument(
+            "source", required=True, help="Column or table. For e.g. column:1"
+        )
+        self._parser.add_argument(
+            "target", required=True, help="Column or table. For e.g. table:1"
+        )
+        self._bulk_parser = reqparse.RequestParser()
+        self._bulk_parser.add_argument(
+            "pairs",
+            type=dict,
+            action="append",
+            required=True,
+            location="json",
+            help="List of source and target pairs",
+        )
+
+    def get(self):
+        args = self._parser.parse_args()
+        return {"reaches": self._reaches([args])[0]}, 200
+
+    def post(self):
+        args = self._bulk_parser.parse_args()
+        return {"reaches": self._reaches(args["pairs"])}, 200
+
+    def _reaches(self, pairs: List[Dict[str, str]]) -> List[bool]:
+        columns: Dict[str, List[int]] = {}
+        with self._catalog.managed_session as session:
+            reachability_index.refresh(session)
+
+            def resolve(node: str) -> List[int]:
+                if node not in columns:
+                    columns[node] = self._columns(session, node)
+                return columns[node]
+
+            return [
+                reachability_index.reaches(
+                    resolve(pair.get("source", "")), resolve(pair.get("target", ""))
+                )
+                for pair in pairs
+            ]
 
     @staticmethod
-    def _job_info(node: Job):
-        return {"id": "task:{}".format(node.id), "name": node.name, "type": "task"}
+    def _columns(session, node: str) -> List[int]:
+        node_type, _, node_id = node.partition(":")
+        if not node_id.isdigit() or node_type not in ("column", "table"):
+            raise BadRequest("Invalid node: {}".format(node))
+
+        if node_type == "column":
+            return [int(node_id)]
+        return [
+            column_id
+            for (column_id,) in session.query(CatColumn.id).filter(
+                CatColumn.table_id == int(node_id)
+            )
+        ]
+
+
+def connection_args(catalog: PGCatalog) -> Dict[str, Any]:
+    return {
+        "user": catalog.user,
+        "password": catalog.password,
+        "database": catalog.database,
+        "host": catalog.host,
+        "port": catalog.port,
+    }
 
 
 class ScanList(Resource):
@@ -108,36 +762,113 @@ class ScanList(Resource):
         self._queue = queue
         self._parser = reqparse.RequestParser()
         self._parser.add_argument("id", required=True, help="ID of the resource")
+        self._parser.add_argument(
+            "batch_size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of tables scanned by a job",
+        )
+        self._parser.add_argument(
+            "incremental",
+            type=inputs.boolean,
+            default=False,
+            help="Only write the tables that changed since the last scan",
+        )
+        self._list_parser = reqparse.RequestParser()
+        self._list_parser.add_argument(
+            "source_id", type=int, location="args", help="Only the scans of a source"
+        )
+        self._list_parser.add_argument(
+            "status",
+            choices=("queued", "started", "finished", "failed", "deferred", "stopped"),
+            location="args",
+            help="Only the scans whose job has this status",
+        )
+        self._list_parser.add_argument(
+            "since",
+            type=inputs.datetime_from_iso8601,
+            location="args",
+            help="Only the scans queued at or after this time",
+        )
+        self._list_parser.add_argument(
+            "until",
+            type=inputs.datetime_from_iso8601,
+            location="args",
+            help="Only the scans queued at or before this time",
+        )
+        self._list_parser.add_argument(
+            "page[number]", type=inputs.positive, default=1, location="args"
+        )
+        self._list_parser.add_argument(
+            "page[size]", type=inputs.positive, default=100, location="args"
+        )
+
+    @staticmethod
+    def _utc(value: datetime.datetime) -> datetime.datetime:
+        # RQ and times without an offset are in UTC
+        if value.tzinfo is None:
+            return value.replace(tzinfo=datetime.timezone.utc)
+        return value
+
+    @staticmethod
+    def _timestamp(value: Optional[datetime.datetime]) -> Optional[float]:
+        return ScanList._utc(value).timestamp() if value is not None else None
 
     def post(self):
         args = self._parser.parse_args()
         logging.info("Args for scanning: {}".format(args))
         job = self._queue.enqueue(
             scan,
-            {
-                "user": self._catalog.user,
-                "password": self._catalog.password,
-                "database": self._catalog.database,
-                "host": self._catalog.host,
-                "port": self._catalog.port,
-            },
+            connection_args(self._catalog),
             int(args["id"]),
+            max(args["batch_size"], 1),
+            args["incremental"],
+            job_timeout=SCAN_TIMEOUT,
+            result_ttl=ScanProgress.TTL,
+        )
+        ScanIndex(self._queue).add(
+            job.id, int(args["id"]), self._timestamp(job.enqueued_at)
         )
 
         return {"id": job.id, "status": "queued"}, 200
 
     def get(self):
-        job_list = []
-        for job in self._queue.started_job_registry.get_job_ids():
-            job_list.append({"id": job, "status": "started"})
-
-        for job in self._queue.finished_job_registry.get_job_ids():
-            job_list.append({"id": job, "status": "finished"})
+        args = self._list_parser.parse_args()
+        number = args["page[number]"]
+        size = min(args["page[size]"], MAX_PAGE_SIZE)
+        jobs, total = ScanIndex(self._queue).list(
+            source_id=args["source_id"],
+            status=args["status"],
+            since=self._timestamp(args["since"]),
+            until=self._timestamp(args["until"]),
+            offset=(number - 1) * size,
+            limit=size,
+        )
 
-        for job in self._queue.failed_job_registry.get_job_ids():
-            job_list.append({"id": job, "status": "failed"})
+        has_next = len(jobs) == size if total is None else number * size < total
+        next_url = None
+        if has_next:
+            url = furl(request.url)
+            url.args["page[number]"] = number + 1
+            url.args["page[size]"] = size
+            next_url = url.url
 
-        return job_list, 200
+        return (
+            {
+                "data": [
+                    {
+                        "id": job.id,
+                        "status": status,
+                        "source_id": job.args[1],
+                        "enqueued_at": self._utc(job.enqueued_at).isoformat(),
+                    }
+                    for job, status in jobs
+                ],
+                "meta": {"total": total},
+                "links": {"next": next_url},
+            },
+            200,
+        )
 
 
 class Scan(Resource):
@@ -148,14 +879,34 @@ class Scan(Resource):
         self._parser.add_argument("id", required=True, help="ID of the resource")
 
     def get(self, job_id):
-        status = RqJob.Job.fetch(job_id, connection=self._queue.connection).get_status()
-        return {"id": job_id, "status": status}, 200
+        job = RqJob.Job.fetch(job_id, connection=self._queue.connection)
+        status, stats = scan_status(job)
+        response: Dict[str, Any] = {"id": job_id, "status": status}
+        # Published by the scan and its batches. See scan_progress()
+        if "progress" in job.meta:
+            response["progress"] = job.meta["progress"]
+        if stats is not None:
+            response["progress"] = dict(response.get("progress", {}), **stats)
+        return response, 200
 
     def put(self, job_id):
         RqJob.Job.fetch(job_id, connection=self._queue.connection).cancel()
+        cancel_scan(self._queue.connection, job_id)
         return {"message": "Job {} cancelled".format(job_id)}, 200
 
 
+class ScanResume(Resource):
+    def __init__(self, catalog: PGCatalog, queue: Queue):
+        self._catalog = catalog
+        self._queue = queue
+
+    def post(self, job_id):
+        if not ScanProgress(self._queue.connection, job_id).exists():
+            raise NotFound("Scan {} has no batches".format(job_id))
+        resumed = resume_scan(self._queue, connection_args(self._catalog), job_id)
+        return {"id": job_id, "resumed": resumed}, 200
+
+
 class Parse(Resource):
     def __init__(self, catalog: Catalog):
         self._catalog = catalog
@@ -168,11 +919,8 @@ class Parse(Resource):
     def post(self):
         args = self._parser.parse_args()
         logging.debug("Parse query: {}".format(args["query"]))
-        try:
-            parsed = parse(args["query"], "parse_api")
-        except ParseError as error:
-            raise ParseErrorHTTP(description=str(error))
-
+        # The query is parsed when it is visited, unless it is in the parse cache
+        parsed = parse(args["query"], "parse_api")
         try:
             with self._catalog.managed_session:
                 source = self._catalog.get_source_by_id(args["source_id"])
@@ -188,6 +936,8 @@ class Parse(Resource):
                     },
                     200,
                 )
+        except ParseError as error:
+            raise ParseErrorHTTP(description=str(error))
         except TableNotFound as table_error:
             raise TableNotFoundHTTP(description=str(table_error))
         except ColumnNotFound as column_error:
@@ -215,11 +965,7 @@ class Analyze(Resource):
     def post(self):
         args = self._parser.parse_args()
         logging.debug("Parse query: {}".format(args["query"]))
-        try:
-            parsed = parse(args["query"], args["name"])
-        except ParseError as error:
-            raise ParseErrorHTTP(description=str(error))
-
+        parsed = parse(args["query"], args["name"])
         try:
             with self._catalog.managed_session:
                 source = self._catalog.get_source_by_id(args["source_id"])
@@ -253,6 +999,8 @@ class Analyze(Resource):
                     },
                     200,
                 )
+        except ParseError as error:
+            raise ParseErrorHTTP(description=str(error))
         except TableNotFound as table_error:
             raise TableNotFoundHTTP(description=str(table_error))
         except ColumnNotFound as column_error:
@@ -261,6 +1009,119 @@ class Analyze(Resource):
             raise SemanticErrorHTTP(description=str(semantic_error))
 
 
+class AnalyzeBatch(Resource):
+    def __init__(self, catalog: Catalog):
+        self._catalog = catalog
+        self._parser = reqparse.RequestParser()
+        self._parser.add_argument(
+            "queries",
+            type=dict,
+            action="append",
+            location="json",
+            required=True,
+            help="List of queries with name, start_time and end_time",
+        )
+        self._parser.add_argument(
+            "source_id", help="Source database of the queries", required=True
+        )
+        self._parser.add_argument(
+            "chunk_size",
+            type=int,
+            default=100,
+            help="Number of queries processed per session",
+        )
+
+    def post(self):
+        args = self._parser.parse_args()
+        queries = args["queries"]
+        chunk_size = max(args["chunk_size"], 1)
+        logging.debug("Analyze batch of {} queries".format(len(queries)))
+
+        results: List[Dict[str, Any]] = []
+        for start in range(0, len(queries), chunk_size):
+            with self._catalog.managed_session as session:
+                source = self._catalog.get_source_by_id(args["source_id"])
+                chunk = [
+                    self._analyze(session, query, source)
+                    for query in queries[start : start + chunk_size]
+                ]
+                commit_lineage_changes(
+                    session,
+                    [result["data"]["id"] for result in chunk if "data" in result],
+                )
+                results.extend(chunk)
+
+        return {"data": results}, 200
+
+    def _analyze(
+        self, session, query: Dict[str, Any], source: CatSource
+    ) -> Dict[str, Any]:
+        try:
+            if not isinstance(query.get("query"), str):
+                raise ValueError("query is required")
+            start_time = datetime.datetime.fromisoformat(query["start_time"])
+            end_time = datetime.datetime.fromisoformat(query["end_time"])
+        except KeyError as error:
+            return AnalyzeBatch._error(
+                BadRequest(description="{} is required".format(error.args[0]))
+            )
+        except (TypeError, ValueError) as error:
+            return AnalyzeBatch._error(BadRequest(description=str(error)))
+
+        parsed = parse(query["query"], query.get("name"))
+        # A savepoint per query, so that a query that fails after it wrote to
+        # the session does not roll back the rest of the chunk
+        try:
+            with session.begin_nested():
+                chosen_visitor = analyze_dml_query(self._catalog, parsed, source)
+                job_execution = extract_lineage(
+                    catalog=self._catalog,
+                    visited_query=chosen_visitor,
+                    source=source,
+                    parsed=parsed,
+                    start_time=start_time,
+                    end_time=end_time,
+                    commit=False,
+                )
+        except ParseError as error:
+            return AnalyzeBatch._error(ParseErrorHTTP(description=str(error)))
+        except TableNotFound as table_error:
+            return AnalyzeBatch._error(TableNotFoundHTTP(description=str(table_error)))
+        except ColumnNotFound as column_error:
+            return AnalyzeBatch._error(
+                ColumnNotFoundHTTP(description=str(column_error))
+            )
+        except SemanticError as semantic_error:
+            return AnalyzeBatch._error(
+                SemanticErrorHTTP(description=str(semantic_error))
+            )
+        except SQLAlchemyError as error:
+            logging.warning("Failed {}: {}".format(parsed.name, error))
+            return AnalyzeBatch._error(UnprocessableEntity(description=str(error)))
+
+        return {"data": job_execution_serializer(job_execution, [])}
+
+    @staticmethod
+    def _error(error: HTTPException) -> Dict[str, Any]:
+        return {"error": {"code": error.code, "message": error.description}}
+
+
+class CacheStats(Resource):
+    def __init__(self, queue: Queue):
+        self._queue = queue
+
+    def get(self):
+        return (
+            {
+                "schema_cache": schema_cache.stats(),
+                "parse_cache": parse_cache.stats(),
+                "reachability_index": reachability_index.stats(),
+                "catalog_pools": CatalogPool.collect(self._queue.connection),
+            },
+            200,
+        )
+
+
 class Server(gunicorn.app.base.BaseApplication):
     def __init__(self, app):
         self.application = app
@@ -331,6 +1192,8 @@ def create_server(
     )
 
     init_db(catalog)
+    init_table_lineage(catalog)
+    init_lineage_changes(catalog)
 
     restful_catalog = PGCatalog(
         **catalog_options,
@@ -340,6 +1203,72 @@ def create_server(
 
     app = Flask(__name__)
     queue = Queue(is_async=is_production, connection=connection)
+    schema_cache.attach(connection)
+
+    @app.before_request
+    def sync_caches():
+        schema_cache.sync(connection)
+        lineage_index.sync(connection)
+        reachability_index.sync(connection)
+
+    def invalidate_schema_cache(**kwargs):
+        schema_cache.notify()
+
+    def invalidate_lineage_index(**kwargs):
+        lineage_index.invalidate()
+        reachability_index.invalidate()
+        LineageIndex.publish(connection)
+
+    schema_postprocessors = {
+        "POST_RESOURCE": [invalidate_schema_cache],
+        "PATCH_RESOURCE": [invalidate_schema_cache],
+        "DELETE_RESOURCE": [invalidate_schema_cache],
+    }
+
+    def add_table_lineage_rollup(result=None, **kwargs):
+        with restful_catalog.managed_session as session:
+            edge = session.query(ColumnLineage).get(int(result["data"]["id"]))
+            update_table_lineage(
+                session,
+                [(edge.source.table_id, edge.target.table_id)],
+                edge.job_execution.job_id,
+                edge.job_execution_id,
+            )
+            commit_lineage_changes(session, [edge.job_execution_id])
+
+    # Only the rollup of the tables of an edge is recomputed when it changes
+    def find_table_lineage_pairs(resource_id=None, **kwargs):
+        g.column_lineage_id = int(resource_id)
+        with restful_catalog.managed_session as session:
+            g.table_lineage_pairs = table_pairs(session, [g.column_lineage_id])
+
+    def refresh_table_lineage_rollup(**kwargs):
+        with restful_catalog.managed_session as session:
+            pairs = g.table_lineage_pairs | table_pairs(session, [g.column_lineage_id])
+            refresh_table_lineage(session, pairs)
+            # A patched edge is sent to delta clients again. Deleted edges
+            # require a reload of the graph.
+            edge = session.query(ColumnLineage).get(g.column_lineage_id)
+            commit_lineage_changes(
+                session, [edge.job_execution_id] if edge is not None else []
+            )
+
+    lineage_postprocessors = {
+        "POST_RESOURCE": [invalidate_lineage_index],
+        "PATCH_RESOURCE": [invalidate_lineage_index],
+        "DELETE_RESOURCE": [invalidate_lineage_index],
+    }
+
+    column_lineage_preprocessors = {
+        "PATCH_RESOURCE": [find_table_lineage_pairs],
+        "DELETE_RESOURCE": [find_table_lineage_pairs],
+    }
+
+    column_lineage_postprocessors = {
+        "POST_RESOURCE": [invalidate_lineage_index, add_table_lineage_rollup],
+        "PATCH_RESOURCE": [invalidate_lineage_index, refresh_table_lineage_rollup],
+        "DELETE_RESOURCE": [invalidate_lineage_index, refresh_table_lineage_rollup],
+    }
 
     # Create CRUD APIs
     methods = ["DELETE", "GET", "PATCH", "POST"]
@@ -349,45 +1278,65 @@ def create_server(
         CatSource,
         methods=methods,
         url_prefix=url_prefix,
+        max_page_size=MAX_PAGE_SIZE,
         additional_attributes=["fqdn"],
+        postprocessors=schema_postprocessors,
     )
     api_manager.create_api(
         CatSchema,
         methods=methods,
         url_prefix=url_prefix,
+        max_page_size=MAX_PAGE_SIZE,
         additional_attributes=["fqdn"],
+        postprocessors=schema_postprocessors,
     )
     api_manager.create_api(
         CatTable,
         methods=methods,
         url_prefix=url_prefix,
+        max_page_size=MAX_PAGE_SIZE,
         additional_attributes=["fqdn"],
+        postprocessors=schema_postprocessors,
     )
     api_manager.create_api(
         CatColumn,
         methods=methods,
         url_prefix=url_prefix,
+        max_page_size=MAX_PAGE_SIZE,
         additional_attributes=["fqdn"],
+        postprocessors=schema_postprocessors,
+    )
+    api_manager.create_api(
+        Job,
+        methods=methods,
+        url_prefix=url_prefix,
+        max_page_size=MAX_PAGE_SIZE,
+        postprocessors=lineage_postprocessors,
     )
-    api_manager.create_api(Job, methods=methods, url_prefix=url_prefix)
     api_manager.create_api(
         JobExecution,
         methods=methods,
         url_prefix=url_prefix,
+        max_page_size=MAX_PAGE_SIZE,
         serializer=job_execution_serializer,
         deserializer=job_execution_deserializer,
+        postprocessors=lineage_postprocessors,
     )
     api_manager.create_api(
         ColumnLineage,
         methods=methods,
         url_prefix=url_prefix,
+        max_page_size=MAX_PAGE_SIZE,
         collection_name="column_lineage",
+        preprocessors=column_lineage_preprocessors,
+        postprocessors=column_lineage_postprocessors,
     )
 
     api_manager.create_api(
         DefaultSchema,
         methods=methods,
         url_prefix=url_prefix,
+        max_page_size=MAX_PAGE_SIZE,
         collection_name="default_schema",
         primary_key="source_id",
     )
@@ -396,6 +1345,27 @@ def create_server(
     restful_manager.add_resource(
         Kedro, "/api/main", resource_class_kwargs={"catalog": restful_catalog}
     )
+    restful_manager.add_resource(
+        KedroDelta,
+        "/api/main/delta",
+        resource_class_kwargs={"catalog": restful_catalog},
+    )
+    restful_manager.add_resource(
+        Lineage,
+        "/api/v1/lineage/<direction>",
+        resource_class_kwargs={"catalog": restful_catalog},
+    )
+    restful_manager.add_resource(
+        Resolve, "/api/v1/resolve", resource_class_kwargs={"catalog": restful_catalog}
+    )
+    restful_manager.add_resource(
+        ResolveBatch,
+        "/api/v1/resolve/batch",
+        resource_class_kwargs={"catalog": restful_catalog},
+    )
+    restful_manager.add_resource(
+        Reaches, "/api/v1/reaches", resource_class_kwargs={"catalog": restful_catalog}
+    )
     restful_manager.add_resource(
         ScanList,
         "/api/v1/scan",
@@ -408,14 +1378,30 @@ def create_server(
         resource_class_kwargs={"catalog": restful_catalog, "queue": queue},
     )
 
+    restful_manager.add_resource(
+        ScanResume,
+        "/api/v1/scan/<job_id>/resume",
+        resource_class_kwargs={"catalog": restful_catalog, "queue": queue},
+    )
+
     restful_manager.add_resource(
         Analyze, "/api/v1/analyze", resource_class_kwargs={"catalog": restful_catalog}
     )
 
+    restful_manager.add_resource(
+        AnalyzeBatch,
+        "/api/v1/analyze/batch",
+        resource_class_kwargs={"catalog": restful_catalog},
+    )
+
     restful_manager.add_resource(
         Parse, "/api/v1/parse", resource_class_kwargs={"catalog": restful_catalog}
     )
 
+    restful_manager.add_resource(
+        CacheStats, "/api/v1/cache", resource_class_kwargs={"queue": queue}
+    )
+
     for rule in app.url_map.iter_rules():
         rule_methods = ",".join(rule.methods)
         logging.debug("{:50s} {:20s} {}".format(rule.endpoint, rule_methods, rule))
@@ -0,0 +1,146 @@
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from dbcat.catalog.models import ColumnLineage, JobExecution
+
+from data_lineage.changelog import changed_job_executions, last_change
+
+DIRECTIONS = ("upstream", "downstream")
+LEVELS = ("column", "table", "job")
+
+
+def is_job(node_id: str) -> bool:
+    return node_id.startswith("task:")
+
+
+def traverse(
+    neighbours: Callable[[str], Iterable[Tuple[str, str]]],
+    start: Iterable[str],
+    max_depth: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+        Breadth first search from a set of columns or tasks. The depth of a
+        column or task is the number of jobs between it and the start nodes.
+    :param neighbours: Function that returns the (column, task) pairs of the
+        edges from a column or task
+    :param start: Node ids to start from
+    :param max_depth: Maximum number of jobs to traverse. None for no limit.
+    :return: Map of node id to depth of all the columns and tasks that were reached
+    """
+    start_nodes = set(start)
+    seen = set(start_nodes)
+    depths: Dict[str, int] = {}
+    queue = deque((node_id, 0) for node_id in start_nodes)
+    while queue:
+        node_id, depth = queue.popleft()
+        if max_depth is not None and depth >= max_depth:
+            continue
+        for neighbour, job_id in neighbours(node_id):
+            depths.setdefault(job_id, depth + 1)
+            if neighbour not in seen:
+                seen.add(neighbour)
+                depths[neighbour] = depth + 1
+                queue.append((neighbour, depth + 1))
+
+    for node_id in start_nodes:
+        depths.pop(node_id, None)
+    return depths
+
+
+def new_edges(session, cursor: int) -> Tuple[List[Tuple[int, int, int]], int]:
+    """
+        Load the column lineage edges of the job executions that changed after a
+        cursor. The edges of a job execution that changed again are loaded
+        again, so callers have to ignore the edges they already have.
+    :param session: Session of the catalog
+    :param cursor: Id of the last change in the lineage change log that was loaded
+    :return: source column id, target column id and job id of the edges, and
+        the new cursor
+    """
+    # The cursor is read first. Changes up to it are committed, so none of them
+    # can be missed by the query of the edges.
+    until = last_change(session)
+    if until <= cursor:
+        return [], cursor
+
+    rows = (
+        session.query(
+            ColumnLineage.source_id,
+            ColumnLineage.target_id,
+            JobExecution.job_id,
+        )
+        .join(JobExecution, ColumnLineage.job_execution_id == JobExecution.id)
+        .filter(
+            ColumnLineage.job_execution_id.in_(
+                changed_job_executions(session, cursor, until).subquery()
+            )
+        )
+        .all()
+    )
+    logging.debug("Loaded {} edges after change {}".format(len(rows), cursor))
+    return [(row.source_id, row.target_id, row.job_id) for row in rows], until
+
+
+class LineageIndex:
+    """
+        Column to column edges of the lineage graph, labelled with their job, in
+        both directions. refresh() loads the edges that were added after the
+        last refresh. Edges that are updated or deleted through the catalog
+        API require a full reload, which is triggered with invalidate() in
+        this process and publish() in others.
+    """
+
+    REDIS_KEY = "data_lineage:lineage_index"
+
+    def __init__(self):
+        self.cursor = 0
+        self._downstream: Dict[str, Set[Tuple[str, str]]] = defaultdict(set)
+        self._upstream: Dict[str, Set[Tuple[str, str]]] = defaultdict(set)
+        self._generation: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            logging.debug("Invalidate lineage index")
+            self.cursor = 0
+            self._downstream = defaultdict(set)
+            self._upstream = defaultdict(set)
+
+    @staticmethod
+    def publish(connection):
+        connection.incr(LineageIndex.REDIS_KEY)
+
+    def sync(self, connection):
+        value = connection.get(LineageIndex.REDIS_KEY)
+        generation = int(value) if value is not None else 0
+        if self._generation is not None and self._generation != generation:
+            self.invalidate()
+        self._generation = generation
+
+    def refresh(self, session):
+        with self._lock:
+            rows, self.cursor = new_edges(session, self.cursor)
+            for source_id, target_id, job_id in rows:
+                source = "column:{}".format(source_id)
+                target = "column:{}".format(target_id)
+                job = "task:{}".format(job_id)
+                # Edges from a job are stored with the job as the neighbour so
+                # that a traversal can start from a job
+                self._downstream[source].add((target, job))
+                self._downstream[job].add((target, job))
+                self._upstream[target].add((source, job))
+                self._upstream[job].add((source, job))
+
+    def traverse(
+        self, direction: str, start: Iterable[str], max_depth: Optional[int] = None
+    ) -> Dict[str, int]:
+        with self._lock:
+            adjacency = (
+                self._downstream if direction == "downstream" else self._upstream
+            )
+            return traverse(lambda n: adjacency.get(n, ()), start, max_depth)
+
+
+lineage_index = LineageIndex()
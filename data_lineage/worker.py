@@ -1,20 +1,913 @@
+import hashlib
+import json
 import logging
-from contextlib import closing
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import closing, contextmanager
+from itertools import groupby, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
+from databuilder import Scoped
 from dbcat import DbScanner, PGCatalog
+from dbcat.catalog.models import (
+    CatColumn,
+    CatSchema,
+    CatSource,
+    CatTable,
+    ColumnLineage,
+)
+from redis.exceptions import WatchError
+from rq import Queue, SimpleWorker, get_current_job
+from rq.exceptions import NoSuchJobError
+from rq.job import Job, JobStatus
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert
 
+from data_lineage.cache import SchemaCache, schema_cache
 
-def scan(connection_args, source_id):
-    logging.info("{}".format(connection_args))
-    catalog = PGCatalog(
+# Tables in a scan sub-job. The tables of a batch are in the same schema.
+DEFAULT_BATCH_SIZE = 500
+SCAN_TIMEOUT = 3600
+
+# Pool of the catalog of a job, or of a catalog that is shared by the jobs of a
+# CatalogWorker. A worker runs one job at a time and a job uses one connection
+# of the catalog.
+WORKER_POOL_SIZE = 1
+WORKER_MAX_OVERFLOW = 2
+WORKER_POOL_RECYCLE = 1800
+
+# Columns in an INSERT statement of add_tables()
+COLUMN_INSERT_SIZE = 1000
+
+TableRecord = Dict[str, Any]
+
+# Row counts of add_tables() that are writes to the catalog
+ROWS_WRITTEN = (
+    "columns_written",
+    "columns_added",
+    "columns_updated",
+    "columns_removed",
+)
+
+
+def open_catalog(connection_args: Dict[str, Any]) -> PGCatalog:
+    return PGCatalog(
         **connection_args,
         connect_args={"application_name": "data-lineage:worker"},
-        max_overflow=40,
-        pool_size=20,
+        max_overflow=WORKER_MAX_OVERFLOW,
+        pool_size=WORKER_POOL_SIZE,
+        pool_recycle=WORKER_POOL_RECYCLE,
         pool_pre_ping=True
     )
 
+
+class CatalogPool:
+    """
+        Catalogs of a worker process keyed by their connection arguments, so
+        that the engine and the connections of a catalog are reused by the
+        jobs of the worker. Counts the catalogs that were created and reused,
+        and the database connections that were opened and checked out.
+    """
+
+    REDIS_KEY = "data_lineage:catalog_pool"
+
+    def __init__(self):
+        self.enabled = False
+        self._catalogs: Dict[str, PGCatalog] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.connections = 0
+        self.checkouts = 0
+
+    @staticmethod
+    def key(connection_args: Dict[str, Any]) -> str:
+        return json.dumps(connection_args, sort_keys=True, default=str)
+
+    def get(self, connection_args: Dict[str, Any]) -> PGCatalog:
+        key = CatalogPool.key(connection_args)
+        with self._lock:
+            catalog = self._catalogs.get(key)
+            if catalog is not None:
+                self.reused += 1
+                return catalog
+
+            catalog = open_catalog(connection_args)
+            event.listen(catalog.engine, "connect", self._on_connect)
+            event.listen(catalog.engine, "checkout", self._on_checkout)
+            logging.debug(
+                "Created catalog engine for {}:{}/{}".format(
+                    catalog.host, catalog.port, catalog.database
+                )
+            )
+            self._catalogs[key] = catalog
+            self.created += 1
+            return catalog
+
+    def _on_connect(self, *args):
+        self.connections += 1
+
+    def _on_checkout(self, *args):
+        self.checkouts += 1
+
+    def close(self):
+        with self._lock:
+            for catalog in self._catalogs.values():
+                catalog.close()
+            self._catalogs = {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "catalogs": len(self._catalogs),
+                "created": self.created,
+                "reused": self.reused,
+                "connections": self.connections,
+                "checkouts": self.checkouts,
+                "connection_reuse_rate": 1 - self.connections / self.checkouts
+                if self.checkouts > 0
+                else 0.0,
+                "checked_out": sum(
+                    catalog.engine.pool.checkedout()
+                    for catalog in self._catalogs.values()
+                ),
+            }
+
+    def publish(self, connection, worker_name: str):
+        connection.hset(CatalogPool.REDIS_KEY, worker_name, json.dumps(self.stats()))
+
+    @staticmethod
+    def unpublish(connection, worker_name: str):
+        connection.hdel(CatalogPool.REDIS_KEY, worker_name)
+
+    @staticmethod
+    def collect(connection) -> Dict[str, Dict[str, Any]]:
+        """
+            Stats of the catalog pools of all the running CatalogWorkers
+        """
+        return {
+            key.decode() if isinstance(key, bytes) else key: json.loads(value)
+            for key, value in connection.hgetall(CatalogPool.REDIS_KEY).items()
+        }
+
+
+catalog_pool = CatalogPool()
+
+
+@contextmanager
+def job_catalog(connection_args: Dict[str, Any]) -> Iterator[PGCatalog]:
+    """
+        Catalog of a job. The jobs of a CatalogWorker share the catalog of
+        their connection arguments. Other workers fork a process for every job,
+        so the job opens and closes its own catalog.
+    """
+    if catalog_pool.enabled:
+        yield catalog_pool.get(connection_args)
+        return
+
+    catalog = open_catalog(connection_args)
     with closing(catalog):
+        yield catalog
+
+
+class CatalogWorker(SimpleWorker):
+    """
+        RQ worker that runs jobs in its own process instead of a forked work
+        horse, so that the catalog engines of the jobs stay warm. The stats of
+        the catalog pool are published after every job. Start it with
+        rq worker --worker-class data_lineage.worker.CatalogWorker
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(CatalogWorker, self).__init__(*args, **kwargs)
+        catalog_pool.enabled = True
+        schema_cache.attach(self.connection)
+
+    def execute_job(self, job, queue):
+        # The worker outlives the jobs, so its schema cache has to catch up
+        # with the sources that changed in other processes
+        schema_cache.sync(self.connection)
+        try:
+            return super(CatalogWorker, self).execute_job(job, queue)
+        finally:
+            catalog_pool.publish(self.connection, self.name)
+
+    def register_death(self):
+        catalog_pool.close()
+        CatalogPool.unpublish(self.connection, self.name)
+        super(CatalogWorker, self).register_death()
+
+
+class BatchScanner(DbScanner):
+    """
+        DbScanner that returns the tables of a source instead of adding them to
+        the catalog, so that they can be added by parallel jobs.
+    """
+
+    def extract(self) -> Iterator[TableRecord]:
+        with closing(self._extractor) as extractor:
+            extractor.init(Scoped.get_scoped_conf(self._conf, extractor.get_scope()))
+            record = extractor.extract()
+            while record:
+                yield {
+                    "schema": record.schema,
+                    "name": record.name,
+                    "columns": [
+                        [column.name, column.type] for column in record.columns
+                    ],
+                }
+                record = extractor.extract()
+
+
+def batch_tables(
+    tables: Iterable[TableRecord], batch_size: int
+) -> Iterator[List[TableRecord]]:
+    for _, schema_tables in groupby(tables, key=lambda table: table["schema"]):
+        while True:
+            batch = list(islice(schema_tables, batch_size))
+            if len(batch) == 0:
+                break
+            yield batch
+
+
+def fingerprint(columns: Iterable[Tuple[str, str]]) -> str:
+    """
+        Hash of the names, data types and order of the columns of a table
+    """
+    digest = hashlib.sha1()
+    for name, data_type in columns:
+        digest.update("{}\0{}\n".format(name, data_type).encode())
+    return digest.hexdigest()
+
+
+def add_tables(
+    catalog: PGCatalog,
+    source: CatSource,
+    tables: List[TableRecord],
+    incremental: bool = False,
+) -> Dict[str, int]:
+    """
+        Add tables and their columns to the catalog
+    :param incremental: Only write the columns of tables whose fingerprint
+        is different from the fingerprint of the table in the catalog
+    :return: Number of tables and columns that were written or skipped
+    """
+    if incremental:
+        return sync_tables(catalog, source, tables)
+    if len(tables) == 0:
+        return {}
+
+    stats: Counter = Counter()
+    with catalog.managed_session as session:
+        existing = _insert_tables(session, source, tables)
+        values = (
+            {
+                "name": name,
+                "data_type": data_type,
+                "sort_order": sort_order,
+                "table_id": existing[(record["schema"], record["name"])].id,
+            }
+            for record in tables
+            for sort_order, (name, data_type) in enumerate(record["columns"])
+        )
+        # Columns that are in the catalog are not updated, as in dbcat
+        while True:
+            chunk = list(islice(values, COLUMN_INSERT_SIZE))
+            if len(chunk) == 0:
+                break
+            session.execute(
+                insert(CatColumn.__table__).values(chunk).on_conflict_do_nothing()
+            )
+        session.commit()
+
+    for record in tables:
+        stats["tables"] += 1
+        stats["columns_written"] += len(record["columns"])
+    logging.debug("Added {} tables of {}".format(len(tables), source.name))
+    return dict(stats)
+
+
+def _insert_tables(
+    session, source: CatSource, tables: List[TableRecord]
+) -> Dict[Tuple[str, str], CatTable]:
+    """
+        Insert the schemata and tables of the records that are not in the
+        catalog and commit, so that batches of the same schema that run at the
+        same time do not fail on the unique constraints. Rows inserted by
+        another batch are skipped.
+    :return: The tables by schema and table name
+    """
+    names = sorted({record["schema"] for record in tables})
+    session.execute(
+        insert(CatSchema.__table__)
+        .values([{"source_id": source.id, "name": name} for name in names])
+        .on_conflict_do_nothing()
+    )
+    schemata: Dict[str, CatSchema] = {
+        schema.name: schema
+        for schema in session.query(CatSchema).filter(
+            CatSchema.source_id == source.id, CatSchema.name.in_(names)
+        )
+    }
+    session.execute(
+        insert(CatTable.__table__)
+        .values(
+            [
+                {"schema_id": schemata[record["schema"]].id, "name": record["name"]}
+                for record in tables
+            ]
+        )
+        .on_conflict_do_nothing()
+    )
+    session.commit()
+
+    return {
+        (table.schema.name, table.name): table
+        for table in session.query(CatTable).filter(
+            CatTable.schema_id.in_([schema.id for schema in schemata.values()]),
+            CatTable.name.in_({record["name"] for record in tables}),
+        )
+    }
+
+
+def sync_tables(
+    catalog: PGCatalog, source: CatSource, tables: List[TableRecord]
+) -> Dict[str, int]:
+    """
+        Write the difference between the tables and the catalog. The tables
+        and columns in the catalog are loaded in two queries. Columns that are
+        no longer in a table are removed, unless they have lineage. A table is
+        skipped if its columns in the catalog, except the ones that are only
+        kept for their lineage, have the fingerprint of the scanned columns.
+    """
+    if len(tables) == 0:
+        return {}
+
+    with catalog.managed_session as session:
+        existing = _insert_tables(session, source, tables)
+        columns: Dict[int, List[CatColumn]] = defaultdict(list)
+        for column in (
+            session.query(CatColumn)
+            .filter(CatColumn.table_id.in_([t.id for t in existing.values()]))
+            .order_by(CatColumn.table_id, CatColumn.sort_order)
+        ):
+            columns[column.table_id].append(column)
+
+        # Columns of unchanged tables that are not in the source. They can
+        # only be in the catalog if they were kept for their lineage.
+        unchanged: Dict[int, List[int]] = {}
+        for record in tables:
+            table = existing[(record["schema"], record["name"])]
+            names = {name for name, _ in record["columns"]}
+            scanned = [c for c in columns[table.id] if c.name in names]
+            if fingerprint((c.name, c.data_type) for c in scanned) == fingerprint(
+                record["columns"]
+            ):
+                unchanged[table.id] = [
+                    c.id for c in columns[table.id] if c.name not in names
+                ]
+        with_lineage = _with_lineage(
+            session, [column_id for ids in unchanged.values() for column_id in ids]
+        )
+
+        stats: Counter = Counter()
+        for record in tables:
+            stats["tables"] += 1
+            table = existing[(record["schema"], record["name"])]
+            current = columns[table.id]
+            if table.id in unchanged and with_lineage.issuperset(unchanged[table.id]):
+                stats["tables_skipped"] += 1
+                stats["columns_skipped"] += len(current) - len(unchanged[table.id])
+                stats["columns_kept"] += len(unchanged[table.id])
+                continue
+
+            stats.update(_sync_columns(session, table, current, record["columns"]))
+
+        session.commit()
+
+    logging.debug(
+        "Synced {} tables of {}: {}".format(len(tables), source.name, dict(stats))
+    )
+    return dict(stats)
+
+
+def _sync_columns(
+    session, table: CatTable, current: List[CatColumn], columns: List[List[str]]
+) -> Counter:
+    stats: Counter = Counter()
+    by_name = {column.name: column for column in current}
+    for sort_order, (name, data_type) in enumerate(columns):
+        column = by_name.pop(name, None)
+        if column is None:
+            session.add(
+                CatColumn(
+                    name=name,
+                    data_type=data_type,
+                    sort_order=sort_order,
+                    table_id=table.id,
+                )
+            )
+            stats["columns_added"] += 1
+        elif column.data_type != data_type or column.sort_order != sort_order:
+            column.data_type = data_type
+            column.sort_order = sort_order
+            stats["columns_updated"] += 1
+        else:
+            stats["columns_skipped"] += 1
+
+    with_lineage = _with_lineage(session, [column.id for column in by_name.values()])
+    for column in by_name.values():
+        if column.id in with_lineage:
+            stats["columns_kept"] += 1
+        else:
+            session.delete(column)
+            stats["columns_removed"] += 1
+    return stats
+
+
+def _with_lineage(session, column_ids: List[int]) -> Set[int]:
+    """
+        Ids of the columns that are the source or target of column lineage
+    """
+    if len(column_ids) == 0:
+        return set()
+    return {
+        column_id
+        for (column_id,) in session.query(ColumnLineage.source_id).filter(
+            ColumnLineage.source_id.in_(column_ids)
+        )
+    } | {
+        column_id
+        for (column_id,) in session.query(ColumnLineage.target_id).filter(
+            ColumnLineage.target_id.in_(column_ids)
+        )
+    }
+
+
+def scan_progress(
+    rows: Dict[str, int],
+    schemas_done: int,
+    schemas_total: int,
+    started_at: float,
+    updated_at: float,
+) -> Dict[str, Any]:
+    """
+        Progress of a scan that is stored in the meta of its job. A scan whose
+        updated_at does not move has stalled.
+    :param rows: Sum of the row counts of add_tables()
+    :param started_at: Time the scan started, in seconds since the epoch
+    :param updated_at: Time the last batch of tables was added
+    """
+    elapsed = max(updated_at - started_at, 0)
+    tables = rows.get("tables", 0)
+    return {
+        "schemas_done": schemas_done,
+        "schemas_total": schemas_total,
+        "tables": tables,
+        "tables_per_second": round(tables / elapsed, 2) if elapsed > 0 else 0.0,
+        "rows_written": sum(rows.get(key, 0) for key in ROWS_WRITTEN),
+        "started_at": started_at,
+        "updated_at": updated_at,
+    }
+
+
+class ScanProgress:
+    """
+        Batches of a scan and the RQ jobs that add them to the catalog. The
+        tables of every batch are stored with the progress so that a batch can
+        be scanned again after its job failed or expired.
+    """
+
+    KEY = "data_lineage:scan:{}"
+    SUFFIXES = ("", ":batches", ":schemas", ":jobs", ":finished", ":rows")
+    TTL = 7 * 24 * 3600
+
+    def __init__(self, connection, scan_id: str):
+        self._connection = connection
+        self._key = ScanProgress.KEY.format(scan_id)
+        self.scan_id = scan_id
+
+    def start(self, source_id: int, incremental: bool = False):
+        now = time.time()
+        pipeline = self._connection.pipeline()
+        pipeline.delete(*[self._key + suffix for suffix in ScanProgress.SUFFIXES])
+        pipeline.hset(
+            self._key,
+            mapping={
+                "source_id": source_id,
+                "batches": 0,
+                "incremental": int(incremental),
+                "started_at": now,
+                "updated_at": now,
+            },
+        )
+        pipeline.expire(self._key, ScanProgress.TTL)
+        pipeline.execute()
+
+    def add_batch(self, number: int, batch: List[TableRecord]):
+        """
+            Store a batch before its job is queued. Batches are added while the
+            tables of the source are extracted, so the number of batches and
+            schemas grows until the scan job has finished.
+        """
+        pipeline = self._connection.pipeline()
+        pipeline.hset(self._key + ":batches", number, json.dumps(batch))
+        pipeline.hset(self._key + ":schemas", number, batch[0]["schema"])
+        pipeline.hincrby(self._key, "batches", 1)
+        for suffix in (":batches", ":schemas"):
+            pipeline.expire(self._key + suffix, ScanProgress.TTL)
+        pipeline.execute()
+
+    def exists(self) -> bool:
+        return self._connection.exists(self._key) > 0
+
+    def source_id(self) -> int:
+        return int(self._connection.hget(self._key, "source_id"))
+
+    def incremental(self) -> bool:
+        return self._connection.hget(self._key, "incremental") == b"1"
+
+    def batch(self, number: int) -> List[TableRecord]:
+        return json.loads(self._connection.hget(self._key + ":batches", number))
+
+    def add_job(self, number: int, job_id: str):
+        self._connection.hset(self._key + ":jobs", number, job_id)
+        self._connection.expire(self._key + ":jobs", ScanProgress.TTL)
+
+    def finish(self, number: int, rows: Dict[str, int]):
+        """
+            Mark a batch as finished and add the number of rows that it wrote
+            and skipped to the scan. A batch that is resumed after it finished
+            is counted again.
+        """
+        pipeline = self._connection.pipeline()
+        pipeline.sadd(self._key + ":finished", number)
+        pipeline.hset(self._key, "updated_at", time.time())
+        for key, value in rows.items():
+            pipeline.hincrby(self._key + ":rows", key, value)
+        for suffix in (":finished", ":rows"):
+            pipeline.expire(self._key + suffix, ScanProgress.TTL)
+        pipeline.execute()
+
+    def rows(self) -> Dict[str, int]:
+        return {
+            key.decode(): int(value)
+            for key, value in self._connection.hgetall(self._key + ":rows").items()
+        }
+
+    def progress(self) -> Dict[str, Any]:
+        """
+            Progress of the scan. A schema is done when all its batches have
+            finished.
+        """
+        started_at, updated_at = self._connection.hmget(
+            self._key, "started_at", "updated_at"
+        )
+        finished = {
+            int(number) for number in self._connection.smembers(self._key + ":finished")
+        }
+        schemas = {
+            int(number): schema
+            for number, schema in self._connection.hgetall(
+                self._key + ":schemas"
+            ).items()
+        }
+        pending = {
+            schema for number, schema in schemas.items() if number not in finished
+        }
+        total = set(schemas.values())
+        return scan_progress(
+            self.rows(),
+            len(total - pending),
+            len(total),
+            float(started_at),
+            float(updated_at),
+        )
+
+    def publish(self):
+        """
+            Store the progress in the meta of the scan job. The write is
+            retried if a batch was added or finished while the progress was
+            read, so that the meta is never overwritten with older progress.
+        """
+        try:
+            job = Job.fetch(self.scan_id, connection=self._connection)
+        except NoSuchJobError:
+            return
+
+        with self._connection.pipeline() as pipeline:
+            while True:
+                try:
+                    pipeline.watch(self._key, self._key + ":finished")
+                    job.meta["progress"] = self.progress()
+                    pipeline.multi()
+                    pipeline.hset(job.key, "meta", job.serializer.dumps(job.meta))
+                    pipeline.execute()
+                    return
+                except WatchError:
+                    continue
+
+    def jobs(self) -> Dict[int, str]:
+        return {
+            int(number): job_id.decode()
+            for number, job_id in self._connection.hgetall(self._key + ":jobs").items()
+        }
+
+    def unfinished(self) -> Dict[int, str]:
+        finished = {
+            int(number) for number in self._connection.smembers(self._key + ":finished")
+        }
+        return {
+            number: job_id
+            for number, job_id in self.jobs().items()
+            if number not in finished
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Number of batches, finished batches and failed batches. The status
+            of the jobs of the unfinished batches is read in one round trip.
+        """
+        num_batches = int(self._connection.hget(self._key, "batches") or 0)
+        unfinished = self.unfinished()
+        pipeline = self._connection.pipeline()
+        for job_id in unfinished.values():
+            pipeline.hget(Job.key_for(job_id), "status")
+        statuses = pipeline.execute()
+        return {
+            "batches": num_batches,
+            "finished": num_batches - len(unfinished),
+            "failed": len(
+                [
+                    status
+                    for status in statuses
+                    if status is not None and status.decode() == JobStatus.FAILED
+                ]
+            ),
+            "rows": self.rows(),
+        }
+
+
+def scan_status(job: Job) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+        Status of a scan. The job of a scan in batches finishes when it has
+        queued the batches, so the scan is started until all the batches have
+        finished, and failed if a batch failed.
+    :return: The status, and the stats of the batches or None if the scan
+        was not split in batches
+    """
+    status = job.get_status(refresh=False)
+    progress = ScanProgress(job.connection, job.id)
+    if not progress.exists():
+        return status, None
+
+    stats = progress.stats()
+    if stats["failed"] > 0:
+        status = JobStatus.FAILED
+    elif status == JobStatus.FINISHED and stats["finished"] < stats["batches"]:
+        status = JobStatus.STARTED
+    return status, stats
+
+
+class ScanIndex:
+    """
+        Scan jobs ordered by the time they were queued, for all sources and for
+        every source. Scans older than ScanProgress.TTL are trimmed when a scan
+        is added, so that listing stays fast as the history grows.
+    """
+
+    KEY = "data_lineage:scans"
+    SOURCE_KEY = "data_lineage:scans:source:{}"
+    # Jobs that are read at a time when a list is filtered by status
+    CHUNK_SIZE = 100
+
+    def __init__(self, queue: Queue):
+        self._queue = queue
+        self._connection = queue.connection
+
+    def add(self, job_id: str, source_id: int, queued_at: float):
+        pipeline = self._connection.pipeline()
+        for key in (ScanIndex.KEY, ScanIndex.SOURCE_KEY.format(source_id)):
+            pipeline.zadd(key, {job_id: queued_at})
+            pipeline.zremrangebyscore(key, "-inf", queued_at - ScanProgress.TTL)
+            pipeline.expire(key, ScanProgress.TTL)
+        pipeline.execute()
+
+    def list(
+        self,
+        source_id: Optional[int] = None,
+        status: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        offset: int = 0,
+        limit: int = 100,
+    ) -> Tuple[List[Tuple[Job, str]], Optional[int]]:
+        """
+            Scan jobs queued in a time window, newest first
+        :param source_id: Only the scans of a source. None for all sources.
+        :param status: Only the scans with this status. See scan_status().
+        :param since: Start of the window, in seconds since the epoch
+        :param until: End of the window, in seconds since the epoch
+        :return: The jobs with the status of their scan, and the number of
+            jobs that match. The number is None if the scans are filtered by
+            status, since that requires reading every job in the window.
+        """
+        key = (
+            ScanIndex.KEY
+            if source_id is None
+            else ScanIndex.SOURCE_KEY.format(source_id)
+        )
+        low = since if since is not None else "-inf"
+        high = until if until is not None else "+inf"
+        if status is None:
+            job_ids = self._connection.zrevrangebyscore(
+                key, high, low, start=offset, num=limit
+            )
+            return (
+                [(job, scan_status(job)[0]) for job in self._fetch(job_ids)],
+                self._connection.zcount(key, low, high),
+            )
+
+        matches: List[Tuple[Job, str]] = []
+        start = 0
+        while len(matches) < offset + limit:
+            job_ids = self._connection.zrevrangebyscore(
+                key, high, low, start=start, num=ScanIndex.CHUNK_SIZE
+            )
+            if len(job_ids) == 0:
+                break
+            start += len(job_ids)
+            for job in self._fetch(job_ids):
+                job_status = scan_status(job)[0]
+                if job_status == status:
+                    matches.append((job, job_status))
+        return matches[offset : offset + limit], None
+
+    def _fetch(self, job_ids: List[bytes]) -> List[Job]:
+        jobs = Job.fetch_many(
+            [job_id.decode() for job_id in job_ids], connection=self._connection
+        )
+        return [job for job in jobs if job is not None]
+
+
+def _enqueue_batch(
+    queue: Queue, progress: ScanProgress, connection_args, source_id, number
+):
+    job = queue.enqueue(
+        scan_batch,
+        connection_args,
+        source_id,
+        progress.scan_id,
+        number,
+        job_timeout=SCAN_TIMEOUT,
+    )
+    progress.add_job(number, job.id)
+
+
+def scan(
+    connection_args,
+    source_id,
+    batch_size: Optional[int] = DEFAULT_BATCH_SIZE,
+    incremental: bool = False,
+):
+    """
+        Scan a source. In an RQ job, the tables are split in batches of at
+        most batch_size tables of a schema and every batch is added to the
+        catalog by a scan_batch job. The batches are queued in the queue of the
+        scan so that they are shared by all the workers of the queue.
+
+        An incremental scan only writes the columns of the tables that changed
+        since the last scan. See sync_tables().
+    """
+    logging.info("{}".format(connection_args))
+    job = get_current_job()
+    with job_catalog(connection_args) as catalog:
         with catalog.managed_session:
             source = catalog.get_source_by_id(source_id)
-            DbScanner(catalog, source).scan()
+            source_name = source.name
+            # Batches are read from the extractor as they fill up, so that the
+            # tables of a source are never all in memory
+            batches = batch_tables(
+                BatchScanner(catalog, source).extract(),
+                batch_size or DEFAULT_BATCH_SIZE,
+            )
+            if job is None or batch_size is None:
+                _add_batches(catalog, source, batches, incremental, job)
+            else:
+                _queue_batches(job, connection_args, source_id, batches, incremental)
+
+    if job is None or batch_size is None:
+        schema_cache.invalidate(source_name)
+        if job is not None:
+            SchemaCache.publish(job.connection, source_name)
+
+
+def _add_batches(
+    catalog: PGCatalog,
+    source: CatSource,
+    batches: Iterable[List[TableRecord]],
+    incremental: bool,
+    job: Optional[Job],
+):
+    """
+        Add the batches of a scan in the scan job. The tables of the last
+        schema may not all be extracted yet, so it is not counted as done
+        until the extractor is exhausted.
+    """
+    started_at = time.time()
+    rows: Counter = Counter()
+    schemas: List[str] = []
+    for batch in batches:
+        if len(schemas) == 0 or schemas[-1] != batch[0]["schema"]:
+            schemas.append(batch[0]["schema"])
+        rows.update(add_tables(catalog, source, batch, incremental))
+        if job is not None:
+            job.meta["progress"] = scan_progress(
+                rows, len(schemas) - 1, len(schemas), started_at, time.time()
+            )
+            job.save_meta()
+    if job is not None:
+        job.meta["progress"] = scan_progress(
+            rows, len(schemas), len(schemas), started_at, time.time()
+        )
+        job.save_meta()
+    logging.info("Scanned {}: {}".format(source.name, dict(rows)))
+
+
+def _queue_batches(
+    job: Job,
+    connection_args,
+    source_id: int,
+    batches: Iterable[List[TableRecord]],
+    incremental: bool,
+):
+    """
+        Store every batch and queue its scan_batch job as soon as it is
+        extracted, so that workers add batches while the source is scanned
+    """
+    progress = ScanProgress(job.connection, job.id)
+    progress.start(source_id, incremental)
+    # Jobs of a synchronous queue, e.g. in tests, are run by a "sync" worker
+    queue = Queue(
+        job.origin, connection=job.connection, is_async=job.worker_name != "sync"
+    )
+    num_batches = 0
+    for number, batch in enumerate(batches):
+        progress.add_batch(number, batch)
+        _enqueue_batch(queue, progress, connection_args, source_id, number)
+        num_batches += 1
+
+    progress.publish()
+    logging.info("Queued {} batches of scan {}".format(num_batches, job.id))
+
+
+def scan_batch(connection_args, source_id: int, scan_id: str, number: int):
+    job = get_current_job()
+    progress = ScanProgress(job.connection, scan_id)
+    tables = progress.batch(number)
+
+    with job_catalog(connection_args) as catalog:
+        with catalog.managed_session:
+            source = catalog.get_source_by_id(source_id)
+            rows = add_tables(catalog, source, tables, progress.incremental())
+            source_name = source.name
+
+    progress.finish(number, rows)
+    progress.publish()
+    schema_cache.invalidate(source_name)
+    SchemaCache.publish(job.connection, source_name)
+
+
+def resume_scan(queue: Queue, connection_args, scan_id: str) -> int:
+    """
+        Queue the batches of a scan whose jobs failed, expired or were
+        cancelled
+    :return: Number of batches that were queued
+    """
+    progress = ScanProgress(queue.connection, scan_id)
+    source_id = progress.source_id()
+    resumed = 0
+    for number, job_id in progress.unfinished().items():
+        try:
+            status = Job.fetch(job_id, connection=queue.connection).get_status()
+        except NoSuchJobError:
+            status = None
+        if status in (JobStatus.QUEUED, JobStatus.STARTED, JobStatus.DEFERRED):
+            continue
+        _enqueue_batch(queue, progress, connection_args, source_id, number)
+        resumed += 1
+
+    logging.info("Resumed {} batches of scan {}".format(resumed, scan_id))
+    return resumed
+
+
+def cancel_scan(connection, scan_id: str):
+    """
+        Cancel the jobs of the batches of a scan that have not finished
+    """
+    for job_id in ScanProgress(connection, scan_id).unfinished().values():
+        try:
+            Job.fetch(job_id, connection=connection).cancel()
+        except NoSuchJobError:
+            pass
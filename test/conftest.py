@@ -8,7 +8,9 @@ from dbcat.catalog import CatSource
 from fakeredis import FakeStrictRedis
 
 from data_lineage import Analyze, Catalog, Graph, Scan
+from data_lineage.changelog import init_lineage_changes
 from data_lineage.parser import parse
+from data_lineage.rollup import init_table_lineage
 from data_lineage.server import create_server
 
 
@@ -82,6 +84,8 @@ catalog:
 def open_catalog_connection(setup_catalog):
     with closing(catalog_connection(catalog_conf)) as conn:
         init_db(conn)
+        init_table_lineage(conn)
+        init_lineage_changes(conn)
         yield conn
 
 
@@ -0,0 +1,152 @@
+import asyncio
+import datetime
+
+import httpx
+import pytest
+
+from data_lineage import ParseError, Source, TableNotFound
+from data_lineage.aio import AsyncAnalyze, AsyncCatalog, AsyncScan
+
+
+def server_url(live_server):
+    return "http://{}:{}".format(live_server.host, live_server.port)
+
+
+def test_get_column(live_server, save_catalog):
+    async def get_columns():
+        async with AsyncCatalog(server_url(live_server)) as catalog:
+            return await asyncio.gather(
+                *[
+                    catalog.get_column("test", "default", "page", name)
+                    for name in ("page_id", "page_latest", "page_title")
+                ]
+            )
+
+    columns = asyncio.run(get_columns())
+    assert [column.name for column in columns] == [
+        "page_id",
+        "page_latest",
+        "page_title",
+    ]
+
+
+def test_get_table_exception(live_server, save_catalog):
+    async def get_table():
+        async with AsyncCatalog(server_url(live_server)) as catalog:
+            return await catalog.get_table("test", "default", "unknown")
+
+    with pytest.raises(TableNotFound):
+        asyncio.run(get_table())
+
+
+def test_analyze(live_server, save_catalog):
+    now = datetime.datetime.now()
+    queries = [
+        "INSERT INTO page_lookup SELECT * FROM page_lookup_redirect",
+        "insert page_lookup select * from page_lookup_redirect",
+        "insert into p_lookup select * from page_lookup_redirect",
+    ]
+
+    async def analyze():
+        async with AsyncCatalog(server_url(live_server)) as catalog:
+            source = await catalog.get_source("test")
+        async with AsyncAnalyze(server_url(live_server), max_concurrency=2) as sdk:
+            return await asyncio.gather(
+                *[
+                    sdk.analyze(
+                        query=query, source=source, start_time=now, end_time=now
+                    )
+                    for query in queries
+                ],
+                return_exceptions=True,
+            )
+
+    results = asyncio.run(analyze())
+    assert results[0].job_id is not None
+    assert isinstance(results[1], ParseError)
+    assert isinstance(results[2], TableNotFound)
+
+
+@pytest.mark.parametrize(
+    "method, status_codes, attempts",
+    [
+        ("GET", [503, 502, 200], 3),
+        ("GET", [503, 503, 503, 503], 4),
+        ("POST", [502, 200], 1),
+        ("POST", [503, 200], 2),
+    ],
+)
+def test_retry(method, status_codes, attempts):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(status_codes[len(requests) - 1])
+
+    async def send():
+        async with AsyncCatalog("http://catalog", backoff=0) as catalog:
+            catalog._session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            return await catalog._request(method, "http://catalog/api/v1/catalog")
+
+    response = asyncio.run(send())
+    assert len(requests) == attempts
+    assert response.status_code == status_codes[attempts - 1]
+
+
+def test_scan_list():
+    requests = []
+    pages = {
+        "1": {
+            "data": [{"id": "b"}, {"id": "a"}],
+            "links": {"next": "http://catalog/api/v1/scan?page%5Bnumber%5D=2"},
+        },
+        "2": {"data": [{"id": "c"}], "links": {"next": None}},
+    }
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(
+            200, json=pages[request.url.params.get("page[number]", "1")]
+        )
+
+    async def scans():
+        async with AsyncScan("http://catalog") as scan:
+            scan._session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            source = Source(session=None, attributes={}, obj_id=7, relationships={})
+            return [item async for item in scan.list(source=source, status="failed")]
+
+    assert [item["id"] for item in asyncio.run(scans())] == ["b", "a", "c"]
+    assert [request.method for request in requests] == ["GET", "GET"]
+    assert requests[0].url.params["source_id"] == "7"
+    assert requests[0].url.params["status"] == "failed"
+
+
+def test_get_sources_pages():
+    requests = []
+    pages = {
+        "1": {
+            "data": [{"id": 1, "attributes": {"name": "a"}}],
+            "links": {
+                "next": "http://catalog/api/v1/catalog/sources?page%5Bnumber%5D=2"
+            },
+        },
+        "2": {
+            "data": [{"id": 2, "attributes": {"name": "b"}}],
+            "links": {"next": None},
+        },
+    }
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(
+            200, json=pages[request.url.params.get("page[number]", "1")]
+        )
+
+    async def sources():
+        async with AsyncCatalog("http://catalog", page_size=1) as catalog:
+            catalog._session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            return [source async for source in catalog.get_sources()]
+
+    assert [source.name for source in asyncio.run(sources())] == ["a", "b"]
+    assert requests[0].url.path == "/api/v1/catalog/sources"
+    assert requests[0].url.params["page[size]"] == "1"
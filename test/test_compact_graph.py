@@ -0,0 +1,67 @@
+import networkx as nx
+
+from data_lineage.compact_graph import CompactLineageGraph
+from data_lineage.graph import LineageGraph
+
+nodes = [
+    {"id": "column:1", "name": "test.default.page.page_id", "type": "data"},
+    {"id": "column:2", "name": "test.default.page.page_latest", "type": "data"},
+    {"id": "task:1", "name": "LOAD page_lookup", "type": "task"},
+    {"id": "column:3", "name": "test.default.page_lookup.page_id", "type": "data"},
+    {"id": "column:4", "name": "test.default.page_lookup.page_version", "type": "data"},
+]
+
+edges = [
+    {"source": "column:1", "target": "task:1"},
+    {"source": "column:2", "target": "task:1"},
+    {"source": "task:1", "target": "column:3"},
+    {"source": "task:1", "target": "column:4"},
+    {"source": "column:1", "target": "task:1"},
+]
+
+
+def test_compact_graph():
+    graph = CompactLineageGraph(nodes=nodes, edges=edges, cursor=1)
+
+    assert graph.num_nodes == 5
+    assert graph.num_edges == 4
+    assert graph.indptr.tolist() == [0, 1, 2, 4, 4, 4]
+    assert graph.indices.tolist() == [2, 2, 3, 4]
+    assert graph.successors("task:1") == ["column:3", "column:4"]
+    assert graph.successors("column:3") == []
+    assert graph.node("task:1") == {"name": "LOAD page_lookup", "type": "task"}
+
+
+def test_compact_graph_to_networkx():
+    graph = CompactLineageGraph(nodes=nodes, edges=edges)
+    expected = LineageGraph(nodes=nodes, edges=edges).graph
+
+    assert nx.utils.graphs_equal(graph.to_networkx(), expected)
+    assert list(graph.to_networkx().edges) == list(expected.edges)
+
+
+def test_compact_graph_apply_delta():
+    graph = CompactLineageGraph(nodes=nodes, edges=edges, cursor=1)
+    graph.apply_delta(
+        {
+            "nodes": [
+                {"id": "task:2", "name": "LOAD page_copy", "type": "task"},
+                {"id": "column:5", "name": "test.default.page_copy.id", "type": "data"},
+            ],
+            "edges": [
+                {"source": "column:3", "target": "task:2"},
+                {"source": "task:2", "target": "column:5"},
+                {"source": "task:1", "target": "column:3"},
+                {"source": "task:2", "target": "column:6"},
+            ],
+            "cursor": 2,
+        }
+    )
+
+    assert graph.cursor == 2
+    assert graph.num_nodes == 8
+    assert graph.num_edges == 7
+    assert graph.indptr.tolist() == [0, 1, 2, 4, 5, 5, 7, 7, 7]
+    assert graph.successors("column:3") == ["task:2"]
+    assert graph.successors("task:2") == ["column:5", "column:6"]
+    assert graph.node("column:6") == {"name": "column:6", "type": "data"}
@@ -1,10 +1,18 @@
-from data_lineage.parser import analyze_dml_query
+import hashlib
+
+from data_lineage.parser import analyze_dml_query, parse
+from data_lineage.parser.binder import ResolutionCache
 
 
 def test_parser(parse_queries_fixture):
     assert len(parse_queries_fixture) == 5
 
 
+def test_parse_name():
+    assert parse("select 1").name == hashlib.sha1(b"select 1").hexdigest()
+    assert parse("select 1", name="one").name == "one"
+
+
 def test_visitor(save_catalog, parse_queries_fixture):
     catalog = save_catalog
     with catalog.managed_session:
@@ -18,3 +26,22 @@ def test_visitor(save_catalog, parse_queries_fixture):
 
         for d in dml:
             assert len(d.source_tables) > 0 and d.target_table is not None
+
+
+def test_resolution_cache(managed_session):
+    catalog = managed_session
+    cache = ResolutionCache(catalog)
+
+    table = cache.search_table(table_like="page", source_like="test")
+    assert cache.search_table(table_like="page", source_like="test") == table
+
+    columns = cache.get_columns_for_table(table)
+    assert [column.name for column in columns] == [
+        column.name for column in catalog.get_columns_for_table(table)
+    ]
+
+    selected = cache.get_columns_for_table(table, ["page_title", "PAGE_ID"])
+    assert [column.name for column in selected] == ["page_id", "page_title"]
+
+    assert cache.misses == 1
+    assert cache.hits == 3
@@ -1,13 +1,29 @@
 import datetime
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 from dbcat.catalog import ColumnLineage
+from dbcat.catalog.models import Job, JobExecution, JobExecutionStatus
 from networkx import edges
+from sqlalchemy.orm import Session
 
-from data_lineage import load_graph
-from data_lineage.parser import analyze_dml_query, extract_lineage, parse
+from data_lineage import load_graph, server, update_graph
+from data_lineage.changelog import commit_lineage_changes, last_change
+from data_lineage.parser import (
+    _get_or_add_job,
+    analyze_dml_query,
+    extract_lineage,
+    parse,
+)
 from data_lineage.parser.dml_visitor import SelectSourceVisitor
+from data_lineage.rollup import (
+    TableLineage,
+    rebuild_table_lineage,
+    refresh_table_lineage,
+)
+from data_lineage.server import traverse_cte
 
 logging.basicConfig(level=getattr(logging, "DEBUG"))
 
@@ -161,6 +177,200 @@ def test_basic_column_graph(managed_session, graph_sdk):
         )
 
 
+def test_extract_lineage_no_commit(managed_session):
+    catalog = managed_session
+
+    query = "INSERT INTO page_lookup_nonredirect(page_id, page_version) SELECT page.page_id, page.page_latest FROM page"
+    parsed = parse(query, "extract_lineage_no_commit")
+    source = catalog.get_source("test")
+    visitor = analyze_dml_query(catalog, parsed, source)
+
+    with catalog.managed_session as session:
+        job_execution = extract_lineage(
+            catalog,
+            visitor,
+            source,
+            parsed,
+            datetime.datetime.now(),
+            datetime.datetime.now(),
+            commit=False,
+        )
+        commit_lineage_changes(session, [job_execution.id])
+
+        all_edges = (
+            session.query(ColumnLineage)
+            .filter(ColumnLineage.job_execution_id == job_execution.id)
+            .all()
+        )
+        assert len(all_edges) == 2
+        assert job_execution.job.name == "extract_lineage_no_commit"
+
+
+def test_get_or_add_job_concurrently(managed_session):
+    catalog = managed_session
+    source = catalog.get_source("test")
+    parsed = parse("SELECT 1", "get_or_add_job_concurrently")
+    first = Session(bind=catalog.engine)
+    second = Session(bind=catalog.engine)
+    try:
+        job_id = _get_or_add_job(first, parsed, source).id
+        # The second session waits for the first one to commit
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(_get_or_add_job, second, parsed, source)
+            time.sleep(0.5)
+            assert not future.done()
+            first.commit()
+            assert future.result(timeout=10).id == job_id
+        second.commit()
+    finally:
+        first.close()
+        second.close()
+        with catalog.managed_session as session:
+            session.query(Job).filter(Job.name == parsed.name).delete()
+            session.commit()
+
+
+def current_cursor(catalog) -> int:
+    with catalog.managed_session as session:
+        return last_change(session)
+
+
+def test_graph_delta(managed_session, graph_sdk):
+    catalog = managed_session
+    source = catalog.get_source("test")
+
+    query = "INSERT INTO page_lookup_nonredirect(page_id, page_version) SELECT page.page_id, page.page_latest FROM page"
+    parsed = parse(query, "graph_delta_first")
+    first = extract_lineage(
+        catalog,
+        analyze_dml_query(catalog, parsed, source),
+        source,
+        parsed,
+        datetime.datetime.now(),
+        datetime.datetime.now(),
+    )
+    graph = load_graph(graph_sdk, [first.job_id])
+    assert graph.cursor == current_cursor(catalog)
+
+    query = "INSERT INTO page_lookup_redirect(page_id, page_version) SELECT page.page_id, page.page_latest FROM page"
+    parsed = parse(query, "graph_delta_second")
+    second = extract_lineage(
+        catalog,
+        analyze_dml_query(catalog, parsed, source),
+        source,
+        parsed,
+        datetime.datetime.now(),
+        datetime.datetime.now(),
+    )
+
+    delta = graph_sdk.get_delta(graph.cursor)
+    assert delta["cursor"] == current_cursor(catalog)
+    assert {node["name"] for node in delta["nodes"]} >= {
+        "graph_delta_second",
+        "test.default.page.page_id",
+        "test.default.page.page_latest",
+        "test.default.page_lookup_redirect.page_id",
+        "test.default.page_lookup_redirect.page_version",
+    }
+
+    update_graph(graph_sdk, graph)
+    assert graph.cursor == delta["cursor"]
+    assert "task:{}".format(second.job_id) in graph.graph.nodes
+    assert "task:{}".format(first.job_id) in graph.graph.nodes
+
+    assert graph_sdk.get_delta(graph.cursor) == {
+        "nodes": [],
+        "edges": [],
+        "cursor": graph.cursor,
+    }
+
+
+def test_graph_delta_late_commit(managed_session, graph_sdk):
+    catalog = managed_session
+    source = catalog.get_source("test")
+    job = catalog.add_job("graph_delta_late_commit", source, {})
+    late = Session(bind=catalog.engine)
+    try:
+        # The edge of the late transaction has a lower id than the edge of the
+        # transaction that commits first
+        late_execution = JobExecution(
+            job_id=job.id,
+            started_at=datetime.datetime.now(),
+            ended_at=datetime.datetime.now(),
+            status=JobExecutionStatus.SUCCESS,
+        )
+        late.add(late_execution)
+        late.flush()
+        late.add(
+            ColumnLineage(
+                source_id=catalog.get_column(
+                    "test", "default", "page", "page_title"
+                ).id,
+                target_id=catalog.get_column(
+                    "test", "default", "page_lookup", "true_title"
+                ).id,
+                job_execution_id=late_execution.id,
+                context={},
+            )
+        )
+        late.flush()
+
+        query = "INSERT INTO page_lookup(redirect_id) SELECT page.page_id FROM page"
+        parsed = parse(query, "graph_delta_late_commit_first")
+        extract_lineage(
+            catalog,
+            analyze_dml_query(catalog, parsed, source),
+            source,
+            parsed,
+            datetime.datetime.now(),
+            datetime.datetime.now(),
+        )
+        cursor = graph_sdk.get_delta(0)["cursor"]
+
+        commit_lineage_changes(late, [late_execution.id])
+        delta = graph_sdk.get_delta(cursor, job_ids={job.id})
+        assert delta["cursor"] > cursor
+        assert {edge["target"] for edge in delta["edges"]} == {
+            "task:{}".format(job.id),
+            "column:{}".format(
+                catalog.get_column("test", "default", "page_lookup", "true_title").id
+            ),
+        }
+    finally:
+        late.close()
+
+
+def test_graph_delta_latest_execution(managed_session, graph_sdk):
+    catalog = managed_session
+    source = catalog.get_source("test")
+    job = catalog.add_job("graph_delta_latest_execution", source, {})
+    executions = []
+    for column_name in ("page_id", "page_latest"):
+        job_execution = catalog.add_job_execution(
+            job,
+            datetime.datetime.now(),
+            datetime.datetime.now(),
+            JobExecutionStatus.SUCCESS,
+        )
+        catalog.add_column_lineage(
+            catalog.get_column("test", "default", "page", column_name),
+            catalog.get_column("test", "default", "page_lookup", "page_version"),
+            job_execution.id,
+            {},
+        )
+        executions.append(job_execution.id)
+    with catalog.managed_session as session:
+        commit_lineage_changes(session, executions)
+
+    # Only the edges of the latest execution, as in the graph
+    graph = graph_sdk.get(job_ids={job.id})
+    delta = graph_sdk.get_delta(0, job_ids={job.id})
+    assert delta["edges"] == graph["edges"]
+    assert "column:{}".format(
+        catalog.get_column("test", "default", "page", "page_id").id
+    ) not in {node["id"] for node in delta["nodes"]}
+
+
 @pytest.fixture(scope="module")
 def get_graph(save_catalog, parse_queries_fixture, graph_sdk):
     catalog = save_catalog
@@ -263,3 +473,168 @@ def test_column_graph(get_graph):
 #    assert [
 #        (edge[0], edge[1]) for edge in list(edges(graph.graph))
 #    ] == expected_edges
+
+
+def test_unique_nodes_and_edges(get_graph, graph_sdk):
+    data = graph_sdk.get()
+    node_ids = [node["id"] for node in data["nodes"]]
+    edges = [(edge["source"], edge["target"]) for edge in data["edges"]]
+
+    assert len(node_ids) == len(set(node_ids))
+    assert len(edges) == len(set(edges))
+    assert set(node_ids) >= {node for edge in edges for node in edge}
+
+
+def _node_id(graph, name):
+    return next(
+        node_id
+        for node_id, attributes in graph.graph.nodes(data=True)
+        if attributes["name"] == name
+    )
+
+
+def test_graph_traversal(get_graph):
+    graph, catalog = get_graph
+    true_title = _node_id(graph, "test.default.page_lookup_redirect.true_title")
+
+    assert graph.downstream(true_title, level="table") == {
+        "test.default.page_lookup": 1,
+        "test.default.normalized_pagecounts": 2,
+    }
+    assert graph.downstream(true_title, depth=1, level="table") == {
+        "test.default.page_lookup": 1
+    }
+
+    page_url = _node_id(graph, "test.default.normalized_pagecounts.page_url")
+    jobs = graph.upstream(page_url, depth=2, level="job")
+    # A job connects all the columns it reads to all the columns it writes
+    assert sorted(graph.graph.nodes[job_id]["name"] for job_id in jobs) == [
+        "LOAD filtered_pagecounts",
+        "LOAD normalized_pagecounts",
+        "LOAD page_lookup",
+    ]
+
+
+def test_lineage_traversal(get_graph, graph_sdk):
+    graph, catalog = get_graph
+    table = catalog.get_table(
+        source_name="test", schema_name="default", table_name="page_lookup_redirect",
+    )
+
+    assert [
+        (node["name"], node["depth"])
+        for node in graph_sdk.downstream("table:{}".format(table.id), level="table")
+    ] == [("test.default.page_lookup", 1), ("test.default.normalized_pagecounts", 2)]
+
+    page_url = _node_id(graph, "test.default.normalized_pagecounts.page_url")
+    assert [
+        (node["name"], node["depth"]) for node in graph_sdk.upstream(page_url, depth=2)
+    ] == [
+        ("test.default.page_lookup.true_title", 1),
+        ("test.default.page_lookup_redirect.true_title", 2),
+    ]
+    assert [
+        node["name"] for node in graph_sdk.upstream(page_url, depth=2, level="job")
+    ] == ["LOAD normalized_pagecounts", "LOAD page_lookup"]
+
+
+def test_reaches(get_graph, graph_sdk):
+    graph, catalog = get_graph
+    table = catalog.get_table(
+        source_name="test", schema_name="default", table_name="normalized_pagecounts",
+    )
+    true_title = _node_id(graph, "test.default.page_lookup_redirect.true_title")
+    table_id = "table:{}".format(table.id)
+
+    assert graph_sdk.reaches(true_title, table_id)
+    assert not graph_sdk.reaches(table_id, true_title)
+    assert graph_sdk.reaches_many(
+        [(true_title, table_id), (table_id, true_title), (table_id, table_id)]
+    ) == [True, False, False]
+
+
+@pytest.mark.parametrize("direction", ["upstream", "downstream"])
+@pytest.mark.parametrize("level", ["column", "table", "job"])
+@pytest.mark.parametrize("depth", [1, 2, None])
+def test_lineage_traversal_cte(get_graph, graph_sdk, direction, level, depth):
+    graph, catalog = get_graph
+    node = _node_id(graph, "test.default.page_lookup.true_title")
+    traverse = getattr(graph_sdk, direction)
+
+    assert traverse(node, depth=depth, level=level, mode="cte") == traverse(
+        node, depth=depth, level=level
+    )
+
+
+def test_traverse_cte_cycle(managed_session, monkeypatch):
+    catalog = managed_session
+    source = catalog.get_source("test")
+    job = catalog.add_job("traverse_cte_cycle", source, {})
+    job_execution = catalog.add_job_execution(
+        job,
+        datetime.datetime.now(),
+        datetime.datetime.now(),
+        JobExecutionStatus.SUCCESS,
+    )
+    first = catalog.get_column("test", "default", "page", "page_id")
+    second = catalog.get_column("test", "default", "page", "page_latest")
+    catalog.add_column_lineage(first, second, job_execution.id, {})
+    catalog.add_column_lineage(second, first, job_execution.id, {})
+    start = ["column:{}".format(first.id)]
+
+    with catalog.managed_session as session:
+        try:
+            depths, truncated = traverse_cte(session, "downstream", start)
+            assert depths["column:{}".format(second.id)] == 1
+            assert depths["task:{}".format(job.id)] == 1
+            # The cycle ends at the start column, far below MAX_CTE_DEPTH
+            assert not truncated
+
+            monkeypatch.setattr(server, "MAX_CTE_DEPTH", 1)
+            _, truncated = traverse_cte(session, "downstream", start)
+            assert truncated
+        finally:
+            session.query(ColumnLineage).filter(
+                ColumnLineage.job_execution_id == job_execution.id
+            ).delete()
+            session.commit()
+
+
+def test_table_graph(get_graph, graph_sdk):
+    table_graph = load_graph(graph_sdk, granularity="table")
+    names = {
+        node_id: attributes["name"]
+        for node_id, attributes in table_graph.graph.nodes(data=True)
+    }
+    edges = {
+        (names[source], names[target]) for source, target in table_graph.graph.edges
+    }
+
+    assert all(node_id.startswith(("table:", "task:")) for node_id in names)
+    assert ("test.default.page_lookup_redirect", "LOAD page_lookup") in edges
+    assert ("LOAD page_lookup", "test.default.page_lookup") in edges
+    assert ("test.default.page_lookup", "LOAD normalized_pagecounts") in edges
+    assert ("LOAD normalized_pagecounts", "test.default.normalized_pagecounts") in edges
+
+
+def test_table_lineage_rollup(get_graph):
+    graph, catalog = get_graph
+
+    def rows(session):
+        return {
+            (row.source_id, row.target_id, row.job_id, row.last_job_execution_id)
+            for row in session.query(TableLineage).all()
+        }
+
+    with catalog.managed_session as session:
+        rollup = rows(session)
+        rebuild_table_lineage(session)
+        rebuilt = rows(session)
+        pairs = {(row[0], row[1]) for row in rollup}
+        refresh_table_lineage(session, set(list(pairs)[:2]))
+        refreshed = rows(session)
+        session.rollback()
+
+    assert len(rollup) > 0
+    assert rollup == rebuilt
+    assert rollup == refreshed
@@ -1,5 +1,7 @@
 import pytest
 
+from data_lineage import parser
+from data_lineage.cache import parse_cache
 from data_lineage.parser import analyze_dml_query, parse, parse_dml_query, parse_queries
 from data_lineage.parser.dml_visitor import (
     CTASVisitor,
@@ -165,6 +167,26 @@ def test_insert_cols(managed_session):
     ]
 
 
+def test_parse_cache(managed_session, monkeypatch):
+    source = managed_session.get_source("test")
+    query = "INSERT INTO page_lookup_nonredirect(page_id, page_version) SELECT page.page_id, page.page_latest FROM page"
+    first = analyze_dml_query(managed_session, parse(query, "first"), source)
+
+    def parse_sql(sql):
+        raise AssertionError("Parsed a cached query")
+
+    # A query in the cache is never parsed
+    monkeypatch.setattr(parser, "parse_sql", parse_sql)
+    hits = parse_cache.hits
+    parsed = parse(query.replace(" ", "\n  "), "second")
+    second = analyze_dml_query(managed_session, parsed, source)
+    assert parse_cache.hits == hits + 1
+    assert second is not first
+    assert second.name == "second"
+    assert second.target_columns == first.target_columns
+    assert second.source_tables == first.source_tables
+
+
 def test_insert_with_join(managed_session):
     source = managed_session.get_source("test")
     query = "insert into page_lookup_redirect select original_page.page_id redirect_id, original_page.page_title redirect_title, final_page.page_title as true_title, final_page.page_id, final_page.page_latest from page final_page join redirect on (redirect.page_title = final_page.page_title) join page original_page on (redirect.rd_from = original_page.page_id)"
@@ -0,0 +1,89 @@
+import json
+
+from dbcat.catalog.models import Job
+
+from data_lineage.ingest import batches, ingest_file, read_queries
+
+
+def test_read_queries(tmp_path):
+    jsonl = tmp_path / "queries.jsonl"
+    jsonl.write_text(
+        "\n".join(
+            [
+                json.dumps({"name": "q1", "query": "select 1"}),
+                "",
+                json.dumps({"name": "q2", "query": "select 2"}),
+            ]
+        )
+    )
+    assert [record["name"] for record in read_queries(str(jsonl))] == ["q1", "q2"]
+
+    csv = tmp_path / "queries.csv"
+    csv.write_text('name,query\nq1,"select a, b from c"\n')
+    assert list(read_queries(str(csv))) == [
+        {"name": "q1", "query": "select a, b from c"}
+    ]
+
+
+def test_batches():
+    assert list(batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_ingest_file(save_catalog, tmp_path):
+    catalog = save_catalog
+    queries = tmp_path / "queries.jsonl"
+    queries.write_text(
+        "\n".join(
+            [
+                json.dumps(
+                    {
+                        "name": "ingest page_lookup_nonredirect",
+                        "query": "INSERT INTO page_lookup_nonredirect(page_id, page_version) "
+                        "SELECT page.page_id, page.page_latest FROM page",
+                        "start_time": "2021-04-01T01:00:00",
+                        "end_time": "2021-04-01T01:15:00",
+                    }
+                ),
+                json.dumps({"name": "ingest syntax error", "query": "insert page"}),
+                json.dumps({"name": "ingest no query"}),
+                json.dumps(
+                    {
+                        "name": "ingest page_lookup_redirect",
+                        "query": "INSERT INTO page_lookup_redirect(page_id, page_version) "
+                        "SELECT page.page_id, page.page_latest FROM page",
+                        "start_time": "yesterday",
+                    }
+                ),
+            ]
+        )
+    )
+
+    analyzed, failed = ingest_file(
+        catalog_options={
+            "user": catalog.user,
+            "password": catalog.password,
+            "host": catalog.host,
+            "port": catalog.port,
+            "database": catalog.database,
+        },
+        source_name="test",
+        path=str(queries),
+        workers=1,
+        batch_size=2,
+    )
+    assert analyzed == 1
+    assert failed == 3
+
+    with catalog.managed_session as session:
+        assert (
+            session.query(Job)
+            .filter(Job.name == "ingest page_lookup_nonredirect")
+            .one_or_none()
+            is not None
+        )
+        assert (
+            session.query(Job)
+            .filter(Job.name == "ingest page_lookup_redirect")
+            .one_or_none()
+            is None
+        )
@@ -0,0 +1,74 @@
+from data_lineage.reachability import ReachabilityIndex
+
+
+def build_index(edges):
+    index = ReachabilityIndex()
+    for source_id, target_id in edges:
+        index._add_edge(source_id, target_id)
+    return index
+
+
+def test_transitive_edges():
+    index = build_index([(1, 2), (2, 3), (4, 3)])
+
+    assert index.reaches([1], [3])
+    assert index.reaches([4], [3])
+    assert not index.reaches([3], [1])
+    assert not index.reaches([1], [4])
+    assert not index.reaches([1], [5])
+    assert index.reaches([5, 1], [4, 3])
+
+
+def test_edges_in_any_order():
+    index = build_index([(3, 4), (1, 2), (2, 3)])
+
+    assert index.reaches([1], [4])
+    assert index.stats()["closure_edges"] == 6
+
+
+def test_cycle():
+    index = build_index([(1, 2), (2, 3), (3, 1)])
+
+    assert index.reaches([1], [1])
+    assert index.reaches([3], [2])
+    assert index.stats()["closure_edges"] == 9
+
+
+def test_components():
+    index = build_index([(1, 2), (3, 4), (2, 3), (5, 6)])
+
+    assert index.reaches([1], [4])
+    assert not index.reaches([1], [6])
+    assert index.stats()["components"] == 2
+    assert index.stats()["closures"] == 1
+
+    index._add_edge(2, 3)
+    assert index.stats()["closures"] == 1
+    index._add_edge(4, 5)
+    assert index.stats()["closures"] == 0
+    assert index.reaches([1], [6])
+
+
+def test_search_large_components():
+    index = ReachabilityIndex(max_closure_columns=2)
+    for source_id, target_id in [(1, 2), (2, 3), (3, 1), (4, 5)]:
+        index._add_edge(source_id, target_id)
+
+    assert index.reaches([2], [1])
+    assert not index.reaches([1], [4])
+    assert index.reaches([4], [5])
+    stats = index.stats()
+    assert stats["searches"] == 1
+    assert stats["closures"] == 1
+
+
+def test_closure_memory():
+    index = ReachabilityIndex(max_closure_bits=9)
+    for source_id, target_id in [(1, 2), (2, 3), (4, 5)]:
+        index._add_edge(source_id, target_id)
+
+    assert index.reaches([1], [3])
+    assert index.reaches([4], [5])
+    stats = index.stats()
+    assert stats["closures"] == 1
+    assert stats["closure_bits"] <= 9
@@ -94,3 +94,50 @@ def test_scan_source(setup_catalog_and_data, scan_sdk):
 
     no_pii = catalog.get_table("pg_scan", "public", "no_pii")
     assert no_pii is not None
+
+
+def test_scan_source_in_batches(setup_catalog_and_data, scan_sdk):
+    catalog, source = setup_catalog_and_data
+    job = scan_sdk.start(source, batch_size=1)
+
+    status = scan_sdk.get(job["id"])
+    assert status["status"] == "finished"
+    assert status["progress"]["failed"] == 0
+    assert status["progress"]["finished"] == status["progress"]["batches"]
+    assert status["progress"]["batches"] >= 3
+    assert status["progress"]["schemas_done"] == status["progress"]["schemas_total"]
+    assert status["progress"]["tables"] >= 3
+    assert status["progress"]["rows_written"] > 0
+
+    assert catalog.get_table("pg_scan", "public", "full_pii") is not None
+
+
+def test_scan_source_incremental(setup_catalog_and_data, scan_sdk):
+    catalog, source = setup_catalog_and_data
+    scan_sdk.start(source, batch_size=1)
+
+    job = scan_sdk.start(source, batch_size=1, incremental=True)
+    status = scan_sdk.get(job["id"])
+    assert status["status"] == "finished"
+
+    rows = status["progress"]["rows"]
+    assert rows["tables_skipped"] == rows["tables"]
+    assert rows.get("columns_added", 0) == 0
+    assert rows.get("columns_removed", 0) == 0
+    assert catalog.get_table("pg_scan", "public", "full_pii") is not None
+
+
+def test_list_scans(setup_catalog_and_data, scan_sdk):
+    catalog, source = setup_catalog_and_data
+    first = scan_sdk.start(source)
+    second = scan_sdk.start(source)
+
+    scans = list(scan_sdk.list(source=source, page_size=1))
+    assert [scan["id"] for scan in scans[:2]] == [second["id"], first["id"]]
+    assert scans[0]["source_id"] == source.id
+
+    finished = list(scan_sdk.list(source=source, status="finished"))
+    finished_ids = [scan["id"] for scan in finished]
+    assert first["id"] in finished_ids
+    assert second["id"] in finished_ids
+    assert list(scan_sdk.list(source=source, status="failed")) == []
@@ -1,16 +1,21 @@
 import datetime
 import logging
+import threading
+from collections import defaultdict
 
 import pytest
+import requests
 from dbcat.catalog.models import ColumnLineage, Job, JobExecution, JobExecutionStatus
 
 from data_lineage import (
+    Catalog,
     ColumnNotFound,
     ParseError,
     SchemaNotFound,
     SourceNotFound,
     TableNotFound,
 )
+from data_lineage.rollup import TableLineage
 
 
 def test_get_sources(rest_catalog):
@@ -46,6 +51,48 @@ def test_get_columns(rest_catalog):
     assert num == 40
 
 
+@pytest.mark.parametrize("prefetch", [0, 3])
+def test_get_columns_prefetch(live_server, save_catalog, prefetch):
+    catalog = Catalog(
+        "http://{}:{}".format(live_server.host, live_server.port),
+        page_size=7,
+        prefetch=prefetch,
+    )
+    ids = [column.id for column in catalog.get_columns()]
+
+    assert len(ids) == 40
+    assert len(set(ids)) == 40
+
+
+def test_get_columns_prefetch_sessions(live_server, save_catalog, monkeypatch):
+    catalog = Catalog(
+        "http://{}:{}".format(live_server.host, live_server.port),
+        page_size=7,
+        prefetch=3,
+    )
+    threads = defaultdict(set)
+    in_flight = []
+    get = requests.Session.get
+
+    def record_get(session, url, **kwargs):
+        threads[id(session)].add(threading.get_ident())
+        in_flight.append(url)
+        try:
+            return get(session, url, **kwargs)
+        finally:
+            in_flight.remove(url)
+
+    monkeypatch.setattr(requests.Session, "get", record_get)
+    columns = catalog.get_columns()
+    next(columns)
+    columns.close()
+
+    # Every session is used by one thread, and no page is fetched after close
+    assert len(threads) > 1
+    assert all(len(thread_ids) == 1 for thread_ids in threads.values())
+    assert in_flight == []
+
+
 def test_get_source_by_id(rest_catalog):
     source = rest_catalog.get_source_by_id(1)
     print(source.__class__.__name__)
@@ -110,6 +157,34 @@ def test_get_schema_exception(rest_catalog, source_name, schema_name):
         rest_catalog.get_schema(source_name, schema_name)
 
 
+@pytest.mark.parametrize(
+    "table_name, column_name, exception",
+    [
+        ("pagecounts", "bytes", ColumnNotFound),
+        ("pagecount", "bytes_sent", TableNotFound),
+    ],
+)
+def test_get_column_exception(rest_catalog, table_name, column_name, exception):
+    with pytest.raises(exception):
+        rest_catalog.get_column("test", "default", table_name, column_name)
+
+
+def test_resolve(rest_catalog):
+    results = rest_catalog.resolve(
+        [
+            ["test", "default", "pagecounts", "bytes_sent"],
+            ["test", "default", "normalized_pagecounts"],
+            ["test", "default", "pagecounts", "bytes"],
+            ["test", "def", "pagecounts"],
+        ]
+    )
+
+    assert results[0].fqdn == ["test", "default", "pagecounts", "bytes_sent"]
+    assert results[1].name == "normalized_pagecounts"
+    assert isinstance(results[2], ColumnNotFound)
+    assert isinstance(results[3], SchemaNotFound)
+
+
 def test_add_source_pg(rest_catalog):
     data = {
         "name": "pg",
@@ -212,6 +287,29 @@ def test_update_source(rest_catalog):
     assert default_schema.schema.id == schema_2.id
 
 
+def test_catalog_cache(live_server, save_catalog):
+    catalog = Catalog(
+        "http://{}:{}".format(live_server.host, live_server.port), cache_ttl=60
+    )
+    column = catalog.get_column("test", "default", "pagecounts", "bytes_sent")
+
+    assert catalog.get_column("test", "default", "pagecounts", "bytes_sent") is column
+    assert catalog.get_column_by_id(column.id) is column
+    with save_catalog.managed_session:
+        source_id = save_catalog.get_source("test").id
+    assert catalog.get_source("test") is catalog.get_source_by_id(source_id)
+
+    stats = catalog.cache_stats()
+    assert stats["hits"] == 3
+    assert stats["misses"] == 2
+
+    source = catalog.add_source(name="gl_cache", source_type="glue")
+    schema = catalog.add_schema("schema_1", source)
+    assert catalog.get_source("gl_cache") is source
+    catalog.update_source(source, schema)
+    assert catalog.get_source_by_id(source.id) is not source
+
+
 def load_edges(catalog, expected_edges, job_execution_id):
     column_edge_ids = []
     for edge in expected_edges:
@@ -396,3 +494,112 @@ def test_parser_parse_error(rest_catalog, parser_sdk, managed_session, query):
             end_time=datetime.datetime.now(),
         )
         logging.debug(exc)
+
+
+def test_analyze_many(rest_catalog, parser_sdk, managed_session):
+    source = rest_catalog.get_source("test")
+    now = datetime.datetime.now()
+    queries = [
+        {
+            "name": "LOAD page_lookup batch",
+            "query": "INSERT INTO page_lookup SELECT plr.redirect_id, plr.redirect_title, "
+            "plr.true_title, plr.page_id, plr.page_version FROM page_lookup_redirect plr",
+            "start_time": now,
+            "end_time": now,
+        },
+        {
+            "query": "insert page_lookup select * from page_lookup_redirect",
+            "start_time": now,
+            "end_time": now,
+        },
+        {
+            "query": "insert into p_lookup select * from page_lookup_redirect",
+            "start_time": now,
+            "end_time": now,
+        },
+    ]
+
+    results = parser_sdk.analyze_many(queries=queries, source=source, batch_size=2)
+    assert len(results) == 3
+    assert results[0].job_id is not None
+    assert isinstance(results[1], ParseError)
+    assert isinstance(results[2], TableNotFound)
+
+
+def test_analyze_batch_invalid_queries(client, rest_catalog, managed_session):
+    source = rest_catalog.get_source("test")
+    now = datetime.datetime.now().isoformat()
+    response = client.post(
+        "/api/v1/analyze/batch",
+        json={
+            "source_id": source.id,
+            "queries": [
+                {"start_time": now, "end_time": now},
+                {"query": "INSERT INTO page_lookup SELECT * FROM page_lookup_redirect"},
+                {
+                    "query": "INSERT INTO page_lookup SELECT * FROM page_lookup_redirect",
+                    "start_time": "yesterday",
+                    "end_time": now,
+                },
+                {
+                    "name": "LOAD page_lookup valid batch",
+                    "query": "INSERT INTO page_lookup SELECT * FROM page_lookup_redirect",
+                    "start_time": now,
+                    "end_time": now,
+                },
+            ],
+        },
+    )
+    assert response.status_code == 200
+    results = response.json["data"]
+    assert [result["error"]["code"] for result in results[:3]] == [400, 400, 400]
+    assert results[1]["error"]["message"] == "start_time is required"
+    assert results[3]["data"]["type"] == "job_executions"
+
+
+def test_cache_stats(client, rest_catalog, parser_sdk, managed_session):
+    source = rest_catalog.get_source("test")
+    parser_sdk.analyze(
+        query="INSERT INTO page_lookup SELECT * FROM page_lookup_redirect",
+        source=source,
+        start_time=datetime.datetime.now(),
+        end_time=datetime.datetime.now(),
+    )
+
+    response = client.get("/api/v1/cache")
+    assert response.status_code == 200
+    stats = response.json["schema_cache"]
+    assert stats["eviction_policy"] == "lru"
+    assert stats["size"] > 0
+    assert stats["columns"] > 0
+    assert stats["hits"] + stats["misses"] > 0
+    assert response.json["parse_cache"]["size"] > 0
+    assert response.json["catalog_pools"] == {}
+
+
+def test_column_lineage_rollup(client, rest_catalog, managed_session):
+    job = rest_catalog.add_job("column_lineage_rollup", {})
+    job_execution = rest_catalog.add_job_execution(
+        job=job,
+        started_at=datetime.datetime.now(),
+        ended_at=datetime.datetime.now(),
+        status=JobExecutionStatus.SUCCESS,
+    )
+    source = rest_catalog.get_column("test", "default", "page", "page_title")
+    target = rest_catalog.get_column("test", "default", "page_lookup", "true_title")
+    edge = rest_catalog.add_column_lineage(source, target, job_execution.id, {})
+
+    def rollup():
+        with managed_session.managed_session as session:
+            return {
+                (row.source_id, row.target_id, row.last_job_execution_id)
+                for row in session.query(TableLineage).filter(
+                    TableLineage.job_id == job.id
+                )
+            }
+
+    assert rollup() == {(source.table_id, target.table_id, job_execution.id)}
+
+    response = client.delete("/api/v1/catalog/column_lineage/{}".format(edge.id))
+    assert response.status_code == 204
+    assert rollup() == set()
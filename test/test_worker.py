@@ -0,0 +1,448 @@
+import datetime
+
+import pytest
+from dbcat import PGCatalog
+from dbcat.catalog.models import (
+    CatColumn,
+    CatSchema,
+    CatSource,
+    CatTable,
+    JobExecutionStatus,
+)
+from fakeredis import FakeStrictRedis
+from rq import Queue, get_current_job
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from data_lineage import worker
+from data_lineage.cache import SchemaCache, schema_cache
+from data_lineage.worker import (
+    CatalogPool,
+    CatalogWorker,
+    ScanIndex,
+    ScanProgress,
+    _queue_batches,
+    batch_tables,
+    catalog_pool,
+    fingerprint,
+    job_catalog,
+    resume_scan,
+    sync_tables,
+)
+
+
+def table(schema, name):
+    return {"schema": schema, "name": name, "columns": [["id", "int"]]}
+
+
+def test_batch_tables():
+    tables = [table("a", "t1"), table("a", "t2"), table("a", "t3"), table("b", "t4")]
+
+    assert [
+        [record["name"] for record in batch] for batch in batch_tables(tables, 2)
+    ] == [["t1", "t2"], ["t3"], ["t4"]]
+
+
+def test_scan_progress():
+    queue = Queue(connection=FakeStrictRedis())
+    progress = ScanProgress(queue.connection, "scan")
+    progress.start(1)
+    for number, batch in enumerate(
+        batch_tables([table("a", "t1"), table("b", "t2")], 10)
+    ):
+        progress.add_batch(number, batch)
+    progress.add_job(0, "job_0")
+    progress.add_job(1, "job_1")
+    progress.finish(0, {"tables": 1, "columns_written": 1})
+
+    assert progress.exists()
+    assert progress.batch(1) == [table("b", "t2")]
+    assert progress.unfinished() == {1: "job_1"}
+    assert progress.stats() == {
+        "batches": 2,
+        "finished": 1,
+        "failed": 0,
+        "rows": {"tables": 1, "columns_written": 1},
+    }
+
+    # The job of batch 1 does not exist anymore
+    assert resume_scan(queue, {}, "scan") == 1
+    assert len(queue) == 1
+    assert progress.unfinished()[1] == queue.job_ids[0]
+
+    # The new job of batch 1 is queued
+    assert resume_scan(queue, {}, "scan") == 0
+
+
+def test_fingerprint():
+    columns = [["id", "int"], ["name", "text"]]
+
+    assert fingerprint(columns) == fingerprint([("id", "int"), ("name", "text")])
+    assert fingerprint(columns) != fingerprint(reversed(columns))
+    assert fingerprint(columns) != fingerprint([["id", "bigint"], ["name", "text"]])
+    assert fingerprint(columns) != fingerprint(columns[:1])
+
+
+def test_scan_progress_meta():
+    queue = Queue(connection=FakeStrictRedis())
+    job = queue.enqueue(print)
+    progress = ScanProgress(queue.connection, job.id)
+    progress.start(1)
+    for number, batch in enumerate(
+        [[table("a", "t1")], [table("a", "t2")], [table("b", "t3")]]
+    ):
+        progress.add_batch(number, batch)
+    progress.finish(0, {"tables": 1, "columns_written": 1})
+    progress.publish()
+    progress.finish(2, {"tables": 1, "tables_skipped": 1, "columns_skipped": 1})
+    progress.publish()
+
+    job.refresh()
+    meta = job.meta["progress"]
+    assert meta["schemas_done"] == 1
+    assert meta["schemas_total"] == 2
+    assert meta["tables"] == 2
+    assert meta["rows_written"] == 1
+    assert meta["tables_per_second"] > 0
+    assert meta["updated_at"] >= meta["started_at"]
+
+
+def test_queue_batches():
+    queue = Queue(connection=FakeStrictRedis())
+    job = queue.enqueue(print)
+
+    def batches():
+        for number in range(3):
+            # The previous batches are queued before the next one is extracted
+            assert len(queue) == number + 1
+            yield [table("a", "t{}".format(number))]
+
+    _queue_batches(job, {}, 1, batches(), False)
+
+    progress = ScanProgress(queue.connection, job.id)
+    assert len(progress.unfinished()) == 3
+    assert progress.batch(2) == [table("a", "t2")]
+    assert progress.stats()["batches"] == 3
+    job.refresh()
+    assert job.meta["progress"]["schemas_total"] == 1
+    assert job.meta["progress"]["schemas_done"] == 0
+
+
+def test_scan_index():
+    queue = Queue(connection=FakeStrictRedis())
+    index = ScanIndex(queue)
+    index.add("expired", 1, 1000 - ScanProgress.TTL - 1)
+    jobs = [queue.enqueue(print, number) for number in range(5)]
+    for number, job in enumerate(jobs):
+        index.add(job.id, number % 2, 1000 + number)
+    jobs[1].set_status("failed")
+
+    listed, total = index.list(offset=1, limit=2)
+    assert [(job.id, status) for job, status in listed] == [
+        (jobs[3].id, "queued"),
+        (jobs[2].id, "queued"),
+    ]
+    assert total == 5
+
+    listed, total = index.list(source_id=1, since=1002)
+    assert [job.id for job, _ in listed] == [jobs[3].id]
+    assert total == 1
+
+    listed, total = index.list(status="queued", until=1003, offset=1)
+    assert [job.id for job, _ in listed] == [jobs[2].id, jobs[0].id]
+    assert total is None
+
+
+def test_scan_index_status():
+    queue = Queue(connection=FakeStrictRedis())
+    index = ScanIndex(queue)
+    jobs = [queue.enqueue(print, number) for number in range(3)]
+    for number, job in enumerate(jobs):
+        job.set_status("finished")
+        index.add(job.id, 1, 1000 + number)
+        progress = ScanProgress(queue.connection, job.id)
+        progress.start(1)
+        progress.add_batch(0, [table("a", "t1")])
+        progress.add_batch(1, [table("a", "t2")])
+
+    # All the batches of scan 0 finished
+    for number in range(2):
+        ScanProgress(queue.connection, jobs[0].id).finish(number, {})
+    # A batch of scan 1 is pending
+    ScanProgress(queue.connection, jobs[1].id).add_job(1, "pending")
+    # A batch of scan 2 failed
+    batch = queue.enqueue(print)
+    batch.set_status("failed")
+    queue.failed_job_registry.add(batch, ttl=60)
+    ScanProgress(queue.connection, jobs[2].id).add_job(1, batch.id)
+
+    listed, _ = index.list()
+    assert [(job.id, status) for job, status in listed] == [
+        (jobs[2].id, "failed"),
+        (jobs[1].id, "started"),
+        (jobs[0].id, "finished"),
+    ]
+    for job, status in listed:
+        filtered, _ = index.list(status=status)
+        assert [other.id for other, _ in filtered] == [job.id]
+
+
+def catalog_database(connection_args):
+    with job_catalog(connection_args) as catalog:
+        return catalog.database
+
+
+def catalog_query(connection_args):
+    with job_catalog(connection_args) as catalog:
+        with catalog.managed_session as session:
+            return session.execute("select 1").scalar()
+
+
+def published_pools():
+    return CatalogPool.collect(get_current_job().connection)
+
+
+CONNECTION_ARGS = {
+    "user": "catalog_user",
+    "password": "catal0g_passw0rd",
+    "host": "127.0.0.1",
+    "port": 5432,
+}
+
+
+@pytest.fixture
+def worker_pool():
+    catalog_pool.close()
+    catalog_pool.created = catalog_pool.reused = 0
+    catalog_pool.connections = catalog_pool.checkouts = 0
+    yield catalog_pool
+    catalog_pool.enabled = False
+    catalog_pool.close()
+
+
+@pytest.fixture
+def sqlite_catalogs(tmp_path, monkeypatch):
+    """
+        Catalogs of the worker pool are backed by an SQLite database with the
+        same pool options, so that jobs can check out connections
+    """
+
+    class SqliteBackedCatalog(PGCatalog):
+        @property
+        def engine(self):
+            if self._engine is None:
+                options = dict(self._connection_args)
+                options.pop("connect_args", None)
+                self._engine = create_engine(
+                    "sqlite:///{}".format(tmp_path / "{}.db".format(self.database)),
+                    poolclass=QueuePool,
+                    **options
+                )
+            return self._engine
+
+    monkeypatch.setattr(worker, "PGCatalog", SqliteBackedCatalog)
+
+
+def test_catalog_worker(worker_pool):
+    connection = FakeStrictRedis()
+    queue = Queue(connection=connection)
+    jobs = [
+        queue.enqueue(catalog_database, dict(CONNECTION_ARGS, database=database))
+        for database in ("tokern", "tokern", "other", "tokern")
+    ]
+    published = queue.enqueue(published_pools)
+
+    worker = CatalogWorker([queue], connection=connection)
+    worker.work(burst=True)
+
+    assert [job.result for job in jobs] == ["tokern", "tokern", "other", "tokern"]
+    # Published after every job
+    assert published.result[worker.name]["created"] == 2
+    assert published.result[worker.name]["reused"] == 2
+    assert published.result[worker.name]["catalogs"] == 2
+    # Closed and unpublished when the worker stops
+    stats = worker_pool.stats()
+    assert stats["catalogs"] == 0
+    assert stats["created"] == 2
+    assert stats["reused"] == 2
+    assert CatalogPool.collect(connection) == {}
+
+
+def test_catalog_worker_connections(worker_pool, sqlite_catalogs):
+    connection = FakeStrictRedis()
+    queue = Queue(connection=connection)
+    jobs = [
+        queue.enqueue(catalog_query, dict(CONNECTION_ARGS, database="tokern"))
+        for _ in range(3)
+    ]
+    published = queue.enqueue(published_pools)
+
+    worker = CatalogWorker([queue], connection=connection)
+    worker.work(burst=True)
+
+    assert [job.result for job in jobs] == [1, 1, 1]
+    stats = published.result[worker.name]
+    assert stats["connections"] == 1
+    assert stats["checkouts"] == 3
+    assert stats["connection_reuse_rate"] == pytest.approx(2 / 3)
+    assert stats["checked_out"] == 0
+
+
+SCHEMA_KEY = ("schema_cache_notify", "public", "page")
+
+
+def schema_cache_entry():
+    return schema_cache.get(SCHEMA_KEY) is not None
+
+
+def test_catalog_worker_schema_cache(worker_pool):
+    connection = FakeStrictRedis()
+    queue = Queue(connection=connection)
+    source = CatSource(name=SCHEMA_KEY[0], source_type="postgresql")
+    schema = CatSchema(name=SCHEMA_KEY[1], source=source)
+    schema_cache.sync(connection)
+    schema_cache.put(SCHEMA_KEY, CatTable(name=SCHEMA_KEY[2], schema=schema), [])
+    # The schema cache of another process, e.g. the server or ingest workers
+    other = SchemaCache()
+    other.attach(connection)
+
+    try:
+        before = queue.enqueue(schema_cache_entry)
+        CatalogWorker([queue], connection=connection).work(burst=True)
+        other.notify(SCHEMA_KEY[0])
+        after = queue.enqueue(schema_cache_entry)
+        CatalogWorker([queue], connection=connection).work(burst=True)
+    finally:
+        schema_cache.attach(None)
+        schema_cache.invalidate()
+
+    assert before.result
+    assert not after.result
+
+
+def catalog_columns(catalog, source, table_name):
+    with catalog.managed_session as session:
+        return [
+            (column.name, column.data_type, column.sort_order)
+            for column in session.query(CatColumn)
+            .join(CatTable, CatColumn.table_id == CatTable.id)
+            .join(CatSchema, CatTable.schema_id == CatSchema.id)
+            .filter(CatSchema.source_id == source.id, CatTable.name == table_name)
+            .order_by(CatColumn.sort_order)
+        ]
+
+
+def test_sync_tables_added(managed_session):
+    catalog = managed_session
+    source = catalog.add_source(name="sync_tables", source_type="postgresql")
+    record = {
+        "schema": "sync_added",
+        "name": "added",
+        "columns": [["id", "int"], ["name", "text"]],
+    }
+
+    assert sync_tables(catalog, source, [record]) == {
+        "tables": 1,
+        "columns_added": 2,
+    }
+    assert catalog_columns(catalog, source, "added") == [
+        ("id", "int", 0),
+        ("name", "text", 1),
+    ]
+    assert sync_tables(catalog, source, [record]) == {
+        "tables": 1,
+        "tables_skipped": 1,
+        "columns_skipped": 2,
+    }
+
+
+def test_sync_tables_renamed_and_reordered(managed_session):
+    catalog = managed_session
+    source = catalog.add_source(name="sync_tables", source_type="postgresql")
+    record = {
+        "schema": "public",
+        "name": "renamed",
+        "columns": [["id", "int"], ["name", "text"], ["email", "text"]],
+    }
+    sync_tables(catalog, source, [record])
+
+    record["columns"] = [["email", "text"], ["id", "int"], ["title", "text"]]
+    assert sync_tables(catalog, source, [record]) == {
+        "tables": 1,
+        "columns_updated": 2,
+        "columns_added": 1,
+        "columns_removed": 1,
+    }
+    assert catalog_columns(catalog, source, "renamed") == [
+        ("email", "text", 0),
+        ("id", "int", 1),
+        ("title", "text", 2),
+    ]
+
+
+def test_sync_tables_type_changed(managed_session):
+    catalog = managed_session
+    source = catalog.add_source(name="sync_tables", source_type="postgresql")
+    record = {
+        "schema": "public",
+        "name": "type_changed",
+        "columns": [["id", "int"], ["name", "text"]],
+    }
+    sync_tables(catalog, source, [record])
+
+    record["columns"] = [["id", "bigint"], ["name", "text"]]
+    assert sync_tables(catalog, source, [record]) == {
+        "tables": 1,
+        "columns_updated": 1,
+        "columns_skipped": 1,
+    }
+    assert catalog_columns(catalog, source, "type_changed") == [
+        ("id", "bigint", 0),
+        ("name", "text", 1),
+    ]
+
+
+def test_sync_tables_removed(managed_session):
+    catalog = managed_session
+    source = catalog.add_source(name="sync_tables", source_type="postgresql")
+    record = {
+        "schema": "public",
+        "name": "removed",
+        "columns": [["id", "int"], ["name", "text"], ["email", "text"]],
+    }
+    sync_tables(catalog, source, [record])
+
+    # The lineage of name keeps it in the catalog
+    job = catalog.add_job("sync_tables_removed", source, {})
+    job_execution = catalog.add_job_execution(
+        job,
+        datetime.datetime.now(),
+        datetime.datetime.now(),
+        JobExecutionStatus.SUCCESS,
+    )
+    catalog.add_column_lineage(
+        catalog.get_column("sync_tables", "public", "removed", "name"),
+        catalog.get_column("sync_tables", "public", "removed", "id"),
+        job_execution.id,
+        {},
+    )
+
+    record["columns"] = [["id", "int"]]
+    assert sync_tables(catalog, source, [record]) == {
+        "tables": 1,
+        "columns_skipped": 1,
+        "columns_kept": 1,
+        "columns_removed": 1,
+    }
+    assert catalog_columns(catalog, source, "removed") == [
+        ("id", "int", 0),
+        ("name", "text", 1),
+    ]
+
+    # The column that is kept for its lineage does not change the table
+    assert sync_tables(catalog, source, [record]) == {
+        "tables": 1,
+        "tables_skipped": 1,
+        "columns_skipped": 1,
+        "columns_kept": 1,
+    }